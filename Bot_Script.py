@@ -1,52 +1,105 @@
 import telebot
+from telebot import apihelper
 import threading
+import signal
 import subprocess
 import os
 import time
 import asyncio
-from collections import defaultdict
+from functools import lru_cache
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove, KeyboardButton
-from openai import AsyncOpenAI
-import base58
-import random
 from dotenv import load_dotenv
 
 # --- Load Environment Variables ---
-load_dotenv()  # Load environment variables from .env file
+load_dotenv()  # Load environment variables from .env file, before the modules below read their settings
+
+from ai_cache import TTLCache, SuggestionPool, normalize_prompt, valid_suggestion
+from cluster import GrindCoordinator, GRIND_LOCAL_FALLBACK
+from grinder import GrindPool, GrindResult, KeygenProcess, Toolchain, GRIND_WORKERS, BENCHMARK_SECONDS, measure_keygen_rate, native_backend_available
+from inventory import KeyInventory
+from metrics import REGISTRY, OPENAI_SECONDS, OPENAI_ERRORS, JOB_SECONDS, METRICS_PORT, instrument, tracer, start_metrics_server
+from outbox import TelegramOutbox, PRIORITY_PROGRESS, OUTBOX_GLOBAL_RATE
+from patterns import PatternError, expected_attempts, attempts_quantile, found_probability, is_base58, is_literal, pattern_length
+from scheduler import GrindScheduler, ScheduledJob, QueueFullError, GRIND_CORE_BUDGET
+from sessions import SessionStore, RuntimeRegistry
+from supervisor import JobSupervisor
+from webhook import ChatExecutor, WebhookIngress, WEBHOOK_URL, WEBHOOK_SECRET, WEBHOOK_WORKERS
 
 # --- Configuration (Placeholders) ---
 # !! IMPORTANT !! Replace these with your actual values in the .env file
 BOT_TOKEN = os.environ.get("BOT_TOKEN", "your_telegram_bot_token")  # Placeholder
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "your_openai_api_key")  # Placeholder
 SOLANA_KEYGEN_PATH = os.environ.get("SOLANA_KEYGEN_PATH", "/path/to/solana-keygen")  # Placeholder
+GRIND_BACKEND = os.environ.get("GRIND_BACKEND", "native")  # "native" (built-in process pool), "cluster" (grind_worker.py daemons at GRIND_NODES) or "solana-keygen"
+BOT_MODE = os.environ.get("BOT_MODE", "polling")  # "polling" for development, "webhook" for production
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "")  # Bot API base URL, e.g. a local fake for offline testing
 
 # --- Bot Settings (Customizable) ---
 BOT_NAME = os.environ.get("BOT_NAME", "NameGenAI")  # Allow customizing the bot's name
 BRAND_EMOJI = os.environ.get("BRAND_EMOJI", "⚡")  # Allow customizing the brand emoji
 TWITTER_LINK = os.environ.get("TWITTER_LINK", "https://x.com/your_twitter_handle") # Placeholder for Twitter link
-ESTIMATED_ADDRESSES_PER_SECOND = 100000  # You can make this configurable if needed
+ESTIMATED_ADDRESSES_PER_SECOND = int(os.environ.get("ESTIMATED_ADDRESSES_PER_SECOND", 100000))  # Used until the startup benchmark has measured the real rate
+LONG_PATTERN_SECONDS = int(os.environ.get("LONG_PATTERN_SECONDS", 600))  # Ask for confirmation when the median ETA is longer than this
+MAX_GRIND_SECONDS = int(os.environ.get("MAX_GRIND_SECONDS", 7 * 86400))  # Refuse patterns whose 90th percentile ETA is longer than this
+MAX_STALL_RESTARTS = int(os.environ.get("MAX_STALL_RESTARTS", 3))  # Restarts of a silent grinder before the job is failed
+MAX_BATCH_COUNT = int(os.environ.get("MAX_BATCH_COUNT", 50))  # Most addresses one job may ask for with "pattern:N"
+AI_MAX_CONCURRENCY = int(os.environ.get("AI_MAX_CONCURRENCY", 8))  # OpenAI requests in flight at once
+AI_TIMEOUT = float(os.environ.get("AI_TIMEOUT", 30))  # Seconds before an AI call is cancelled
 
 # --- Derived Constants ---
 BRAND_HEADER = f"{BRAND_EMOJI} {BOT_NAME}"
-BRAND_FOOTER = "\n\nPowered by the Official Solana CLI 🚀"  # You might make the footer customizable too
+BRAND_FOOTER = "\n\nKeys are generated on this bot's server and shown to you once 🔐"  # You might make the footer customizable too
+SUGGESTION_PROMPT = "Suggest cool 1-5 character patterns (prioritize 1-2 characters) for a Solana wallet. Use Base58 characters."  # Made the AI prompt more generic
 
 # --- Initialize Bot and OpenAI Client ---
+if TELEGRAM_API_URL:
+    apihelper.API_URL = TELEGRAM_API_URL.rstrip("/") + "/bot{0}/{1}"
 bot = telebot.TeleBot(BOT_TOKEN)
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-
-# --- User Data (Keep as is) ---
-user_data = defaultdict(lambda: {
-    "search_status": None,
-    "current_mode": None,
-    "generating_wallet": False,
-    "last_update_time": None,
-    "process": None,
-    "start_time": None,
-    "found_count": 0,
-    "wallet_info": None,
-    "update_message_id": None,
-    "ignore_case": False,
-})
+outbox = TelegramOutbox(bot)  # All sends and edits go through here so handlers never wait on Telegram
+client = None  # AsyncOpenAI, created on the first AI call by openai_client()
+toolchain = Toolchain(SOLANA_KEYGEN_PATH)  # Cached solana-keygen probe, so jobs never wait on it
+grind_pool = GrindPool()
+# Only dials the worker daemons once the cluster backend is started; jobs keep going on grind_pool while none is connected
+grind_cluster = GrindCoordinator(fallback=grind_pool if GRIND_LOCAL_FALLBACK and native_backend_available() else None)
+grind_scheduler = GrindScheduler(
+    rate=ESTIMATED_ADDRESSES_PER_SECOND,
+    shared=GRIND_BACKEND == "cluster" or (GRIND_BACKEND == "native" and native_backend_available() and grind_pool.shared)
+)
+job_supervisor = JobSupervisor()
+key_inventory = KeyInventory()
+
+# --- User Data ---
+user_data = SessionStore()  # Per-chat settings and job descriptors, persisted to SESSION_DB_PATH
+runtime = RuntimeRegistry()  # Per-chat job and grinder handles, which only live as long as this process
+
+# --- Metrics ---
+REGISTRY.gauge("namegen_jobs_running", "Grind jobs holding a generator slot", lambda: len(grind_scheduler.running))
+REGISTRY.gauge(
+    "namegen_jobs_queued", "Grind jobs waiting for a slot, paused ones included",
+    lambda: sum(1 for entry in list(grind_scheduler.queue) if entry[2].state != "done")
+)
+
+def keys_per_second_by_backend():
+    # One series per grinding backend, however many chats are running jobs on it
+    rates = {}
+    for job in list(grind_scheduler.running):
+        if job.backend is not None:
+            rates[job.backend] = rates.get(job.backend, 0.0) + job.rate
+    return [((backend,), rate) for backend, rate in rates.items()]
+
+REGISTRY.gauge("namegen_backend_keys_per_second", "Key rate of running jobs by grinding backend", keys_per_second_by_backend, ("backend",))
+REGISTRY.gauge("namegen_keys_per_second", "Key rate of all running grinders together", lambda: job_supervisor.stats()[1])
+REGISTRY.gauge("namegen_keys_searched", "Keys searched by this process since it started", lambda: job_supervisor.stats()[2])
+REGISTRY.gauge("namegen_grind_nodes", "Grind worker daemons connected", lambda: len(grind_cluster.connected()))
+
+def openai_client():
+    # The OpenAI SDK takes longer to import than the rest of the bot, so it is loaded on first use.
+    # Only called from the AI event loop, one thread.
+    global client
+    if client is None:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return client
 
 # --- AI Helper Class ---
 class AIHelper:
@@ -56,7 +109,10 @@ class AIHelper:
 **Key Information:**
 
 *   **Wallet Generation:**
-    *   Secure, local generation using the Official Solana CLI.
+    *   Keys are generated on the bot's server: by its built-in Ed25519 grinder (PyNaCl), by grind worker machines the operator runs, or by the Solana CLI (`solana-keygen grind`).
+    *   The private key of a match is sent to the user in the Telegram chat, once. The bot does not keep a copy after sending it.
+    *   If the operator enables it, keys for short patterns are generated in advance and kept encrypted on the server until one is handed out, then deleted.
+    *   Users who do not want any server to see their key should generate it themselves with `solana-keygen grind`.
     *   Users can specify patterns for the start or end of the address.
     *   Patterns use Base58 characters (1-9, A-Z, a-z, excluding 0, I, O, l).
     *   Users can generate patterns up to 8 characters.
@@ -83,45 +139,101 @@ class AIHelper:
 
 **Remember**: Be concise, helpful, and always prioritize security in your responses.
         """
+        self.help_cache = TTLCache()  # Answers to /ask questions, keyed on the normalized question
+        self.suggestion_pools = {}  # Normalized prompt -> SuggestionPool
 
     async def get_pattern_suggestion(self, prompt):
         try:
-            response = await client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an expert at generating cool and memorable patterns for Solana wallet addresses using Base58 characters. Generate 5-10 patterns between 1 and 5 characters long. Prioritize patterns that are 1-2 character long. Do not have any intro text, just give the pattern separated by commas." },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.9,
-                max_tokens=200
-            )
-            suggestions_str = response.choices[0].message.content.strip()
-            suggestions = [s.strip() for s in suggestions_str.split(",") if s.strip()]
-            num_suggestions = min(len(suggestions), 5)  # Limit to 5 suggestions
-            chosen_suggestions = random.sample(suggestions, num_suggestions)
-            return ", ".join(chosen_suggestions)
+            key = normalize_prompt(prompt)
+            pool = self.suggestion_pools.get(key)
+            if pool is None:
+                pool = self.suggestion_pools[key] = SuggestionPool(lambda: self._fetch_suggestions(prompt))
+            return await pool.take(5)  # Limit to 5 suggestions
         except Exception as e:
             print(f"AI Error: {e}")
-            return "Error generating suggestions." # Provide a generic error message
+            return []  # The caller shows a generic error message
+
+    async def _fetch_suggestions(self, prompt):
+        response = await self._complete(
+            "suggestion",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are an expert at generating cool and memorable patterns for Solana wallet addresses using Base58 characters. Generate 5-10 patterns between 1 and 5 characters long. Prioritize patterns that are 1-2 character long. Do not have any intro text, just give the pattern separated by commas." },
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.9,
+            max_tokens=200
+        )
+        suggestions_str = response.choices[0].message.content.strip()
+        return [s.strip() for s in suggestions_str.split(",") if s.strip()]
+
+    async def warm_up(self):
+        # Fills the suggestion pool in the background so the first click is answered from memory
+        pool = SuggestionPool(lambda: self._fetch_suggestions(SUGGESTION_PROMPT))
+        self.suggestion_pools.setdefault(normalize_prompt(SUGGESTION_PROMPT), pool).refill()
 
     async def get_help_response(self, user_message):
         try:
-            response = await client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=0.7,
-                max_tokens=250
-            )
-            return response.choices[0].message.content
+            return await self.help_cache.get_or_call(normalize_prompt(user_message), self._ask, user_message)
         except Exception as e:
             print(f"AI Error: {e}")
             return "I'm currently unavailable. Please try again later."
 
+    async def _ask(self, user_message):
+        response = await self._complete(
+            "help",
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.7,
+            max_tokens=250
+        )
+        return response.choices[0].message.content
+
+    async def _complete(self, call, **request):
+        # Every OpenAI request goes through here so its latency and failures are recorded per call type
+        started = time.perf_counter()
+        try:
+            return await openai_client().chat.completions.create(**request)
+        except (Exception, asyncio.CancelledError):
+            OPENAI_ERRORS.inc(call=call)
+            raise
+        finally:
+            OPENAI_SECONDS.observe(time.perf_counter() - started, call=call)
+
+# --- Async Runtime ---
+class AsyncRuntime:
+    # One long-lived event loop for every AI call, so the OpenAI client's connection pool is reused
+    def __init__(self, max_concurrency=AI_MAX_CONCURRENCY, timeout=AI_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.loop = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="async-runtime", daemon=True).start()
+        return self.loop
+
+    async def _limited(self, async_func, args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)  # Created on the loop thread
+        async with self._semaphore:
+            return await async_func(*args)
+
+    def submit(self, async_func, *args, timeout=None):
+        # Returns a concurrent.futures.Future; the coroutine is cancelled if it exceeds the timeout
+        coroutine = asyncio.wait_for(self._limited(async_func, args), timeout or self.timeout)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
 # --- Instantiate AI Helper ---
 ai_helper = AIHelper()
+ai_runtime = AsyncRuntime()
 
 # --- Helper Functions ---
 async def process_ai_request(message):
@@ -130,10 +242,29 @@ async def process_ai_request(message):
         return "Please add your question after /ask"
     return await ai_helper.get_help_response(query)
 
+# --- Rendering ---
+MARKDOWN_V2_ESCAPES = str.maketrans({char: f"\\{char}" for char in r"\_*[]()~>#+-=|{}.!"})
+
 def escape_markdown_v2(text):
-    escape_chars = r"\_*[]()~>#+-=|{}.!"
-    return "".join(f"\\{char}" if char in escape_chars else char for char in text)
+    return text.translate(MARKDOWN_V2_ESCAPES)
+
+# Fragments every branded message shares, escaped once; only the variable part is escaped per message
+BRAND_HEADER_MD = escape_markdown_v2(f"{BRAND_HEADER}\n\n")
+BRAND_FOOTER_MD = escape_markdown_v2(BRAND_FOOTER)
+PROGRESS_BARS_MD = tuple(
+    escape_markdown_v2(f"🔍 Generation in Progress... [{'▓' * filled}{'░' * (10 - filled)}]\n\n") for filled in range(11)
+)
+PAUSED_MD = escape_markdown_v2("⏸ Paused while a shorter job finishes...")
+
+def branded(body):
+    return BRAND_HEADER_MD + escape_markdown_v2(body) + BRAND_FOOTER_MD
+
+def progress_message(filled, status=None):
+    status_md = escape_markdown_v2(f"{status}\n\n") if status else ""
+    return BRAND_HEADER_MD + PROGRESS_BARS_MD[filled] + status_md + BRAND_FOOTER_MD
 
+# Keyboards never change once built, so each is created on first use and then reused
+@lru_cache(maxsize=None)
 def create_main_menu_markup():
     markup = InlineKeyboardMarkup()
     markup.add(InlineKeyboardButton(f"{BRAND_EMOJI} Generate Wallet", callback_data="generate_wallet"))
@@ -144,6 +275,7 @@ def create_main_menu_markup():
     markup.add(InlineKeyboardButton("🔄 Reset Bot", callback_data="reset_bot"))
     return markup
 
+@lru_cache(maxsize=None)
 def create_help_menu_markup():
     markup = InlineKeyboardMarkup()
     markup.add(InlineKeyboardButton("📝 Pattern Rules", callback_data="help_pattern"))
@@ -154,6 +286,7 @@ def create_help_menu_markup():
     markup.add(InlineKeyboardButton("↩️ Back to Main Menu", callback_data="main_menu"))
     return markup
 
+@lru_cache(maxsize=None)
 def create_generate_wallet_menu():
     markup = InlineKeyboardMarkup()
     markup.add(InlineKeyboardButton("🎯 Starts With", callback_data="generate_starts_with"))
@@ -164,95 +297,234 @@ def create_generate_wallet_menu():
     markup.add(InlineKeyboardButton("↩️ Back to Main Menu", callback_data="main_menu"))
     return markup
 
-# ... (rest of your functions: create_thread_count_menu, calculate_estimated_time, format_time_estimate, reset_user_state)
+@lru_cache(maxsize=None)
+def create_stop_markup():
+    markup = ReplyKeyboardMarkup(resize_keyboard=True)
+    markup.add(KeyboardButton('🛑 Stop Generation'))
+    return markup
+
+@lru_cache(maxsize=None)
+def create_long_pattern_markup():
+    markup = InlineKeyboardMarkup()
+    markup.add(InlineKeyboardButton("✅ Yes, Proceed", callback_data=f"proceed_with_long_pattern"))
+    markup.add(InlineKeyboardButton("❌ Cancel", callback_data="generate_wallet"))
+    return markup
+
+def job_key_rate():
+    # Keys/sec one job gets when every generator slot is busy
+    return grind_scheduler.job_rate()
+
+def calculate_estimated_time(pattern, mode, ignore_case, count=1):
+    # Returns (expected attempts, median seconds, 90th percentile seconds) for `count` matches at the measured key rate
+    expected = expected_attempts(pattern, mode, ignore_case)
+    rate = job_key_rate()
+    return expected * count, attempts_quantile(expected, 0.5, count) / rate, attempts_quantile(expected, 0.9, count) / rate
+
+def calibrate_key_rate():
+    # Replaces the ESTIMATED_ADDRESSES_PER_SECOND guess with the configured backend's measured rate
+    try:
+        if GRIND_BACKEND == "cluster":
+            rate = sum(node.capacity for node in grind_cluster.wait_for_nodes(BENCHMARK_SECONDS)) or None
+        elif GRIND_BACKEND == "native" and native_backend_available():
+            rate = grind_pool.benchmark()
+        else:
+            job_rate = measure_keygen_rate(SOLANA_KEYGEN_PATH, grind_scheduler.threads_per_job)
+            rate = job_rate * grind_scheduler.slots if job_rate else None
+    except Exception as e:
+        print(f"Error measuring key rate: {e}")
+        return
+    if rate:
+        grind_scheduler.rate = rate
+        print(f"Measured grind rate: {rate:,.0f} keys/sec")
+
+def prepare_generators(fill_inventory=True):
+    # Readiness phase, off the startup path: probe the toolchain, fork the grind workers, then measure first so the
+    # inventory filler does not skew the benchmark
+    toolchain.start()
+    if GRIND_BACKEND == "cluster":
+        grind_cluster.on_capacity = update_cluster_rate
+        grind_cluster.start()
+    if native_backend_available() and (GRIND_BACKEND == "native" or fill_inventory):
+        grind_pool.warm_up()
+    calibrate_key_rate()
+    if fill_inventory and native_backend_available():
+        key_inventory.start_filler(grind_pool, lambda: not grind_scheduler.running)
+
+def update_cluster_rate(rate):
+    # Grind workers joined or left: estimates follow the cluster's capacity
+    if rate:
+        grind_scheduler.rate = rate
+
+def format_time_estimate(seconds):
+    if seconds < 60:
+        return "less than a minute"
+    if seconds < 3600:
+        return f"~{int(seconds // 60)} minutes"
+    if seconds < 86400:
+        return f"~{seconds / 3600:.1f} hours"
+    if seconds < 86400 * 365:
+        return f"~{seconds / 86400:.1f} days"
+    return f"~{seconds / (86400 * 365):,.0f} years"
+
+# ... (rest of your functions: create_thread_count_menu, reset_user_state)
 
 # --- Bot Command Handlers ---
+WELCOME_MD = escape_markdown_v2(
+    f"{BRAND_HEADER}\n\n"
+    "Welcome to this Solana vanity wallet generator! ✨\n\n" # Made more generic
+    "Create unique, personalized Solana wallet addresses.\n\n"  # Made more generic
+    "Select an option below to begin:"
+    f"{BRAND_FOOTER}"
+)
+
 @bot.message_handler(commands=['start'])
+@instrument
 def send_welcome(message):
-    welcome_text = (
-        f"{BRAND_HEADER}\n\n"
-        "Welcome to this Solana vanity wallet generator! ✨\n\n" # Made more generic
-        "Create unique, personalized Solana wallet addresses.\n\n"  # Made more generic
-        "Select an option below to begin:"
-        f"{BRAND_FOOTER}"
-    )
-    bot.reply_to(message, escape_markdown_v2(welcome_text), reply_markup=create_main_menu_markup(), parse_mode="MarkdownV2")
-
-def run_async_in_thread(async_func, *args):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    result = loop.run_until_complete(async_func(*args))
-    loop.close()
-    return result
+    outbox.reply_to(message, WELCOME_MD, reply_markup=create_main_menu_markup(), parse_mode="MarkdownV2")
 
+# AI handlers only submit the call and return, so a slow model never holds up other updates. The reply is queued
+# from the future's done-callback, which runs on the AI loop thread and therefore only ever enqueues to the outbox.
 @bot.message_handler(commands=['ask'])
+@instrument
 def handle_ai_question(message):
     chat_id = message.chat.id
-    response = run_async_in_thread(process_ai_request, message)
-    bot.send_message(chat_id, response)
-    bot.send_message(chat_id, "What would you like to do next?", reply_markup=create_main_menu_markup())
+    ai_runtime.submit(process_ai_request, message).add_done_callback(lambda future: send_ai_answer(chat_id, future))
+
+def send_ai_answer(chat_id, future):
+    try:
+        response = future.result()
+    except (TimeoutError, asyncio.TimeoutError):
+        response = "The AI assistant is taking too long to respond. Please try again later."
+    except Exception as e:
+        print(f"AI Error: {e}")
+        response = "I'm currently unavailable. Please try again later."
+    outbox.send_message(chat_id, response)
+    outbox.send_message(chat_id, "What would you like to do next?", reply_markup=create_main_menu_markup())
 
 @bot.callback_query_handler(func=lambda call: call.data == "generate_ai_pattern")
+@instrument
 def generate_ai_pattern(call):
     chat_id = call.message.chat.id
+    ai_runtime.submit(ai_helper.get_pattern_suggestion, SUGGESTION_PROMPT).add_done_callback(
+        lambda future: send_ai_suggestions(chat_id, call.id, future)
+    )
+
+def send_ai_suggestions(chat_id, callback_query_id, future):
     try:
-        # Make the AI prompt more generic
-        prompt = "Suggest cool 1-5 character patterns (prioritize 1-2 characters) for a Solana wallet. Use Base58 characters."
-        patterns = run_async_in_thread(ai_helper.get_pattern_suggestion, prompt)
-        bot.send_message(
-            chat_id,
-            f"Here are some pattern suggestions:\n\n**{patterns}**\n\nWhat would you like to do next?",  # Removed the bot's name
-            reply_markup=create_generate_wallet_menu(),
-            parse_mode="MarkdownV2"
-        )
+        options = rank_suggestions(future.result())
     except Exception as e:
         print(f"Error: {e}")
-        bot.answer_callback_query(call.id, "Error generating pattern. Please try again.")
+        options = []
+    if not options:
+        outbox.answer_callback_query(chat_id, callback_query_id, "Error generating pattern. Please try again.")
+        return
+    outbox.answer_callback_query(chat_id, callback_query_id)
+    outbox.send_message(
+        chat_id,
+        branded(
+            "Here are some pattern suggestions, fastest first. Tap one to generate an address that starts with it:"),  # Removed the bot's name
+        reply_markup=create_suggestion_markup(options),
+        parse_mode="MarkdownV2"
+    )
 
-# --- Wallet Generation Function ---
-def start_wallet_generation(chat_id, pattern, mode, message):
-    print(f"Starting wallet generation for user {chat_id} with pattern '{pattern}' in mode '{mode}'")
+def rank_suggestions(suggestions):
+    # Scores each valid suggestion in both case modes as a "Starts With" pattern and returns
+    # [(pattern, [(ignore_case, median seconds), ...]), ...], fastest first; options over the grind limit are dropped
+    ranked = []
+    for pattern in dict.fromkeys(suggestions):
+        if not valid_suggestion(pattern):
+            continue
+        options = []
+        for ignore_case in (False, True):
+            if ignore_case and pattern.lower() == pattern.upper():
+                continue  # No letters to fold, same pattern as the case-sensitive option
+            _, typical_seconds, slow_seconds = calculate_estimated_time(pattern, "starts_with", ignore_case)
+            if key_inventory.in_stock(pattern, "starts_with", ignore_case):
+                typical_seconds = 0
+            elif slow_seconds > MAX_GRIND_SECONDS:
+                continue
+            options.append((ignore_case, typical_seconds))
+        if options:
+            ranked.append((pattern, options))
+    ranked.sort(key=lambda item: min(seconds for _, seconds in item[1]))
+    return ranked
+
+def format_short_estimate(seconds):
+    # Compact form of format_time_estimate for button labels
+    if seconds <= 0:
+        return "instant"  # In stock
+    if seconds < 1:
+        return "<1s"
+    if seconds < 60:
+        return f"~{seconds:.0f}s"
+    if seconds < 3600:
+        return f"~{seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"~{seconds / 3600:.1f} h"
+    return f"~{seconds / 86400:.1f} days"
+
+def create_suggestion_markup(options):
+    markup = InlineKeyboardMarkup()
+    for pattern, choices in options:
+        markup.row(*(
+            InlineKeyboardButton(
+                f"{pattern}{' (any case)' if ignore_case else ''} · {format_short_estimate(seconds)}",
+                callback_data=f"suggestion:{int(ignore_case)}:{pattern}"
+            )
+            for ignore_case, seconds in choices
+        ))
+    markup.add(InlineKeyboardButton("🤖 More Suggestions", callback_data="generate_ai_pattern"))
+    markup.add(InlineKeyboardButton("↩️ Back to Main Menu", callback_data="main_menu"))
+    return markup
 
+@bot.callback_query_handler(func=lambda call: call.data.startswith("suggestion:"))
+@instrument
+def start_suggested_pattern(call):
+    chat_id = call.message.chat.id
     user = user_data[chat_id]
-    user["generating_wallet"] = True
-    user["start_time"] = time.time()
-    user["last_update_time"] = time.time()
-    user["found_count"] = 0
+    _, ignore_case, pattern = call.data.split(":", 2)
 
-    try:
-        if not os.path.exists(SOLANA_KEYGEN_PATH):
-            raise FileNotFoundError(f"solana-keygen not found at {SOLANA_KEYGEN_PATH}")
-        subprocess.run([SOLANA_KEYGEN_PATH, "--version"], capture_output=True, check=True, text=True)
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        print(f"Error checking for solana-keygen: {e}")
-        user["generating_wallet"] = False
-        bot.send_message(
+    if user["generating_wallet"]:
+        outbox.answer_callback_query(chat_id, call.id, "A wallet generation is already running.")
+        return
+    if not valid_suggestion(pattern):
+        outbox.answer_callback_query(chat_id, call.id, "Please choose another pattern.")
+        return
+
+    outbox.answer_callback_query(chat_id, call.id)
+    user["current_mode"] = "starts_with"
+    # The button's case choice applies to this job only; the chat's Ignore Case setting stays as it is
+    confirm_or_start_generation(chat_id, pattern, "starts_with", call.message, ignore_case=ignore_case == "1")
+
+# --- Wallet Generation Function ---
+def start_keygen_process(chat_id, pattern, mode, ignore_case, count=1):
+    if not toolchain.keygen_ready():
+        end_generation(chat_id, "failed")
+        outbox.send_message(
             chat_id,
-            escape_markdown_v2(f"{BRAND_HEADER}\n\nSystem Error: Solana CLI tools not detected or incorrect path set. Please check the configuration.{BRAND_FOOTER}"),  # More specific error
+            branded("System Error: Solana CLI tools not detected or incorrect path set. Please check the configuration."),  # More specific error
             reply_markup=create_main_menu_markup(),
             parse_mode="MarkdownV2"
         )
-        return
+        return False
 
-    ignore_case = user.get("ignore_case", False)
-
-    command = [SOLANA_KEYGEN_PATH, "grind"]
+    command = [SOLANA_KEYGEN_PATH, "grind", "--num-threads", str(grind_scheduler.threads_per_job)]
     if ignore_case:
         command.append("--ignore-case")
     if mode == "starts_with":
-        command.extend([f"--starts-with", f"{pattern}:1"])
+        command.extend([f"--starts-with", f"{pattern}:{count}"])
     elif mode == "ends_with":
-        command.extend([f"--ends-with", f"{pattern}:1"])
+        command.extend([f"--ends-with", f"{pattern}:{count}"])
     elif mode == "starts_and_ends_with":
         prefix, suffix = pattern.split(",")
         prefix = prefix.strip()
         suffix = suffix.strip()
-        command.extend([f"--starts-and-ends-with", f"{prefix}:{suffix}:1"])
+        command.extend([f"--starts-and-ends-with", f"{prefix}:{suffix}:{count}"])
 
     print(f"DEBUG: command={command}")
 
     try:
-        process = subprocess.Popen(
+        process = KeygenProcess(
             command,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -260,211 +532,515 @@ def start_wallet_generation(chat_id, pattern, mode, message):
             bufsize=1,
             universal_newlines=True
         )
-        user["process"] = process
+        runtime[chat_id].process = process
 
     except Exception as e:
-        user["generating_wallet"] = False
-        bot.send_message(
+        toolchain.invalidate()  # The tool may have gone away since it was last probed
+        end_generation(chat_id, "failed")
+        outbox.send_message(
             chat_id,
-            escape_markdown_v2(f"{BRAND_HEADER}\n\nGeneration failed. Please try again.{BRAND_FOOTER}"),
+            branded("Generation failed. Please try again."),
             reply_markup=create_main_menu_markup()
         )
         print(f"Wallet generation failed for user {chat_id}: {str(e)}")
+        return False
+
+    return True
+
+def start_wallet_generation(chat_id, pattern, mode, message, count=1, ignore_case=None):
+    # ignore_case=None uses the chat's Ignore Case setting
+    user = user_data[chat_id]
+    ignore_case = bool(user.get("ignore_case", False) if ignore_case is None else ignore_case)
+    with user.lock:
+        if user["generating_wallet"]:
+            return  # A second message raced the first one here
+        user.update(
+            generating_wallet=True,
+            start_time=time.time(),
+            job_pattern=pattern,
+            job_mode=mode,
+            job_ignore_case=ignore_case,
+            job_count=count,
+            found_count=0
+        )
+    print(f"Starting wallet generation for user {chat_id} with pattern '{pattern}' in mode '{mode}'")
+    runtime[chat_id].trace = tracer.span("wallet_generation", chat_id=chat_id, pattern=pattern, mode=mode, ignore_case=ignore_case, count=count)
+    user["last_update_time"] = time.time()
+
+    if count == 1 and deliver_from_inventory(chat_id, pattern, mode, ignore_case):
         return
+    submit_generation_job(chat_id, pattern, mode, ignore_case, count=count)
 
-    progress_bar = "░" * 10
-    initial_message = bot.send_message(
+def submit_generation_job(chat_id, pattern, mode, ignore_case, attempts=0, run_seconds=0.0, count=1, found=0):
+    # Hands the chat's job to the scheduler; attempts, run_seconds and found carry over work done before a restart
+    job = ScheduledJob(
         chat_id,
-        escape_markdown_v2(f"{BRAND_HEADER}\n\n"
-            f"🔍 Generation in Progress... [{progress_bar}]\n\n"
-            f"{BRAND_FOOTER}"),
+        expected_attempts(pattern, mode, ignore_case) * (count - found),
+        launch_wallet_generation,
+        pattern=pattern,
+        mode=mode,
+        ignore_case=ignore_case,
+        attempts=attempts,
+        run_seconds=run_seconds,
+        count=count,
+        found=found
+    )
+    runtime[chat_id].job = job
+
+    try:
+        position = grind_scheduler.submit(job)
+    except QueueFullError as e:
+        print(f"Rejected wallet generation for user {chat_id}: {e}")
+        end_generation(chat_id, "rejected")
+        outbox.send_message(
+            chat_id,
+            branded("All generators are busy and the queue is full. Please try again in a few minutes."),
+            reply_markup=create_main_menu_markup(),
+            parse_mode="MarkdownV2"
+        )
+        return
+
+    if position:
+        expected_start = grind_scheduler.expected_start(job)
+        outbox.send_message(
+            chat_id,
+            branded(
+                f"⏳ All generators are busy. Your job is #{position} in the queue.\n\n"
+                f"Expected start: {format_time_estimate(expected_start)}\n\n"
+                "You will get a message as soon as it starts."),
+            reply_markup=create_stop_markup(),
+            parse_mode="MarkdownV2"
+        )
+
+def deliver_from_inventory(chat_id, pattern, mode, ignore_case):
+    # Short patterns are usually in stock: hand the keypair over like a grind would and finish right away
+    try:
+        hit = key_inventory.take(pattern, mode, ignore_case)
+    except Exception as e:
+        print(f"Inventory lookup failed for user {chat_id}: {e}")
+        return False
+    if hit is None:
+        return False
+
+    print(f"Delivered pattern '{pattern}' to user {chat_id} from inventory")
+    end_generation(chat_id, "inventory")
+    deliver_result(chat_id, GrindResult(*hit))
+    outbox.send_message(
+        chat_id,
+        wallet_success_message(),
+        reply_markup=create_main_menu_markup(),
         parse_mode="MarkdownV2"
     )
-    user["update_message_id"] = initial_message.message_id
-
-    stop_markup = ReplyKeyboardMarkup(resize_keyboard=True)
-    stop_markup.add(KeyboardButton('🛑 Stop Generation'))
-    bot.send_message(chat_id, "Use the button below to stop the generation.", reply_markup=stop_markup)
-
-    def monitor_generation():
-        chat_id = message.chat.id
-        user = user_data[chat_id]
-        process = user["process"]
-        last_update_time = time.time()
-        update_message_id = user["update_message_id"]
-
-        while user["generating_wallet"]:
-            if process.poll() is not None:
-                stdout, stderr = process.communicate()
-
-                if stderr:
-                    print(f"Wallet generation error for user {chat_id}: {stderr}")
-                    bot.send_message(
-                        chat_id,
-                        escape_markdown_v2(f"{BRAND_HEADER}\n\nAn error occurred during generation. Please try again.\n\nError: {stderr}{BRAND_FOOTER}"),
-                        reply_markup=create_main_menu_markup()
-                    )
-                    user["generating_wallet"] = False
-                    return
-
-                if "Wrote keypair to" in stdout:
-                    user["generating_wallet"] = False
-                    success_message = escape_markdown_v2(
-                        f"{BRAND_HEADER}\n\n"
-                        "**Wallet Generated Successfully!**\n\n"  # Made more generic
-                        "The wallet address has been successfully generated.\n"  # Made more generic
-                        "**Remember to keep your key file safe and secure!**\n"  # Emphasize security
-                        f"{BRAND_FOOTER}"
-                    )
-
-                    try:
-                        bot.edit_message_text(
-                            chat_id=chat_id,
-                            message_id=user["update_message_id"],
-                            text=success_message,
-                            reply_markup=create_main_menu_markup(),
-                            parse_mode="MarkdownV2"
-                        )
-                    except Exception as e:
-                        print(f"Error updating message with success: {e}")
-                    bot.send_message(chat_id, "Generation complete.", reply_markup=ReplyKeyboardRemove())
-                    return
-                else:
-                    bot.send_message(
-                        chat_id,
-                        escape_markdown_v2(f"{BRAND_HEADER}\n\nAn error occurred during generation. No keypair file was created. Please try again.{BRAND_FOOTER}"),
-                        reply_markup=create_main_menu_markup()
-                    )
-                    user["generating_wallet"] = False
-                    return
-
-            current_time = time.time()
-            if current_time - last_update_time >= 10:
-                progress_segment = int((current_time - user["start_time"]) % 150 / 15)
-                progress_bar = "▓" * progress_segment + "░" * (10 - progress_segment)
-
-                update_message = escape_markdown_v2(
-                    f"{BRAND_HEADER}\n\n"
-                    f"🔍 Generation in Progress... [{progress_bar}]\n\n"
-                    f"{BRAND_FOOTER}"
-                )
-
-                try:
-                    bot.edit_message_text(
-                        chat_id=chat_id,
-                        message_id=update_message_id,
-                        text=update_message,
-                        parse_mode="MarkdownV2"
-                    )
-                    last_update_time = current_time
-                except Exception as e:
-                    print(f"Error updating progress message: {e}")
-
-            time.sleep(1)
-
-    monitor_generation()
-
-# ... (rest of your command handlers: handle_stop_command, generate_wallet_menu_callback, ai_help_callback)
+    return True
+
+def end_generation(chat_id, outcome):
+    # Clears the chat's job, in memory and on disk; outcome ("found", "stopped", ...) labels its metrics and trace
+    chat = runtime[chat_id]
+    job = chat.job
+    if job is not None and job.elapsed():
+        length = sum(display_length(side.strip()) for side in job.pattern.split(","))  # Matched characters, not pattern syntax
+        JOB_SECONDS.observe(job.elapsed(), length=length, ignore_case=job.ignore_case, outcome=outcome)
+    if chat.trace is not None:
+        chat.trace.end(
+            outcome=outcome, attempts=int(job.attempts) if job else 0, grind_seconds=job.elapsed() if job else 0, found=job.found if job else 0
+        )
+    user_data[chat_id].update(
+        generating_wallet=False, job_pattern=None, job_mode=None, job_ignore_case=False, job_attempts=0, job_seconds=0.0, job_count=1
+    )
+    runtime.clear(chat_id)
 
-def escape_markdown_v2_selectively(text):
-    escape_chars_map = {
-        "_": r"\_", "*": r"\*", "[": r"\[", "]": r"\]", "(": r"\(",
-        ")": r"\)", "~": r"\~", "`": r"\`", ">": r"\>", "#": r"\#",
-        "+": r"\+", "-": r"\-", "=": r"\=", "|": r"\|", "{": r"\{",
-        "}": r"\}", ".": r"\.", "!": r"\!"
-    }
-    escaped_text = ""
-    inside_code_block = False
-    for char in text:
-        if char == '`':
-            inside_code_block = not inside_code_block
-        if not inside_code_block and char in escape_chars_map:
-            escaped_text += escape_chars_map[char]
+def checkpoint_job(job):
+    # Persists the job's progress so a restarted bot resumes it with its attempts and elapsed time
+    user_data[job.chat_id].update(job_attempts=int(job.attempts), job_seconds=job.elapsed())
+
+def owns_job(job):
+    # Whether the job is still the chat's current one (not stopped or replaced)
+    return user_data[job.chat_id]["generating_wallet"] and runtime[job.chat_id].job is job
+
+def wallet_success_message(count=1):
+    return branded(
+        "**Wallet Generated Successfully!**\n\n"  # Made more generic
+        + ("The wallet address has been successfully generated.\n" if count == 1 else f"All {count} wallet addresses have been successfully generated.\n") +
+        "**Remember to keep your private key safe and secure!**\n"  # Emphasize security
+    )
+
+def start_grinder(job):
+    # Starts the configured backend for the job and hands it to the supervisor; returns the process or None
+    chat_id = job.chat_id
+    chat = runtime[chat_id]
+
+    if GRIND_BACKEND == "cluster" or (GRIND_BACKEND == "native" and native_backend_available()):
+        try:
+            grinder = grind_cluster if GRIND_BACKEND == "cluster" else grind_pool
+            chat.process = grinder.start_job(job.pattern, job.mode, job.ignore_case, job.count - job.found)
+            job.backend = GRIND_BACKEND
+        except Exception as e:
+            end_generation(chat_id, "failed")
+            outbox.send_message(
+                chat_id,
+                branded("Generation failed. Please try again."),
+                reply_markup=create_main_menu_markup()
+            )
+            print(f"Wallet generation failed for user {chat_id}: {str(e)}")
+            return None
+    else:
+        if GRIND_BACKEND == "native":
+            print("PyNaCl is not installed, falling back to solana-keygen")
+        if not start_keygen_process(chat_id, job.pattern, job.mode, job.ignore_case, job.count - job.found):
+            return None
+        job.backend = "keygen"
+
+    job_supervisor.watch(
+        job,
+        chat.process,
+        handle_generation_exit,
+        update_generation_progress,
+        on_telemetry=record_grind_telemetry,
+        on_stall=handle_generation_stall,
+        on_hit=handle_generation_hit
+    )
+    return chat.process
+
+def launch_wallet_generation(job):
+    # Called by the scheduler once the job gets a slot, possibly from a supervisor event thread
+    chat_id = job.chat_id
+    user = user_data[chat_id]
+    user["start_time"] = time.time()
+    user["last_update_time"] = time.time()
+    trace = runtime[chat_id].trace
+    if trace is not None and trace.span_id is not None:  # None while tracing is off
+        trace.set(queued_seconds=round(time.time() - trace.start, 3))
+
+    # Queued before the grinder starts: the supervisor may report progress or a hit as soon as it watches the job
+    user["update_message_id"] = outbox.send_message(chat_id, progress_message(0), parse_mode="MarkdownV2")
+    outbox.send_message(chat_id, "Use the button below to stop the generation.", reply_markup=create_stop_markup())
+
+    if start_grinder(job) is None:
+        user["update_message_id"] = None
+        return None
+
+    return runtime[chat_id].process
+
+def record_grind_telemetry(job, attempts, elapsed):
+    # Runs on the supervisor thread for every "Searched N keypairs" line; counts carry over grinder restarts
+    job.attempts = job.restart_attempts + attempts
+    job.rate = attempts / max(1, elapsed)
+
+def handle_generation_stall(job):
+    # The grinder printed no progress for STALL_TIMEOUT seconds: restart it, giving up after MAX_STALL_RESTARTS
+    chat_id = job.chat_id
+    if job.state != "running" or not owns_job(job):
+        return
+
+    print(f"Grinder for user {chat_id} stalled after {job.attempts:,} attempts, restart {job.restarts + 1}")
+    job_supervisor.unwatch(job)
+    try:
+        job.handle.kill()
+        job.handle.wait()
+    except Exception as e:
+        print(f"Error killing stalled grinder for user {chat_id}: {e}")
+
+    job.restarts += 1
+    job.restart_attempts = job.attempts
+    if job.restarts > MAX_STALL_RESTARTS or start_grinder(job) is None:
+        grind_scheduler.finish(job)
+        with user_data[chat_id].lock:
+            if not owns_job(job):
+                return
+            end_generation(chat_id, "stalled")
+        outbox.send_message(
+            chat_id,
+            branded("The generator stopped responding. Please try again."),
+            reply_markup=create_main_menu_markup(),
+            parse_mode="MarkdownV2"
+        )
+        return
+    job.handle = runtime[chat_id].process
+
+def deliver_result(chat_id, result, found=1, count=1):
+    # Sends the keypair to the chat once and wipes it; the bot keeps no copy
+    heading = f"✅ Match {found}/{count}" if count > 1 else "✅ Match found"
+    try:
+        outbox.send_message(
+            chat_id,
+            escape_markdown_v2(f"{heading}\n\n"
+                f"Address: `{result.pubkey}`\n"
+                f"Private key: `{result.secret_base58()}`\n\n"
+                "This key is shown only once. Copy it now and store it safely."),
+            parse_mode="MarkdownV2"
+        )
+    finally:
+        result.wipe()
+
+def handle_generation_hit(job, name):
+    # Runs on the supervisor's watcher thread for every keypair found; each one is delivered right away
+    chat_id = job.chat_id
+    user = user_data[chat_id]
+    with user.lock:
+        if not owns_job(job):
+            return  # The grinder wipes results nobody took
+        result = runtime[chat_id].process.take_result(name)
+        if result is None:
+            return
+        job.found += 1
+        user["found_count"] = job.found
+    deliver_result(chat_id, result, job.found, job.count)
+
+def handle_generation_exit(job, stdout, stderr):
+    # Runs on a supervisor event thread once the grinder has exited
+    chat_id = job.chat_id
+    user = user_data[chat_id]
+    grind_scheduler.finish(job)
+    outcome = "error" if stderr or job.found < job.count else "found"
+
+    with user.lock:
+        if not owns_job(job):
+            return  # Stopped by the user, who has already been told
+        end_generation(chat_id, outcome)
+
+    if stderr:
+        print(f"Wallet generation error for user {chat_id}: {stderr}")
+        outbox.send_message(
+            chat_id,
+            branded(f"An error occurred during generation. Please try again.\n\nError: {stderr}"),
+            reply_markup=create_main_menu_markup()
+        )
+        return
+
+    if job.found >= job.count:
+        outbox.edit_message_text(
+            chat_id=chat_id,
+            message_id=user["update_message_id"],
+            text=wallet_success_message(job.count),
+            reply_markup=create_main_menu_markup(),
+            parse_mode="MarkdownV2"
+        )
+        outbox.send_message(chat_id, "Generation complete.", reply_markup=ReplyKeyboardRemove())
+    elif job.found:
+        outbox.send_message(
+            chat_id,
+            branded(f"Generation ended early: {job.found} of {job.count} wallets were created. Please try again for the rest."),
+            reply_markup=create_main_menu_markup()
+        )
+    else:
+        outbox.send_message(
+            chat_id,
+            branded("An error occurred during generation. No keypair file was created. Please try again."),
+            reply_markup=create_main_menu_markup()
+        )
+
+def update_generation_progress(job):
+    # Runs on a supervisor event thread every PROGRESS_INTERVAL seconds while the job is watched
+    chat_id = job.chat_id
+    user = user_data[chat_id]
+    if not owns_job(job):
+        return
+
+    if job.state == "paused":
+        update_message = BRAND_HEADER_MD + PAUSED_MD + "\n\n" + BRAND_FOOTER_MD
+    else:
+        # The bar shows the chance that a search this long would already have found a match, or the share of a batch found
+        rate = job.rate or job_key_rate()
+        attempts = job.attempts or job.elapsed() * rate
+        expected = expected_attempts(job.pattern, job.mode, job.ignore_case)
+        if job.count > 1:
+            progress_segment = min(10, job.found * 10 // job.count)
+            found_line = f"Found {job.found}/{job.count}. "
         else:
-            escaped_text += char
-    return escaped_text
+            progress_segment = min(10, int(found_probability(expected, attempts) * 10))
+            found_line = ""
+        typical_seconds = attempts_quantile(expected, 0.5, job.count) / rate
+        update_message = progress_message(
+            progress_segment,
+            f"{found_line}Searched ~{attempts:,.0f} keys at {rate:,.0f} keys/sec. Typical time for this {'batch' if job.count > 1 else 'pattern'}: {format_time_estimate(typical_seconds)}"
+        )
+
+    # Queued behind results; a tick still waiting is replaced by this one
+    outbox.edit_message_text(
+        chat_id=chat_id,
+        message_id=user["update_message_id"],
+        text=update_message,
+        priority=PRIORITY_PROGRESS,
+        parse_mode="MarkdownV2"
+    )
+    user["last_update_time"] = time.time()
+    checkpoint_job(job)
+
+@bot.message_handler(commands=['stop'])
+@instrument
+def handle_stop_command(message):
+    chat_id = message.chat.id
+    user = user_data[chat_id]
+    with user.lock:
+        job = runtime[chat_id].job
+        if not user["generating_wallet"] or job is None:
+            outbox.send_message(chat_id, "No wallet generation is running.", reply_markup=ReplyKeyboardRemove())
+            return
+        end_generation(chat_id, "stopped")
+    grind_scheduler.cancel(job)
+    outbox.send_message(
+        chat_id,
+        branded("🛑 Wallet generation stopped."),
+        reply_markup=ReplyKeyboardRemove(),
+        parse_mode="MarkdownV2"
+    )
+    outbox.send_message(chat_id, "What would you like to do next?", reply_markup=create_main_menu_markup())
+
+# ... (rest of your command handlers: generate_wallet_menu_callback, ai_help_callback)
+
+def escape_markdown_v2_selectively(text):
+    # Escapes everything outside `code` spans; the backticks themselves stay as the span delimiters
+    parts = text.split("`")
+    parts[::2] = [part.translate(MARKDOWN_V2_ESCAPES) for part in parts[::2]]
+    return "`".join(parts)
+
+# Help pages are fixed text, so they are escaped once here rather than on every button press
+HELP_SECTIONS = {
+    # Make help sections more generic
+    "pattern": (
+        f"{BRAND_HEADER}\n\n"
+        "**Wallet Generation Guidelines**\n\n"
+        "This bot generates secure Solana wallet addresses using Base58 encoding.\n\n"  # Generic
+        "**Valid Characters**\n"
+        "• Digits: 1-9\n"
+        "• Letters: A-Z, a-z (excluding I, O, l)\n\n"
+        "**Pattern Specifications**\n"
+        "• Pattern Length: 1-8 characters\n"
+        "• Full Address: 44 characters\n"
+        "• Encoding: Base58\n"
+        "• Case-sensitive (unless 'Ignore Case' is enabled)\n\n"
+        "**Flexible Patterns**\n"
+        "• `?` matches any character: `A?C`\n"
+        "• `[...]` matches one of the listed characters: `[Mm]oon`, `[1-9]X`\n"
+        "• `|` accepts any of several patterns: `SUN|Moon`\n"
+        "• The search stops at the first address matching any of them\n"
+    ),
+    "security": (
+        f"{BRAND_HEADER}\n\n"
+        "**Security and Privacy**\n\n"
+        "• Keys are generated on this bot's server, by its built-in grinder, the Solana CLI or grind worker machines run by the operator.\n"
+        "• Your private key is sent to you in this chat once and then wiped from the bot's memory. It stays in your Telegram chat history.\n"
+        "• If enabled, keys for short patterns are made in advance and stored encrypted on the server until one is handed out, then deleted.\n"
+        "• Whoever runs this bot could see your key. For large funds, generate keys on your own machine with `solana-keygen grind`.\n\n"
+        "**User Responsibilities**\n"
+        "• Copy your private key to safe storage and delete the message from this chat.\n"  # User responsibility
+        "• **Never share your private keys or mnemonics with anyone.**\n"  # Strong warning
+    ),
+    "about": (
+        f"{BRAND_HEADER}\n\n"
+        f"**About {BOT_NAME}**\n\n"  # Use the bot's configured name
+        "This bot helps you create custom Solana wallet addresses.\n"  # Generic
+        "• It searches for matching keys on its own server and sends you the private key once.\n"
+        "• It provides an AI assistant to help with pattern ideas.\n"  # Mention AI
+    ),
+    "how": (
+        f"{BRAND_HEADER}\n\n"
+        "**Quick Start Guide**\n\n"
+        "1. Select 'Generate Wallet'.\n"
+        "2. Choose how you want to customize your address (start/end/both).\n"
+        "3. Enter your desired pattern.\n"
+        "4. Toggle 'Ignore Case' if you don't want case sensitivity.\n"
+        "5. Wait for the generation process to complete.\n"
+        "6. **Securely save the generated wallet information.**\n"  # Emphasize security
+    ),
+    "ai": (
+        f"{BRAND_HEADER}\n\n"
+        "**AI Assistant Features**\n\n"
+        "• Use /ask followed by your question to get help.\n"
+        "• The AI can suggest patterns for your wallet address.\n"
+        "• Ask the AI about Solana addresses or security.\n"
+        f"{BRAND_FOOTER}"
+    ),
+}
+HELP_SECTIONS = {section: escape_markdown_v2_selectively(text) for section, text in HELP_SECTIONS.items()}
+HELP_MENU_MD = BRAND_HEADER_MD + escape_markdown_v2("**Help Menu**\n\nSelect a topic below:")
 
 # --- Help Menu Handlers ---
 @bot.callback_query_handler(func=lambda call: call.data.startswith("help_"))
+@instrument
 def handle_help_callback(call):
     chat_id = call.message.chat.id
     section = call.data.split("_")[1]
 
-    # Make help sections more generic
-    help_sections = {
-        "pattern": (
-            f"{BRAND_HEADER}\n\n"
-            "**Wallet Generation Guidelines**\n\n"
-            "This bot generates secure Solana wallet addresses using Base58 encoding.\n\n"  # Generic
-            "**Valid Characters**\n"
-            "• Digits: 1-9\n"
-            "• Letters: A-Z, a-z (excluding I, O, l)\n\n"
-            "**Pattern Specifications**\n"
-            "• Pattern Length: 1-8 characters\n"
-            "• Full Address: 44 characters\n"
-            "• Encoding: Base58\n"
-            "• Case-sensitive (unless 'Ignore Case' is enabled)\n"
-        ),
-        "security": (
-            f"{BRAND_HEADER}\n\n"
-            "**Security and Privacy**\n\n"
-            "• Keys are generated locally using the Solana CLI.\n"  # Mention Solana CLI
-            "• No private key data is stored by this bot.\n"  # Emphasize security
-            "• The bot uses secure methods to handle temporary data.\n\n" # Generic statement
-            "**User Responsibilities**\n"
-            "• Save your generated key files securely.\n"  # User responsibility
-            "• **Never share your private keys or mnemonics with anyone.**\n"  # Strong warning
-        ),
-        "about": (
-            f"{BRAND_HEADER}\n\n"
-            f"**About {BOT_NAME}**\n\n"  # Use the bot's configured name
-            "This bot helps you create custom Solana wallet addresses.\n"  # Generic
-            "• It uses the official Solana CLI for secure key generation.\n"  # Mention Solana CLI
-            "• It provides an AI assistant to help with pattern ideas.\n"  # Mention AI
-        ),
-        "how": (
-            f"{BRAND_HEADER}\n\n"
-            "**Quick Start Guide**\n\n"
-            "1. Select 'Generate Wallet'.\n"
-            "2. Choose how you want to customize your address (start/end/both).\n"
-            "3. Enter your desired pattern.\n"
-            "4. Toggle 'Ignore Case' if you don't want case sensitivity.\n"
-            "5. Wait for the generation process to complete.\n"
-            "6. **Securely save the generated wallet information.**\n"  # Emphasize security
-        ),
-        "ai": (
-            f"{BRAND_HEADER}\n\n"
-            "**AI Assistant Features**\n\n"
-            "• Use /ask followed by your question to get help.\n"
-            "• The AI can suggest patterns for your wallet address.\n"
-            "• Ask the AI about Solana addresses or security.\n"
-            f"{BRAND_FOOTER}"
-        ),
-    }
-
     if section == "menu":
-        bot.edit_message_text(
+        outbox.edit_message_text(
             chat_id=chat_id,
             message_id=call.message.message_id,
-            text=f"{BRAND_HEADER}\n\n**Help Menu**\n\nSelect a topic below:",
+            text=HELP_MENU_MD,
             reply_markup=create_help_menu_markup(),
             parse_mode="MarkdownV2"
         )
-    elif section in help_sections:
-        bot.edit_message_text(
+    elif section in HELP_SECTIONS:
+        outbox.edit_message_text(
             chat_id=chat_id,
             message_id=call.message.message_id,
-            text=escape_markdown_v2_selectively(help_sections[section]),
+            text=HELP_SECTIONS[section],
             reply_markup=create_help_menu_markup(),
             parse_mode="MarkdownV2"
         )
     else:
-        bot.answer_callback_query(call.id, text="Invalid help option.")
+        outbox.answer_callback_query(chat_id, call.id, text="Invalid help option.")
 
 # ... (rest of your callback handlers: help_menu, request_pattern_starts_with, request_pattern_ends_with, request_pattern_starts_and_ends_with, return_to_main_menu, reset_bot_handler, toggle_ignore_case)
 
+def confirm_or_start_generation(chat_id, pattern, mode, message, count=1, ignore_case=None):
+    # Starts cheap patterns right away, asks before long grinds and refuses ones that can't realistically finish
+    user = user_data[chat_id]
+    if ignore_case is None:
+        ignore_case = user["ignore_case"]
+    expected, typical_seconds, slow_seconds = calculate_estimated_time(pattern, mode, ignore_case, count)
+
+    if slow_seconds > MAX_GRIND_SECONDS:
+        outbox.send_message(
+            chat_id,
+            branded(
+                f"⛔ This pattern needs about {expected:,.0f} attempts on average, which would take {format_time_estimate(typical_seconds)} on this server "
+                f"(90% chance within {format_time_estimate(slow_seconds)}). That is beyond the {format_time_estimate(MAX_GRIND_SECONDS)} limit.\n\n"
+                "Please try a shorter pattern, fewer addresses or enable 'Ignore Case'."),
+            reply_markup=create_generate_wallet_menu(),
+            parse_mode="MarkdownV2"
+        )
+        return
+
+    if typical_seconds >= LONG_PATTERN_SECONDS:
+        user["temp_pattern"] = pattern
+        user["temp_count"] = count
+        user["original_mode"] = mode
+        user["temp_ignore_case"] = ignore_case
+
+        outbox.send_message(
+            chat_id,
+            branded(
+                f"⚠️ **WARNING:** This pattern needs about {expected:,.0f} attempts on average. "
+                f"Expected time: {format_time_estimate(typical_seconds)} (90% chance within {format_time_estimate(slow_seconds)}), plus any time waiting for a free generator. "
+                "Shorter patterns or 'Ignore Case' finish much faster.\n\n"
+                "Do you want to proceed with generating the pattern?\n\n"),
+            reply_markup=create_long_pattern_markup(),
+            parse_mode="MarkdownV2"
+        )
+        return
+
+    start_wallet_generation(chat_id, pattern, mode, message, count, ignore_case)
+
+def pattern_syntax_error(text, anchor, ignore_case):
+    # Checks one side of a pattern that uses "?", "[...]" or "|"; plain literals are left to the checks in the handler
+    if is_literal(text):
+        return None
+    if not (GRIND_BACKEND == "cluster" or (GRIND_BACKEND == "native" and native_backend_available())):
+        return "Wildcards, character classes and alternatives need the built-in generator, which this server does not run. Please enter a plain pattern."
+    try:
+        pattern_length(text, ignore_case, anchor)
+    except PatternError as e:
+        return f"{e}.\n\nUse '?' for any character, '[Mm]' for a choice of characters and '|' between alternatives (e.g., `[Mm]oon|SUN`)."
+    return None
+
+def display_length(text):
+    # Address characters a pattern side takes up: "[Mm]oon|SUN" counts as 4
+    return len(text) if is_literal(text) else pattern_length(text)
+
 # --- Pattern Input Handler ---
 @bot.message_handler(func=lambda message: True)
+@instrument
 def handle_pattern_input(message):
     chat_id = message.chat.id
     user = user_data[chat_id]
@@ -473,15 +1049,27 @@ def handle_pattern_input(message):
         if message.text and (message.text == '🛑 Stop Generation' or message.text.startswith('/stop')):
             handle_stop_command(message)
         else:
-            bot.reply_to(
+            outbox.reply_to(
                 message,
-                escape_markdown_v2(f"{BRAND_HEADER}\n\nWallet generation is in progress. Please wait or use the Stop Generation button.{BRAND_FOOTER}"),
+                branded("Wallet generation is in progress. Please wait or use the Stop Generation button."),
                 parse_mode="MarkdownV2"
             )
         return
 
     pattern = message.text.strip()
-    invalid_chars = "IlO0+/"
+
+    # "pattern:N" asks for N matching addresses from one search
+    count = 1
+    if ":" in pattern:
+        pattern, _, count_text = pattern.rpartition(":")
+        count = int(count_text) if count_text.strip().isdigit() else 0
+        if not 1 <= count <= MAX_BATCH_COUNT:
+            outbox.send_message(
+                chat_id,
+                branded(f"The number of addresses after ':' should be between 1 and {MAX_BATCH_COUNT} (e.g., `ABC:10`)."),
+                parse_mode="MarkdownV2"
+            )
+            return
 
     mode = user["current_mode"]
     if mode == "starts_and_ends_with":
@@ -501,27 +1089,30 @@ def handle_pattern_input(message):
             else:
                 raise ValueError
         except ValueError:
-            bot.send_message(
+            outbox.send_message(
                 chat_id,
-                escape_markdown_v2(f"{BRAND_HEADER}\n\nInvalid input for start and end patterns. Please use the format: `prefix,suffix` (e.g., `ABC,XYZ`).{BRAND_FOOTER}"),  # Generic example
+                branded("Invalid input for start and end patterns. Please use the format: `prefix,suffix` (e.g., `ABC,XYZ`)."),  # Generic example
                 parse_mode="MarkdownV2"
             )
             return
 
-        total_length = len(prefix) + len(suffix)
+        error = pattern_syntax_error(prefix, "start", user["ignore_case"]) or pattern_syntax_error(suffix, "end", user["ignore_case"])
+        if error:
+            outbox.send_message(chat_id, branded(f"{error}"), parse_mode="MarkdownV2")
+            return
 
-        if not (0 <= len(prefix) <= 8 and 0 <= len(suffix) <= 8):
-            bot.send_message(
+        if not (0 <= display_length(prefix) <= 8 and 0 <= display_length(suffix) <= 8):
+            outbox.send_message(
                 chat_id,
-                escape_markdown_v2(f"{BRAND_HEADER}\n\nPrefix and Suffix should be between 0-8 characters each.{BRAND_FOOTER}"),
+                branded("Prefix and Suffix should be between 0-8 characters each."),
                 parse_mode="MarkdownV2"
             )
             return
 
-        if any(char in prefix for char in invalid_chars) or any(char in suffix for char in invalid_chars):
-            bot.send_message(
+        if not all(is_base58(side) for side in (prefix, suffix) if is_literal(side)):
+            outbox.send_message(
                 chat_id,
-                escape_markdown_v2(f"{BRAND_HEADER}\n\nInvalid characters found. Please use only Base58 characters: 123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz{BRAND_FOOTER}"),
+                branded("Invalid characters found. Please use only Base58 characters: 123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"),
                 parse_mode="MarkdownV2"
             )
             return
@@ -529,84 +1120,166 @@ def handle_pattern_input(message):
         if "original_mode" not in user_data[chat_id]:
             user_data[chat_id]["original_mode"] = mode
 
-        if 5 <= total_length <= 8:
-            user_data[chat_id]["temp_pattern"] = pattern
-            user_data[chat_id]["original_mode"] = mode
-
-            markup = InlineKeyboardMarkup()
-            markup.add(InlineKeyboardButton("✅ Yes, Proceed", callback_data=f"proceed_with_long_pattern"))
-            markup.add(InlineKeyboardButton("❌ Cancel", callback_data="generate_wallet"))
-
-            bot.send_message(
-                chat_id,
-                escape_markdown_v2(f"{BRAND_HEADER}\n\n"
-                    "⚠️ **WARNING:** Generating a pattern with a combined length of 5-8 characters may take several hours or even days, depending on the complexity of the pattern, whether 'Ignore Case' is enabled, and server load. 1-4 character patterns are recommended for faster generation.\n\n"
-                    "Do you want to proceed with generating the pattern?\n\n"
-                    f"{BRAND_FOOTER}"),
-                reply_markup=markup,
-                parse_mode="MarkdownV2"
-            )
-        else:
-            start_wallet_generation(chat_id, pattern, mode, message)
+        confirm_or_start_generation(chat_id, f"{prefix},{suffix}", mode, message, count)
 
     elif mode:
         pattern = pattern.strip()
-        if len(pattern) < 1 or len(pattern) > 8:
-            bot.send_message(
-                chat_id,
-                escape_markdown_v2(f"{BRAND_HEADER}\n\n"
-                    "Pattern should be between 1-8 characters long."
-                    f"{BRAND_FOOTER}"),
-                parse_mode="MarkdownV2"
-            )
+        error = pattern_syntax_error(pattern, "end" if mode == "ends_with" else "start", user["ignore_case"])
+        if error:
+            outbox.send_message(chat_id, branded(f"{error}"), parse_mode="MarkdownV2")
             return
 
-        if any(char in pattern for char in invalid_chars):
-            bot.send_message(
+        if display_length(pattern) < 1 or display_length(pattern) > 8:
+            outbox.send_message(
                 chat_id,
-                escape_markdown_v2(f"{BRAND_HEADER}\n\n"
-                    "Please enter a valid pattern using Base58 characters.\n\n"
-                    "Valid characters: 123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
-                    f"{BRAND_FOOTER}"),
+                branded(
+                    "Pattern should be between 1-8 characters long."),
                 parse_mode="MarkdownV2"
             )
             return
 
-        if 5 <= len(pattern) <= 8:
-            user_data[chat_id]["temp_pattern"] = pattern
-            user_data[chat_id]["original_mode"] = mode
-
-            markup = InlineKeyboardMarkup()
-            markup.add(InlineKeyboardButton("✅ Yes, Proceed", callback_data=f"proceed_with_long_pattern"))
-            markup.add(InlineKeyboardButton("❌ Cancel", callback_data="generate_wallet"))
-
-            bot.send_message(
+        if is_literal(pattern) and not is_base58(pattern):
+            outbox.send_message(
                 chat_id,
-                escape_markdown_v2(f"{BRAND_HEADER}\n\n"
-                    "⚠️ **WARNING:** Generating a 5-8 character pattern may take several hours or even days depending on the complexity of the pattern, whether 'Ignore Case' is enabled, and server load. 1-4 character patterns are recommended for faster generation.\n\n"
-                    "Do you want to proceed with generating the pattern?\n\n"
-                    f"{BRAND_FOOTER}"),
-                reply_markup=markup,
+                branded(
+                    "Please enter a valid pattern using Base58 characters.\n\n"
+                    "Valid characters: 123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"),
                 parse_mode="MarkdownV2"
             )
+            return
 
-        else:
-            start_wallet_generation(chat_id, pattern, mode, message)
+        confirm_or_start_generation(chat_id, pattern, mode, message, count)
     else:
-        bot.send_message(
+        outbox.send_message(
             chat_id,
-            escape_markdown_v2(f"{BRAND_HEADER}\n\nPlease select a pattern placement option first (Starts With/Ends With){BRAND_FOOTER}"),
+            branded("Please select a pattern placement option first (Starts With/Ends With)"),
             parse_mode="MarkdownV2"
         )
 
-# ... (rest of your callback handlers: proceed_with_long_pattern, regenerate_callback)
+@bot.callback_query_handler(func=lambda call: call.data == "proceed_with_long_pattern")
+@instrument
+def proceed_with_long_pattern(call):
+    chat_id = call.message.chat.id
+    user = user_data[chat_id]
+    pattern = user.get("temp_pattern")
+    mode = user.get("original_mode")
 
-# --- Main Execution ---
-if __name__ == "__main__":
+    if not pattern or not mode or user["generating_wallet"]:
+        outbox.answer_callback_query(chat_id, call.id, "Please enter a pattern first.")
+        return
+
+    outbox.answer_callback_query(chat_id, call.id)
+    start_wallet_generation(chat_id, pattern, mode, call.message, user.get("temp_count") or 1, user.get("temp_ignore_case"))
+
+# ... (rest of your callback handlers: regenerate_callback)
+
+def resume_interrupted_jobs(owns_chat=lambda chat_id: True):
+    # Jobs persisted as running belonged to a previous process; their grinders are gone, so they are started
+    # again from the last checkpoint. Key search has no memory, so only the attempt count and time carry over.
+    for user in user_data.generating():
+        if not owns_chat(user.chat_id):
+            continue
+        pattern = user.job_pattern
+        if not pattern:
+            end_generation(user.chat_id, "lost")
+            continue
+        print(f"Resuming wallet generation for user {user.chat_id} after {user.job_attempts:,} attempts")
+        runtime[user.chat_id].trace = tracer.span(
+            "wallet_generation", chat_id=user.chat_id, pattern=pattern, mode=user.job_mode, ignore_case=user.job_ignore_case,
+            count=user.job_count, resumed_attempts=user.job_attempts
+        )
+        outbox.send_message(
+            user.chat_id,
+            branded(
+                f"♻️ The bot was restarted. Your wallet generation for '{pattern}' has been resumed.\n\n"
+                f"Searched so far: ~{user.job_attempts:,} keys in {format_time_estimate(user.job_seconds)}."
+                + (f" Found {user.found_count}/{user.job_count}." if user.job_count > 1 else "")),
+            parse_mode="MarkdownV2"
+        )
+        submit_generation_job(
+            user.chat_id,
+            pattern,
+            user.job_mode,
+            user.job_ignore_case,
+            attempts=user.job_attempts,
+            run_seconds=user.job_seconds,
+            count=user.job_count,
+            found=user.found_count
+        )
+
+def suspend_jobs():
+    # On shutdown: stops this process's grinders but keeps their jobs persisted, so the next start resumes them
+    jobs = list(grind_scheduler.running) + [entry[2] for entry in grind_scheduler.queue]
+    for job in jobs:
+        with user_data[job.chat_id].lock:
+            if owns_job(job):
+                checkpoint_job(job)
+            runtime.clear(job.chat_id)  # Exit handlers now leave the persisted job alone
+    for job in reversed(jobs):  # Queued jobs first, so cancelling a running one does not start them
+        grind_scheduler.cancel(job)
+
+def run_webhook_worker(index, updates):
+    # Body of one webhook worker process: handles its chats' updates on a bounded pool, each chat's in arrival order
+    bot.threaded = False  # ChatExecutor provides the threads; telebot's own pool would not keep a chat's updates in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The ingress process coordinates shutdown
+    start_metrics_server(METRICS_PORT + index if METRICS_PORT else 0)
+    resume_interrupted_jobs(lambda chat_id: chat_id % WEBHOOK_WORKERS == index)
+    ai_runtime.submit(ai_helper.warm_up)
+    threading.Thread(target=prepare_generators, args=(index == 0,), name="prepare-generators", daemon=True).start()
+    handlers = ChatExecutor(lambda raw: bot.process_new_updates([telebot.types.Update.de_json(raw)]))
+    while True:
+        raw = updates.get()
+        if raw is None:
+            break
+        try:
+            handlers.submit(raw)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Ignoring malformed update in worker {index}: {e}")
+    handlers.shutdown()
+    suspend_jobs()
+    grind_pool.shutdown()
+    grind_cluster.shutdown()
+    outbox.flush(timeout=10)
+
+def split_core_budget(workers):
+    # Each webhook worker runs its own scheduler, grinder pool and outbox, so they share the host's cores
+    # and the bot's Telegram rate limit
+    os.environ["GRIND_CORE_BUDGET"] = str(max(1, GRIND_CORE_BUDGET // workers))
+    os.environ["GRIND_WORKERS"] = str(max(1, GRIND_WORKERS // workers))
+    os.environ["OUTBOX_GLOBAL_RATE"] = str(OUTBOX_GLOBAL_RATE / workers)
+
+def run_webhook():
+    split_core_budget(WEBHOOK_WORKERS)
+    ingress = WebhookIngress(run_webhook_worker)
+    ingress.start()
+    bot.set_webhook(url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET or None)
+    print(f"{BRAND_EMOJI} {BOT_NAME} is receiving updates at {WEBHOOK_URL}")
+    ingress.serve_forever()
+
+def run_polling():
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # Stop cleanly on deploys, like Ctrl-C
+    start_metrics_server()
+    resume_interrupted_jobs()
+    ai_runtime.submit(ai_helper.warm_up)
+    threading.Thread(target=prepare_generators, name="prepare-generators", daemon=True).start()
     while True:
         try:
             print(f"{BRAND_EMOJI} {BOT_NAME} is starting...")
+            bot.remove_webhook()  # Polling fails while a webhook is registered
             bot.infinity_polling(timeout=60, long_polling_timeout=60)
+            break  # Only returns when interrupted
         except Exception as e:
             print(f"Error in main loop: {e}")
             time.sleep(5)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)  # Process managers may signal twice; let the cleanup finish
+    suspend_jobs()
+    grind_pool.shutdown()
+    grind_cluster.shutdown()
+    outbox.flush(timeout=10)
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    if BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        run_polling()
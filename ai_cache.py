@@ -0,0 +1,134 @@
+import os
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from patterns import is_base58
+
+# --- AI Cache Settings ---
+AI_CACHE_SIZE = int(os.environ.get("AI_CACHE_SIZE", 256))  # Answers kept for repeated questions
+AI_CACHE_TTL = int(os.environ.get("AI_CACHE_TTL", 24 * 3600))  # Seconds an answer is reused before the model is asked again
+SUGGESTION_POOL_SIZE = int(os.environ.get("SUGGESTION_POOL_SIZE", 60))  # Validated pattern suggestions kept ready
+SUGGESTION_POOL_LOW = int(os.environ.get("SUGGESTION_POOL_LOW", 20))  # Refill in the background below this many fresh ones
+SUGGESTION_TTL = int(os.environ.get("SUGGESTION_TTL", 6 * 3600))  # Seconds a suggestion stays in the pool
+SUGGESTION_MAX_LENGTH = 5
+REFILL_ROUNDS = 5  # Model calls per refill at most, in case it keeps repeating itself
+REFILL_BACKOFF = 60  # Seconds before a failed refill is retried
+REFRESH_MARGIN = 0.1  # Suggestions in the last tenth of their TTL no longer count as fresh, so refills start before they expire
+
+
+def normalize_prompt(text):
+    # "What characters are VALID?" and "what characters are valid" share one cache entry
+    return " ".join(text.lower().split()).rstrip("?!.")
+
+
+def valid_suggestion(pattern):
+    return 0 < len(pattern) <= SUGGESTION_MAX_LENGTH and is_base58(pattern)
+
+
+# --- TTL Cache ---
+class TTLCache:
+    # LRU cache whose entries also expire; lives on the AI event loop, so concurrent requests for the same
+    # key share one call instead of each asking the model
+    def __init__(self, maxsize=AI_CACHE_SIZE, ttl=AI_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires, value)
+        self.pending = {}  # key -> task of the call that will fill it
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.time():
+            self.entries.pop(key, None)
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value):
+        self.entries[key] = (time.time() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def get_or_call(self, key, async_func, *args):
+        # Errors are raised to every waiter and nothing is cached, so the next request tries again
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        task = self.pending.get(key)
+        if task is None:
+            task = self.pending[key] = asyncio.ensure_future(async_func(*args))
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)  # A caller timing out does not cancel the call for the others
+
+    def _finish(self, key, task):
+        self.pending.pop(key, None)
+        if not task.cancelled() and task.exception() is None and task.result():
+            self.put(key, task.result())
+
+
+# --- Suggestion Pool ---
+class SuggestionPool:
+    # Pattern suggestions fetched ahead of time and validated, so the suggestion button answers from memory.
+    # Lives on the AI event loop; fetch() is a coroutine returning a list of raw suggestions from the model.
+    def __init__(self, fetch, size=SUGGESTION_POOL_SIZE, low=SUGGESTION_POOL_LOW, ttl=SUGGESTION_TTL):
+        self.fetch = fetch
+        self.size = size
+        self.low = low
+        self.ttl = ttl
+        self.items = {}  # pattern -> time it expires
+        self._refill = None
+        self._first_round = None  # Event set once the running refill has added its first suggestions
+        self._failed_at = 0
+
+    async def take(self, count):
+        # Up to `count` random suggestions. They stay in the pool, which only loses entries to the TTL, so every
+        # click is answered from memory; waits for the model only when the pool is empty, and then only for the
+        # refill's first round; the rest of the refill carries on in the background.
+        self._expire()
+        if not self.items:
+            self.refill()
+            if self._refill is not None:
+                await self._first_round.wait()
+        elif self._fresh() < self.low:
+            self.refill()
+        return random.sample(list(self.items), min(count, len(self.items)))
+
+    def refill(self):
+        # Starts a background refill unless one is running or the last one failed moments ago
+        if self._refill is not None or time.time() - self._failed_at < REFILL_BACKOFF:
+            return
+        self._first_round = asyncio.Event()
+        self._refill = asyncio.ensure_future(self._run_refill())
+
+    async def _run_refill(self):
+        try:
+            for _ in range(REFILL_ROUNDS):
+                if self._fresh() >= self.size:
+                    break
+                expires = time.time() + self.ttl
+                for pattern in await self.fetch():
+                    if valid_suggestion(pattern):
+                        self.items[pattern] = expires  # A repeated suggestion gets a new lease
+                if self.items:
+                    self._first_round.set()
+        except Exception as e:
+            self._failed_at = time.time()
+            print(f"Error refilling AI suggestions: {e}")
+        finally:
+            self._first_round.set()  # Waiters get whatever there is, possibly nothing after an error
+            self._refill = None
+
+    def _fresh(self):
+        cutoff = time.time() + self.ttl * REFRESH_MARGIN
+        return sum(1 for expires in self.items.values() if expires > cutoff)
+
+    def _expire(self):
+        now = time.time()
+        for pattern, expires in list(self.items.items()):
+            if expires < now:
+                del self.items[pattern]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Stand-in for `solana-keygen grind` with controllable runtime and output.
+
+    SOLANA_KEYGEN_PATH=benchmarks/fake_keygen.py GRIND_BACKEND=solana-keygen python Bot_Script.py
+
+Prints "Searched N keypairs in Xs" lines like the real tool and writes the requested number of keypair
+files for the pattern to the working directory, the last one after FAKE_KEYGEN_SECONDS. Settings come from the environment
+because the bot passes the real tool's arguments:
+
+    FAKE_KEYGEN_RATE      keys/sec it reports (default 100000)
+    FAKE_KEYGEN_SECONDS   seconds until it "finds" a match, -1 to search forever (default 5)
+    FAKE_KEYGEN_INTERVAL  seconds between progress lines (default 1)
+    FAKE_KEYGEN_SILENT    set to 1 to print no progress at all, e.g. to test stall detection
+"""
+import json
+import os
+import random
+import sys
+import time
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+RATE = float(os.environ.get("FAKE_KEYGEN_RATE", 100000))
+SECONDS = float(os.environ.get("FAKE_KEYGEN_SECONDS", 5))
+INTERVAL = float(os.environ.get("FAKE_KEYGEN_INTERVAL", 1))
+SILENT = os.environ.get("FAKE_KEYGEN_SILENT") == "1"
+
+
+def requested_pattern(args):
+    # (prefix, suffix, count) of the --starts-with / --ends-with / --starts-and-ends-with argument
+    prefix = suffix = ""
+    count = 1
+    for flag, value in zip(args, args[1:]):
+        if flag == "--starts-with":
+            prefix, count = value.rsplit(":", 1)
+        elif flag == "--ends-with":
+            suffix, count = value.rsplit(":", 1)
+        elif flag == "--starts-and-ends-with":
+            prefix, suffix, count = value.split(":")[:3]
+    return prefix, suffix, int(count)
+
+
+def write_keypair(prefix, suffix):
+    filler = "".join(random.choices(BASE58_ALPHABET, k=44 - len(prefix) - len(suffix)))
+    address = prefix + filler + suffix
+    with open(f"{address}.json", "w") as key_file:
+        json.dump([random.randrange(256) for _ in range(64)], key_file)
+    print(f"Wrote keypair to {address}.json", flush=True)
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--version"]:
+        print("solana-keygen 1.18.0 (fake)")
+        return
+    if args[:1] != ["grind"]:
+        print(f"fake_keygen: unsupported command {args}", file=sys.stderr)
+        sys.exit(2)
+
+    # Matches are spread evenly over FAKE_KEYGEN_SECONDS
+    prefix, suffix, count = requested_pattern(args)
+    started = time.time()
+    found = 0
+    while found < count:
+        due = SECONDS * (found + 1) / count
+        while SECONDS < 0 or time.time() - started < due:
+            time.sleep(INTERVAL if SECONDS < 0 else max(0.0, min(INTERVAL, due - (time.time() - started))))
+            elapsed = time.time() - started
+            if not SILENT:
+                print(f"Searched {int(elapsed * RATE)} keypairs in {int(elapsed)}s. {found} matches found.", flush=True)
+        write_keypair(prefix, suffix)
+        found += 1
+
+
+if __name__ == "__main__":
+    main()
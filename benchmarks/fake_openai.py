@@ -0,0 +1,95 @@
+"""Local stand-in for the OpenAI chat completions API, with configurable latency.
+
+    python benchmarks/fake_openai.py --port 8082 --latency 0.8 --jitter 0.4
+    OPENAI_BASE_URL=http://127.0.0.1:8082/v1 python Bot_Script.py
+
+Requests for pattern suggestions get a comma separated list of short patterns, a few of them invalid
+base58 on purpose; every other request gets a canned answer. The number of calls is printed on exit.
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+INVALID_PATTERNS = ["0x", "IO", "lol", "Solana"]
+
+
+class FakeOpenAI:
+    def __init__(self, port=8082, latency=0.5, jitter=0.0):
+        self.latency = latency  # Seconds every completion takes
+        self.jitter = jitter  # Up to this many extra seconds, at random
+        self.calls = Counter()  # "suggestion" / "answer" -> requests served
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.server.daemon_threads = True
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-openai", daemon=True).start()
+        print(f"Fake OpenAI API on http://127.0.0.1:{self.server.server_port}/v1")
+
+    def complete(self, request):
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        system = next((m["content"] for m in request.get("messages", []) if m["role"] == "system"), "")
+        kind = "suggestion" if "patterns" in system and "separated by commas" in system else "answer"
+        with self._lock:
+            self.calls[kind] += 1
+        if kind == "suggestion":
+            patterns = ["".join(random.choices(BASE58_ALPHABET, k=random.choice((1, 2, 2, 3, 4)))) for _ in range(8)]
+            content = ", ".join(patterns + random.sample(INVALID_PATTERNS, 2))
+        else:
+            content = "Patterns use Base58 characters: 1-9, A-Z and a-z, except 0, I, O and l."
+        return {
+            "id": f"chatcmpl-{next(self._ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                payload = json.dumps(fake.complete(request)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds every completion takes")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds, at random")
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(args.port, args.latency, args.jitter)
+    fake.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("OpenAI calls:", dict(fake.calls))
+
+
+if __name__ == "__main__":
+    main()
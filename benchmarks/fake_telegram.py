@@ -0,0 +1,192 @@
+"""Local stand-in for the Telegram Bot API, for running the bot offline.
+
+Start it, point the bot at it and, in webhook mode, let it post synthetic updates:
+
+    python benchmarks/fake_telegram.py --port 8081 --webhook-url http://127.0.0.1:8443/ --chats 50 --updates 5
+    TELEGRAM_API_URL=http://127.0.0.1:8081 BOT_MODE=webhook WEBHOOK_URL=http://127.0.0.1:8443/ python Bot_Script.py
+
+It answers every Bot API method the bot uses, records each call and, once the updates are sent, prints
+the calls per method and the latency from each update to the bot's next reply in that chat.
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+import urllib.request
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+class FakeTelegram:
+    def __init__(self, port=8081):
+        self.calls = Counter()
+        self.sent_at = defaultdict(deque)  # chat_id -> (time, label) of updates posted and waiting for a reply
+        self.latencies = defaultdict(list)  # label -> seconds from update to the bot's next call for that chat
+        self.replies = Counter()  # chat_id -> updates answered
+        self.callbacks = {}  # callback_query_id -> chat_id, answerCallbackQuery carries no chat
+        self.webhook_url = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Condition()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self.server.daemon_threads = True
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-telegram", daemon=True).start()
+        print(f"Fake Telegram API on http://127.0.0.1:{self.server.server_port}")
+
+    def api(self, method, params):
+        with self._lock:
+            self.calls[method] += 1
+            chat_id = params.get("chat_id")
+            if method == "answerCallbackQuery":
+                chat_id = self.callbacks.pop(params.get("callback_query_id"), None)
+            if method in ("sendMessage", "editMessageText", "answerCallbackQuery") and chat_id is not None:
+                waiting = self.sent_at.get(int(chat_id))
+                if waiting:
+                    sent, label = waiting.popleft()
+                    self.latencies[label].append(time.time() - sent)
+                    self.replies[int(chat_id)] += 1
+                    self._lock.notify_all()
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+        if method == "setWebhook":
+            self.webhook_url = params.get("url")
+            return True
+        if method == "getUpdates":
+            time.sleep(1)  # Long polling with nothing to deliver
+            return []
+        if method in ("sendMessage", "editMessageText"):
+            return {
+                "message_id": next(self._ids),
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+    def message_update(self, chat_id, text):
+        return {
+            "update_id": next(self._ids),
+            "message": {
+                "message_id": next(self._ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+                "text": text,
+            },
+        }
+
+    def callback_update(self, chat_id, data):
+        return {
+            "update_id": next(self._ids),
+            "callback_query": {
+                "id": str(next(self._ids)),
+                "chat_instance": str(chat_id),
+                "data": data,
+                "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+                "message": {"message_id": next(self._ids), "date": int(time.time()), "chat": {"id": chat_id, "type": "private"}, "text": "menu"},
+            },
+        }
+
+    def post(self, url, update, label):
+        # Delivers one update to the bot's webhook; the bot's next call for that chat is its reply
+        chat_id = (update.get("message") or update["callback_query"]["message"])["chat"]["id"]
+        with self._lock:
+            if "callback_query" in update:
+                self.callbacks[update["callback_query"]["id"]] = chat_id
+            self.sent_at[chat_id].append((time.time(), label))
+        request = urllib.request.Request(url, json.dumps(update).encode(), {"Content-Type": "application/json"})
+        urllib.request.urlopen(request, timeout=10).read()
+
+    def wait_for_reply(self, chat_id, count, timeout):
+        # Waits until `count` updates of the chat have been answered; returns whether they were
+        deadline = time.time() + timeout
+        with self._lock:
+            while self.replies[chat_id] < count:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def post_updates(self, url, chats, updates_per_chat, text):
+        # Sends `updates_per_chat` messages from each of `chats` users, interleaved across chats
+        started = time.time()
+        for round_number in range(updates_per_chat):
+            for chat_id in range(1, chats + 1):
+                self.post(url, self.message_update(chat_id, text), text)
+        return time.time() - started
+
+    def report(self):
+        with self._lock:
+            latencies = {label: sorted(values) for label, values in self.latencies.items()}
+            unanswered = Counter(label for waiting in self.sent_at.values() for _, label in waiting)
+        print("Bot API calls:", dict(self.calls))
+        for label in sorted(set(latencies) | set(unanswered)):
+            values = latencies.get(label, [])
+            if values:
+                p50 = values[len(values) // 2]
+                p95 = values[int(len(values) * 0.95)]
+                p99 = values[int(len(values) * 0.99)]
+                timing = f"p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms"
+            else:
+                timing = "no replies"
+            print(f"{label}: {len(values)} replies, {timing}, unanswered {unanswered[label]}")
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                url = urlparse(self.path)
+                method = url.path.rstrip("/").rsplit("/", 1)[-1]
+                params = dict(parse_qsl(url.query))
+                length = int(self.headers.get("Content-Length", 0))
+                if length:
+                    body = self.rfile.read(length).decode()
+                    if self.headers.get("Content-Type", "").startswith("application/json"):
+                        params.update(json.loads(body))
+                    else:
+                        params.update(parse_qsl(body))
+                payload = json.dumps({"ok": True, "result": fake.api(method, params)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--webhook-url", help="Post updates here; defaults to the URL the bot registers with setWebhook")
+    parser.add_argument("--chats", type=int, default=0, help="Simulated users (0 only serves the API)")
+    parser.add_argument("--updates", type=int, default=1, help="Messages sent by each user")
+    parser.add_argument("--text", default="/start")
+    parser.add_argument("--wait", type=float, default=10, help="Seconds to wait for replies before reporting")
+    args = parser.parse_args()
+
+    fake = FakeTelegram(args.port)
+    fake.start()
+    if not args.chats:
+        threading.Event().wait()
+    while not (args.webhook_url or fake.webhook_url):
+        time.sleep(0.2)  # Wait for the bot to register its webhook
+    url = args.webhook_url or fake.webhook_url
+    elapsed = fake.post_updates(url, args.chats, args.updates, args.text)
+    print(f"Posted {args.chats * args.updates} updates in {elapsed:.2f}s")
+    time.sleep(args.wait)
+    fake.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Offline load test: runs the bot against local stand-ins for Telegram, OpenAI and solana-keygen.
+
+    python benchmarks/load_test.py --chats 1000 --concurrency 100
+    python benchmarks/load_test.py --chats 200 --backend solana-keygen --keygen-seconds 2 --grind-seconds 5
+
+The bot is started in webhook mode in a scratch directory. Every simulated chat goes through /start,
+the AI suggestion button, one suggested pattern, /stop and /ask, waiting for the bot's reply to each
+step like a user would. The report lists reply latency percentiles per step, throughput, the peak
+threads and memory of all the bot's processes, OpenAI calls made and, with --grind-seconds, the key
+rate of each grinding backend measured before the bot starts.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_openai import FakeOpenAI
+from fake_telegram import FakeTelegram
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+BOT_SCRIPT = os.path.join(REPO_DIR, "Bot_Script.py")
+FAKE_KEYGEN = os.path.join(BENCHMARKS_DIR, "fake_keygen.py")
+SAMPLE_INTERVAL = 0.5  # Seconds between samples of the bot's threads and memory
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_tree(pid):
+    # pid and all its descendants, read from /proc
+    children = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue  # Exited while we were looking
+        children[ppid].append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children[current])
+    return tree
+
+
+def tree_usage(pid):
+    # (processes, threads, resident memory in MB) of the process tree
+    processes = threads = rss_kb = 0
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/status") as status:
+                fields = dict(line.split(":", 1) for line in status if ":" in line)
+        except OSError:
+            continue
+        processes += 1
+        threads += int(fields.get("Threads", 0))
+        rss_kb += int(fields.get("VmRSS", "0 kB").split()[0])
+    return processes, threads, rss_kb / 1024
+
+
+class UsageSampler:
+    # Records the peak usage of the bot's process tree while the load runs
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak = (0, 0, 0.0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="usage-sampler", daemon=True)
+
+    def start(self):
+        if os.path.isdir("/proc"):
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            usage = tree_usage(self.pid)
+            self.peak = tuple(max(a, b) for a, b in zip(self.peak, usage))
+
+
+def measure_backends(seconds, keygen_path, threads):
+    # Keys/sec of the native pool and of one solana-keygen process, measured in this process
+    sys.path.insert(0, REPO_DIR)
+    from grinder import GrindPool, measure_keygen_rate, native_backend_available
+
+    if native_backend_available():
+        pool = GrindPool()
+        try:
+            print(f"native ({pool.workers} workers): {pool.benchmark(seconds):,.0f} keys/sec")
+        finally:
+            pool.shutdown()
+    else:
+        print("native: PyNaCl is not installed")
+    os.environ.setdefault("FAKE_KEYGEN_SECONDS", "-1")  # The fake must not finish and write a key file here
+    rate = measure_keygen_rate(keygen_path, threads, seconds)
+    print(f"solana-keygen ({keygen_path}, {threads} threads): " + (f"{rate:,.0f} keys/sec" if rate else "no progress output"))
+
+
+def scenario(pattern):
+    # (label, update kind, payload) steps every simulated chat goes through
+    return [
+        ("/start", "message", "/start"),
+        ("AI suggestion", "callback", "generate_ai_pattern"),
+        ("suggested pattern", "callback", f"suggestion:0:{pattern}"),
+        ("/stop", "message", "/stop"),
+        ("/ask", "message", "/ask What characters are valid?"),
+    ]
+
+
+def run_chat(telegram, url, chat_id, steps, timeout, think):
+    for count, (label, kind, payload) in enumerate(steps, start=1):
+        if kind == "message":
+            update = telegram.message_update(chat_id, payload)
+        else:
+            update = telegram.callback_update(chat_id, payload)
+        telegram.post(url, update, label)
+        if not telegram.wait_for_reply(chat_id, count, timeout):
+            return False
+        time.sleep(think)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=200, help="Simulated users")
+    parser.add_argument("--concurrency", type=int, default=50, help="Users active at the same time")
+    parser.add_argument("--workers", type=int, default=2, help="WEBHOOK_WORKERS of the bot")
+    parser.add_argument("--backend", default="native", choices=("native", "solana-keygen"))
+    parser.add_argument("--pattern", default="ab", help="Suggested pattern every user picks")
+    parser.add_argument("--think", type=float, default=0.0, help="Seconds a user waits between steps")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds to wait for each reply")
+    parser.add_argument("--ai-latency", type=float, default=0.5, help="Seconds every OpenAI completion takes")
+    parser.add_argument("--ai-jitter", type=float, default=0.5, help="Up to this many extra seconds per completion")
+    parser.add_argument("--keygen", default=os.environ.get("SOLANA_KEYGEN_PATH", FAKE_KEYGEN), help="solana-keygen binary, the fake by default")
+    parser.add_argument("--keygen-seconds", type=float, default=5, help="Seconds the fake solana-keygen takes to find a match")
+    parser.add_argument("--grind-seconds", type=float, default=0, help="Measure each backend's keys/sec for this long first")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    if args.grind_seconds:
+        measure_backends(args.grind_seconds, args.keygen, os.cpu_count() or 1)
+
+    telegram = FakeTelegram(0)
+    telegram.start()
+    openai = FakeOpenAI(0, args.ai_latency, args.ai_jitter)
+    openai.start()
+    webhook_port = free_port()
+    workdir = tempfile.mkdtemp(prefix="namegen-load-")
+    env = dict(
+        os.environ,
+        BOT_TOKEN="123456:load-test",
+        BOT_MODE="webhook",
+        TELEGRAM_API_URL=f"http://127.0.0.1:{telegram.server.server_port}",
+        OPENAI_API_KEY="load-test",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{openai.server.server_port}/v1",
+        WEBHOOK_URL=f"http://127.0.0.1:{webhook_port}/",
+        WEBHOOK_HOST="127.0.0.1",
+        WEBHOOK_PORT=str(webhook_port),
+        WEBHOOK_SECRET="",
+        WEBHOOK_WORKERS=str(args.workers),
+        GRIND_BACKEND=args.backend,
+        SOLANA_KEYGEN_PATH=args.keygen,
+        FAKE_KEYGEN_SECONDS=str(args.keygen_seconds),
+        SESSION_DB_PATH=os.path.join(workdir, "sessions.db"),
+        INVENTORY_KEY="",
+    )
+    log_path = os.path.join(workdir, "bot.log")
+    with open(log_path, "w") as log:
+        bot = subprocess.Popen([sys.executable, BOT_SCRIPT], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    print(f"Bot started (pid {bot.pid}), log in {log_path}")
+
+    try:
+        deadline = time.time() + args.startup_timeout
+        while telegram.webhook_url is None:
+            if bot.poll() is not None or time.time() > deadline:
+                print("The bot did not register its webhook, see its log")
+                return 1
+            time.sleep(0.2)
+
+        sampler = UsageSampler(bot.pid)
+        sampler.start()
+        steps = scenario(args.pattern)
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(
+                lambda chat_id: run_chat(telegram, telegram.webhook_url, chat_id, steps, args.timeout, args.think),
+                range(1, args.chats + 1)
+            ))
+        elapsed = time.time() - started
+        sampler.stop()
+    finally:
+        bot.send_signal(signal.SIGTERM)
+        try:
+            bot.wait(60)
+        except subprocess.TimeoutExpired:
+            bot.kill()
+
+    updates = sum(len(values) for values in telegram.latencies.values())
+    processes, threads, rss_mb = sampler.peak
+    print()
+    telegram.report()
+    print(f"Chats completed: {sum(results)}/{args.chats} in {elapsed:.1f}s, {updates / elapsed:,.1f} replies/sec")
+    print(f"Peak bot usage: {processes} processes, {threads} threads, {rss_mb:,.0f} MB resident")
+    print("OpenAI calls:", dict(openai.calls))
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Runs a grind cluster on this machine: several grind_worker.py daemons on Unix sockets and a coordinator.
+
+    python benchmarks/local_cluster.py --nodes 3 --pattern abc --count 3
+    python benchmarks/local_cluster.py --nodes 3 --pattern abcd --kill-after 5
+
+Each worker gets --workers pool processes. The coordinator submits one job to all of them and reports every
+hit as it arrives, the keys/sec each worker announced and reports in its heartbeats, and the job's total
+attempts. With --kill-after one worker is killed mid-job to show its share being dropped while the others
+carry on; --restart starts it again so the job is assigned to it once more.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+WORKER_SCRIPT = os.path.join(REPO_DIR, "grind_worker.py")
+sys.path.insert(0, REPO_DIR)
+
+from cluster import GrindCoordinator
+from supervisor import HIT_LINE, PROGRESS_LINE
+
+
+def start_worker(address, workers, token, log_path):
+    env = dict(os.environ, GRIND_WORKERS=str(workers), GRIND_CLUSTER_TOKEN=token, BENCHMARK_SECONDS="1")
+    with open(log_path, "a") as log:
+        return subprocess.Popen([sys.executable, WORKER_SCRIPT, address], env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=3, help="Worker daemons to start")
+    parser.add_argument("--workers", type=int, default=1, help="Pool processes per worker daemon")
+    parser.add_argument("--pattern", default="abc")
+    parser.add_argument("--mode", default="starts_with", choices=("starts_with", "ends_with", "starts_and_ends_with"))
+    parser.add_argument("--ignore-case", action="store_true")
+    parser.add_argument("--count", type=int, default=1, help="Matching addresses to find")
+    parser.add_argument("--kill-after", type=float, default=0, help="Kill the first worker after this many seconds")
+    parser.add_argument("--restart", action="store_true", help="Start the killed worker again right away")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="grind-cluster-")
+    token = os.urandom(16).hex()
+    addresses = [f"unix://{os.path.join(workdir, f'node{index}.sock')}" for index in range(args.nodes)]
+    logs = [os.path.join(workdir, f"node{index}.log") for index in range(args.nodes)]
+    workers = [start_worker(address, args.workers, token, log) for address, log in zip(addresses, logs)]
+    print(f"Started {args.nodes} workers, logs in {workdir}")
+
+    coordinator = GrindCoordinator(",".join(addresses), token, heartbeat=1, node_timeout=5)
+    try:
+        coordinator.start()
+        connected = coordinator.wait_for_nodes(30)
+        print(f"{len(connected)}/{args.nodes} workers connected, {coordinator.capacity():,.0f} keys/sec announced")
+
+        job = coordinator.start_job(args.pattern, args.mode, args.ignore_case, args.count)
+        started = time.time()
+        killed = False
+        for line in job.stdout:
+            elapsed = time.time() - started
+            hit = HIT_LINE.search(line)
+            if hit:
+                result = job.take_result(hit.group(1))
+                print(f"{elapsed:6.1f}s  hit {result.pubkey} after {result.attempts:,} attempts")
+                result.wipe()
+            elif PROGRESS_LINE.search(line):
+                rates = ", ".join(f"{node.rate:,.0f}" for node in coordinator.connected())
+                print(f"{elapsed:6.1f}s  {job.attempts:,} attempts, worker keys/sec: {rates}")
+            if args.kill_after and not killed and elapsed >= args.kill_after:
+                killed = True
+                workers[0].kill()
+                workers[0].wait()
+                print(f"{elapsed:6.1f}s  killed worker 0")
+                if args.restart:
+                    workers[0] = start_worker(addresses[0], args.workers, token, logs[0])
+            if elapsed > args.timeout:
+                job.terminate()
+        job.wait()
+        elapsed = time.time() - started
+        outcome = "found" if job.returncode == 0 else f"ended with {job.returncode}: {job.stderr.read().strip()}"
+        print(f"Job {outcome} in {elapsed:.1f}s: {job.found}/{job.count} matches, {job.attempts:,} attempts, {job.attempts / elapsed:,.0f} keys/sec")
+    finally:
+        coordinator.shutdown()
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+    return 0 if job.returncode == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
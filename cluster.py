@@ -0,0 +1,448 @@
+import os
+import json
+import socket
+import ssl
+import select
+import ipaddress
+import threading
+import itertools
+import time
+import base58
+from grinder import NativeGrindJob, address_matches, crypto_sign_seed_keypair
+from patterns import split_pattern
+
+# --- Cluster Settings ---
+GRIND_NODES = os.environ.get("GRIND_NODES", "")  # Worker daemons for GRIND_BACKEND=cluster, e.g. "tls://10.0.0.5:7070,unix:///run/grind.sock"
+GRIND_CLUSTER_TOKEN = os.environ.get("GRIND_CLUSTER_TOKEN", "")  # Shared secret the bot presents to every worker daemon
+GRIND_TLS_CA = os.environ.get("GRIND_TLS_CA", "")  # Bot: certificates tls:// workers are verified against (e.g. their self-signed ones); system CAs when empty
+GRIND_TLS_CERT = os.environ.get("GRIND_TLS_CERT", "")  # Worker: certificate served on a tls:// listen address
+GRIND_TLS_KEY = os.environ.get("GRIND_TLS_KEY", "")  # Worker: private key of GRIND_TLS_CERT
+GRIND_ALLOW_PLAINTEXT = os.environ.get("GRIND_ALLOW_PLAINTEXT", "0") == "1"  # Allow tcp:// beyond this machine, e.g. inside a VPN; hits carry private keys
+GRIND_LOCAL_FALLBACK = os.environ.get("GRIND_LOCAL_FALLBACK", "1") == "1"  # Grind on the bot's own pool while no worker is connected, instead of queueing
+HEARTBEAT_SECONDS = float(os.environ.get("GRIND_HEARTBEAT_SECONDS", 2))  # Both sides send a heartbeat this often
+NODE_TIMEOUT = float(os.environ.get("GRIND_NODE_TIMEOUT", 10))  # A peer silent this long is dead; its jobs go back to the others
+RECONNECT_SECONDS = float(os.environ.get("GRIND_RECONNECT_SECONDS", 5))  # Pause before dialing a lost worker again
+MAX_MESSAGE_BYTES = 65536
+
+
+# --- Wire Protocol ---
+# Newline-delimited JSON objects, each with an "op", over a Unix socket, TLS, or plain TCP on loopback (anywhere else only
+# with GRIND_ALLOW_PLAINTEXT, because hits carry private keys). The bot dials every worker and sends
+#   hello {token}, start {job, pattern, mode, ignore_case, count, paused}, cancel / pause / resume {job}, ping
+# and the worker answers
+#   hello {node, workers, rate}, heartbeat {rate, jobs: {job: attempts}}, hit {job, address, secret, attempts},
+#   done {job, returncode, error}, error {error}
+def parse_address(address):
+    # "unix:///run/grind.sock", "tls://host:port" or "tcp://host:port" (the scheme may be left out for TCP)
+    # -> (family, sockaddr, tls)
+    address = address.strip()
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):], False
+    tls = address.startswith("tls://")
+    if tls or address.startswith("tcp://"):
+        address = address.split("://", 1)[1]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid grind node address: {address!r}")
+    return socket.AF_INET6 if ":" in host else socket.AF_INET, (host.strip("[]"), int(port)), tls
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # A host name, which may resolve to anywhere
+
+
+def check_plaintext(family, sockaddr, tls, allow=GRIND_ALLOW_PLAINTEXT):
+    # Hits carry private keys, so unencrypted TCP stays on this machine unless the operator opted in
+    if family != socket.AF_UNIX and not tls and not allow and not is_loopback(sockaddr[0]):
+        raise ValueError(
+            f"plain tcp:// to {sockaddr[0]} would send private keys unencrypted; "
+            "use tls://, a unix:// socket or set GRIND_ALLOW_PLAINTEXT=1"
+        )
+
+
+def client_context():
+    # Verifies tls:// workers against GRIND_TLS_CA, or the system CAs when it is not set
+    return ssl.create_default_context(cafile=GRIND_TLS_CA or None)
+
+
+def server_context():
+    if not GRIND_TLS_CERT:
+        raise ValueError("tls:// listen addresses need GRIND_TLS_CERT and GRIND_TLS_KEY")
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(GRIND_TLS_CERT, GRIND_TLS_KEY or None)
+    return context
+
+
+def parse_addresses(text):
+    return [address.strip() for address in text.split(",") if address.strip()]
+
+
+def connect(address, timeout=NODE_TIMEOUT):
+    family, sockaddr, tls = parse_address(address)
+    check_plaintext(family, sockaddr, tls)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(sockaddr)
+        if tls:
+            sock = client_context().wrap_socket(sock, server_hostname=sockaddr[0])
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def listen(address):
+    # A listening socket; connections accepted on a tls:// address still have to be wrapped with server_context()
+    family, sockaddr, tls = parse_address(address)
+    check_plaintext(family, sockaddr, tls)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    if family == socket.AF_UNIX:
+        if os.path.exists(sockaddr):
+            os.unlink(sockaddr)  # Left behind by a previous run
+    else:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(sockaddr)
+    if family == socket.AF_UNIX:
+        os.chmod(sockaddr, 0o600)  # Hits carry private keys
+    sock.listen()
+    return sock
+
+
+class Channel:
+    # One peer connection; send() may be called from any thread, receive() from one reader thread. The reader waits
+    # for data outside the lock but reads under it, because a TLS connection must not be used by two threads at once.
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = b""
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        data = (json.dumps(message) + "\n").encode()
+        with self._lock:
+            self.sock.sendall(data)
+
+    def receive(self):
+        # The next message, or None once the peer has closed the connection. Timeouts raise socket.timeout.
+        while b"\n" not in self.buffer:
+            if len(self.buffer) >= MAX_MESSAGE_BYTES:
+                raise ValueError("Message too long")
+            buffered = isinstance(self.sock, ssl.SSLSocket) and self.sock.pending()  # Decrypted but not yet read
+            if not buffered and not select.select([self.sock], [], [], self.sock.gettimeout())[0]:
+                raise socket.timeout("timed out")
+            with self._lock:
+                data = self.sock.recv(MAX_MESSAGE_BYTES)
+            if not data:
+                return None
+            self.buffer += data
+        line, _, self.buffer = self.buffer.partition(b"\n")
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def valid_hit(job, address, secret):
+    # A worker's keypair is only accepted if its public half is the announced address and that address matches the job
+    if len(secret) != 64 or base58.b58encode(secret[32:]).decode() != address:
+        return False
+    if crypto_sign_seed_keypair is not None and crypto_sign_seed_keypair(bytes(secret[:32]))[0] != bytes(secret[32:]):
+        return False
+    return address_matches(address, job.prefix, job.suffix, job.ignore_case)
+
+
+# --- Cluster Job ---
+class ClusterJob(NativeGrindJob):
+    # A job ground by every connected worker at once. Key search is random, so "splitting" a job means each worker
+    # searches independently and the rates add up; the coordinator feeds their attempts and hits in through _record.
+    def __init__(self, coordinator, job_id, pattern, mode, ignore_case, count=1):
+        prefix, suffix = split_pattern(pattern, mode)
+        super().__init__(coordinator, prefix, suffix, ignore_case, count)
+        self.id = job_id
+        self.pattern = pattern
+        self.mode = mode
+        self.node_attempts = {}  # Node -> attempts its current assignment has reported
+
+    def _finish(self, stdout="", stderr="", returncode=0):
+        super()._finish(stdout, stderr, returncode)
+        self.pool.release(self)
+
+    def pause(self):
+        self.paused = True
+        self.pool.broadcast(self, "pause")
+
+    def resume(self):
+        super().resume()  # Wakes the fallback pool in case it is grinding the job while no worker is connected
+        self.pool.broadcast(self, "resume")
+
+
+class Node:
+    def __init__(self, address):
+        self.address = address
+        self.name = address
+        self.channel = None
+        self.workers = 0
+        self.capacity = 0.0  # Keys/sec the worker measured at startup
+        self.rate = 0.0  # Keys/sec it reported in its last heartbeat
+        self.jobs = set()  # Ids of the jobs assigned to it on this connection
+        self.last_error = None
+
+
+# --- Grind Coordinator ---
+class GrindCoordinator:
+    # Farms jobs out to grind worker daemons (grind_worker.py). Every running job is assigned to every connected
+    # worker; the first hits to reach the job's count finish it and the other workers are told to cancel. A worker
+    # that disconnects or misses heartbeats for NODE_TIMEOUT is dropped, and its jobs are assigned again as soon
+    # as any worker is connected. Until then a job without workers is ground by the fallback pool if there is one,
+    # or waits with a progress line every heartbeat so the bot does not take it for stalled.
+    def __init__(self, addresses=GRIND_NODES, token=GRIND_CLUSTER_TOKEN, heartbeat=HEARTBEAT_SECONDS, node_timeout=NODE_TIMEOUT,
+                 fallback=None):
+        self.nodes = [Node(address) for address in parse_addresses(addresses)]
+        self.token = token
+        self.heartbeat = heartbeat
+        self.node_timeout = node_timeout
+        self.fallback = fallback  # Local GrindPool for jobs no worker is grinding; None queues them
+        self.jobs = {}  # Job id -> ClusterJob until it finishes
+        self.local = set()  # Ids of the jobs the fallback pool is grinding
+        self.on_capacity = None  # Called with the connected workers' total keys/sec whenever it changes
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._started = False
+
+    def start(self):
+        # Dials every worker on its own daemon thread and keeps redialing lost ones
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for node in self.nodes:
+            threading.Thread(target=self._node_loop, args=(node,), name=f"grind-node-{node.address}", daemon=True).start()
+        threading.Thread(target=self._ping_loop, name="grind-cluster-ping", daemon=True).start()
+
+    def connected(self):
+        return [node for node in self.nodes if node.channel is not None]
+
+    def capacity(self):
+        return sum(node.capacity for node in self.connected())
+
+    def wait_for_nodes(self, timeout):
+        # Gives the workers a moment to connect, e.g. before the key rate is calibrated from their capacity
+        deadline = time.time() + timeout
+        while time.time() < deadline and len(self.connected()) < len(self.nodes):
+            time.sleep(0.1)
+        return self.connected()
+
+    def start_job(self, pattern, mode, ignore_case=False, count=1):
+        if not self.nodes:
+            raise RuntimeError("GRIND_BACKEND=cluster needs GRIND_NODES")
+        self.start()
+        job = ClusterJob(self, next(self._ids), pattern, mode, ignore_case, count)
+        with self._lock:
+            self.jobs[job.id] = job
+        for node in self.connected():
+            self._assign(node, job)
+        if not self._assigned(job):
+            self._unassigned(job)
+        return job
+
+    def release(self, job):
+        # The job finished or was stopped: whichever workers still grind it can stop
+        with self._lock:
+            self.jobs.pop(job.id, None)
+            self.local.discard(job.id)
+        self.broadcast(job, "cancel")
+
+    def broadcast(self, job, op):
+        with self._lock:
+            nodes = [node for node in self.connected() if job.id in node.jobs]
+            if op == "cancel":
+                for node in nodes:
+                    node.jobs.discard(job.id)
+        for node in nodes:
+            self._send(node, {"op": op, "job": job.id})
+
+    def wake(self):
+        # NativeGrindJob API; cluster jobs resume through broadcast(), the ones ground locally here
+        if self.fallback is not None:
+            self.fallback.wake()
+
+    def shutdown(self):
+        self._stopped.set()
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.terminate()
+        for node in self.nodes:
+            channel = node.channel
+            if channel is not None:
+                channel.close()
+
+    def _assigned(self, job):
+        with self._lock:
+            return any(job.id in node.jobs for node in self.connected())
+
+    def _unassigned(self, job):
+        # No connected worker grinds the job any more: grind it locally until one connects, if there is a fallback
+        with self._lock:
+            if self.fallback is None or self._stopped.is_set() or job.returncode is not None or job.id in self.local:
+                return
+            self.local.add(job.id)
+        print(f"No grind node available for job {job.id}, grinding it locally until one connects")
+        self.fallback.add_job(job)
+
+    def _assign(self, node, job):
+        with self._lock:
+            if job.returncode is not None or job.id in node.jobs:
+                return
+            node.jobs.add(job.id)
+            job.node_attempts[node] = 0
+            local = job.id in self.local
+            self.local.discard(job.id)
+        if local:
+            self.fallback.remove_job(job)  # Its attempts so far stay counted
+        self._send(node, {
+            "op": "start",
+            "job": job.id,
+            "pattern": job.pattern,
+            "mode": job.mode,
+            "ignore_case": job.ignore_case,
+            "count": job.count - job.found,
+            "paused": job.paused,
+        })
+
+    def _send(self, node, message):
+        channel = node.channel
+        if channel is None:
+            return
+        try:
+            channel.send(message)
+        except OSError as e:
+            if not self._stopped.is_set():
+                print(f"Error sending to grind node {node.name}: {e}")
+            channel.close()  # The reader thread sees the closed socket and drops the node
+
+    def _ping_loop(self):
+        while not self._stopped.wait(self.heartbeat):
+            for node in self.connected():
+                self._send(node, {"op": "ping"})
+            with self._lock:
+                jobs = [job for job in self.jobs.values() if job.id not in self.local]
+            for job in jobs:
+                if not self._assigned(job):
+                    job._record(0, None)  # Queued for a worker: a progress line keeps the bot's stall detection quiet
+
+    def _node_loop(self, node):
+        while not self._stopped.is_set():
+            channel = None
+            try:
+                channel = Channel(connect(node.address, self.node_timeout))
+                channel.send({"op": "hello", "token": self.token})
+                hello = channel.receive()
+                if not hello or hello.get("op") != "hello":
+                    raise ConnectionError((hello or {}).get("error", "connection closed during hello"))
+                self._attach(node, channel, hello)
+                while True:
+                    message = channel.receive()  # Times out after node_timeout without a heartbeat
+                    if message is None:
+                        break
+                    self._handle(node, message)
+            except (OSError, ValueError, ConnectionError) as e:
+                if str(e) != node.last_error and not self._stopped.is_set():  # Report each new problem once, not every redial
+                    print(f"Grind node {node.name} unavailable: {e}")
+                node.last_error = str(e)
+            finally:
+                if channel is not None:
+                    channel.close()
+                self._detach(node)
+            self._stopped.wait(RECONNECT_SECONDS)
+
+    def _attach(self, node, channel, hello):
+        node.name = hello.get("node") or node.address
+        node.workers = int(hello.get("workers", 0))
+        node.capacity = float(hello.get("rate", 0))
+        node.rate = 0.0
+        node.jobs = set()
+        node.channel = channel
+        node.last_error = None
+        print(f"Grind node {node.name} connected: {node.workers} workers, {node.capacity:,.0f} keys/sec")
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:  # Including any that lost their last worker while none was connected
+            self._assign(node, job)
+        self._capacity_changed()
+
+    def _detach(self, node):
+        if node.channel is None:
+            return
+        node.channel = None
+        with self._lock:
+            orphaned = [job for job in self.jobs.values() if job.id in node.jobs and job.returncode is None]
+            for job in orphaned:
+                job.node_attempts.pop(node, None)  # Its attempts so far stay counted
+            node.jobs = set()
+        waiting = [job for job in orphaned if not self._assigned(job)]
+        if not self._stopped.is_set():
+            print(f"Grind node {node.name} lost" + (f", {len(waiting)} jobs waiting for a worker" if waiting else ""))
+        for job in waiting:
+            self._unassigned(job)
+        self._capacity_changed()
+
+    def _capacity_changed(self):
+        if self.on_capacity is not None:
+            try:
+                self.on_capacity(self.capacity())
+            except Exception as e:
+                print(f"Error updating grind capacity: {e}")
+
+    def _progress(self, node, job, attempts):
+        # Workers report cumulative attempts per assignment; the job is fed the increase
+        with self._lock:
+            previous = job.node_attempts.get(node)
+            if previous is None or attempts <= previous:
+                return 0
+            job.node_attempts[node] = attempts
+        return attempts - previous
+
+    def _handle(self, node, message):
+        op = message.get("op")
+        job = self.jobs.get(message.get("job"))
+        if op == "heartbeat":
+            node.rate = float(message.get("rate", 0))
+            for job_id, attempts in message.get("jobs", {}).items():
+                job = self.jobs.get(int(job_id))
+                if job is not None:
+                    job._record(self._progress(node, job, int(attempts)), None)
+        elif op == "hit":
+            secret = bytearray(base58.b58decode(message.get("secret", "")))
+            try:
+                if job is None or job.returncode is not None:
+                    return  # Another worker already completed the job
+                if not valid_hit(job, message.get("address", ""), secret):
+                    print(f"Grind node {node.name} sent an invalid keypair for job {job.id}, ignoring it")
+                    return
+                job._record(self._progress(node, job, int(message.get("attempts", 0))), [(message["address"], bytes(secret))])
+            finally:
+                secret[:] = bytes(len(secret))
+        elif op == "done":
+            with self._lock:
+                node.jobs.discard(message.get("job"))
+            if job is None or job.returncode is not None:
+                return
+            if message.get("returncode") == 0:
+                self._assign(node, job)  # It found its share but the job still needs more, e.g. after a rejected hit
+            elif not any(job.id in other.jobs for other in self.connected()):
+                job._finish(stderr=message.get("error") or f"Grind node {node.name} failed\n", returncode=1)
+            else:
+                print(f"Grind node {node.name} failed job {job.id}: {message.get('error')}")
+        elif op == "error":
+            print(f"Grind node {node.name}: {message.get('error')}")
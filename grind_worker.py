@@ -0,0 +1,194 @@
+import os
+import sys
+import hmac
+import signal
+import socket
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()  # Same .env as the bot, so GRIND_CLUSTER_TOKEN and the grinder settings can live in one place
+
+from cluster import Channel, check_plaintext, listen, parse_address, server_context, GRIND_CLUSTER_TOKEN, HEARTBEAT_SECONDS, NODE_TIMEOUT
+from grinder import GrindPool, native_backend_available
+from supervisor import JobSupervisor
+
+# --- Worker Settings ---
+GRIND_WORKER_LISTEN = os.environ.get("GRIND_WORKER_LISTEN", "tcp://127.0.0.1:7070")  # Where this daemon accepts bot connections, tls:// beyond this machine; an argument overrides it
+GRIND_WORKER_NAME = os.environ.get("GRIND_WORKER_NAME", "")  # Shown in the bot's log, defaults to host and address
+
+
+class Assignment:
+    # One job a bot asked this worker to grind, with the local job grinding it
+    def __init__(self, session, job_id, process):
+        self.session = session
+        self.id = job_id
+        self.process = process
+        self.attempts = 0
+
+
+class Session:
+    # One connected bot process and the jobs it started here; they are all stopped when it goes away
+    def __init__(self, channel):
+        self.channel = channel
+        self.jobs = {}  # Job id -> Assignment
+        self.closed = threading.Event()
+
+    def send(self, message):
+        try:
+            self.channel.send(message)
+        except OSError as e:
+            print(f"Error sending to the bot: {e}")
+            self.channel.close()
+
+
+# --- Grind Worker ---
+class GrindWorker:
+    # Grinds jobs for any number of bots on the local pool. Several jobs share one search like they do in the bot,
+    # so every job gets the pool's full rate.
+    def __init__(self, pool, name, token=GRIND_CLUSTER_TOKEN, heartbeat=HEARTBEAT_SECONDS, peer_timeout=NODE_TIMEOUT):
+        self.pool = pool
+        self.name = name
+        self.token = token
+        self.heartbeat = heartbeat
+        self.peer_timeout = peer_timeout
+        self.rate = 0.0  # Keys/sec measured at startup, announced to every bot
+        self.supervisor = JobSupervisor()
+
+    def serve_forever(self, address, tls_context=None):
+        listener = listen(address)
+        print(f"Grind worker {self.name} listening on {address} with {self.pool.workers} workers")
+        while True:
+            sock, _ = listener.accept()
+            threading.Thread(target=self._serve, args=(sock, tls_context), name="grind-session", daemon=True).start()
+
+    def _serve(self, sock, tls_context=None):
+        sock.settimeout(self.peer_timeout)  # The bot pings every heartbeat, so silence this long means it is gone
+        try:
+            if tls_context is not None:
+                sock = tls_context.wrap_socket(sock, server_side=True)  # Handshakes here, off the accept loop
+        except OSError as e:
+            print(f"TLS handshake with a bot failed: {e}")
+            sock.close()
+            return
+        channel = Channel(sock)
+        session = Session(channel)
+        try:
+            hello = channel.receive()
+            if not hello or hello.get("op") != "hello" or not hmac.compare_digest(str(hello.get("token", "")).encode(), self.token.encode()):
+                channel.send({"op": "error", "error": "Invalid cluster token"})
+                return
+            channel.send({"op": "hello", "node": self.name, "workers": self.pool.workers, "rate": self.rate})
+            threading.Thread(target=self._heartbeat_loop, args=(session,), name="grind-heartbeat", daemon=True).start()
+            while True:
+                message = channel.receive()
+                if message is None:
+                    break
+                self._handle(session, message)
+        except (OSError, ValueError) as e:
+            print(f"Bot connection lost: {e}")
+        finally:
+            session.closed.set()
+            for assignment in list(session.jobs.values()):
+                self._stop(assignment)
+            channel.close()
+
+    def _handle(self, session, message):
+        op = message.get("op")
+        assignment = session.jobs.get(message.get("job"))
+        if op == "start":
+            if assignment is not None:
+                return
+            job_id = message.get("job")
+            try:
+                process = self.pool.start_job(message["pattern"], message["mode"], bool(message.get("ignore_case")), int(message.get("count", 1)))
+            except Exception as e:
+                session.send({"op": "done", "job": job_id, "returncode": 1, "error": str(e)})
+                return
+            if message.get("paused"):
+                process.pause()
+            assignment = Assignment(session, job_id, process)
+            session.jobs[job_id] = assignment
+            self.supervisor.watch(assignment, process, self._exited, on_telemetry=self._telemetry, on_hit=self._hit)
+        elif op == "cancel" and assignment is not None:
+            self._stop(assignment)
+        elif op == "pause" and assignment is not None:
+            assignment.process.pause()
+        elif op == "resume" and assignment is not None:
+            assignment.process.resume()
+        elif op not in ("ping", "cancel", "pause", "resume"):
+            session.send({"op": "error", "error": f"Unknown op {op!r}"})
+
+    def _stop(self, assignment):
+        assignment.session.jobs.pop(assignment.id, None)
+        self.supervisor.unwatch(assignment)  # A cancelled job reports nothing more
+        assignment.process.terminate()
+
+    def _telemetry(self, assignment, attempts, elapsed):
+        assignment.attempts = attempts
+
+    def _hit(self, assignment, address):
+        # Runs on the supervisor thread: the keypair goes straight to the bot and is wiped here
+        result = assignment.process.take_result(address)
+        if result is None:
+            return
+        try:
+            assignment.attempts = max(assignment.attempts, result.attempts)
+            assignment.session.send({
+                "op": "hit",
+                "job": assignment.id,
+                "address": result.pubkey,
+                "secret": result.secret_base58(),
+                "attempts": assignment.attempts,
+            })
+        finally:
+            result.wipe()
+
+    def _exited(self, assignment, stdout, stderr):
+        if assignment.session.jobs.pop(assignment.id, None) is None:
+            return
+        assignment.session.send({"op": "done", "job": assignment.id, "returncode": assignment.process.returncode, "error": stderr.strip()})
+
+    def _heartbeat_loop(self, session):
+        # Reports the pool's live keys/sec and the attempts of every job this bot has here
+        last_attempts, last_time = self.pool.attempts, time.time()
+        while not session.closed.wait(self.heartbeat):
+            now, attempts = time.time(), self.pool.attempts
+            rate = (attempts - last_attempts) / max(now - last_time, 1e-6)
+            last_attempts, last_time = attempts, now
+            jobs = {str(job_id): assignment.attempts for job_id, assignment in list(session.jobs.items())}
+            session.send({"op": "heartbeat", "rate": round(rate), "jobs": jobs})
+
+
+# --- Main Execution ---
+def main():
+    if not native_backend_available():
+        print("grind_worker.py needs PyNaCl: pip install pynacl")
+        return 1
+    address = sys.argv[1] if len(sys.argv) > 1 else GRIND_WORKER_LISTEN
+    try:
+        family, sockaddr, tls = parse_address(address)
+        check_plaintext(family, sockaddr, tls)
+        tls_context = server_context() if tls else None
+    except (ValueError, OSError) as e:
+        print(f"Cannot listen on {address}: {e}")
+        return 1
+    if family != socket.AF_UNIX and not GRIND_CLUSTER_TOKEN:
+        print("Warning: GRIND_CLUSTER_TOKEN is not set, anyone who can reach this port can use the worker")
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # Stop cleanly under process managers, like Ctrl-C
+    pool = GrindPool()
+    worker = GrindWorker(pool, GRIND_WORKER_NAME or f"{socket.gethostname()}/{address}")
+    try:
+        worker.rate = pool.benchmark()
+        print(f"Measured grind rate: {worker.rate:,.0f} keys/sec")
+        worker.serve_forever(address, tls_context)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
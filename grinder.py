@@ -0,0 +1,480 @@
+import os
+import re
+import json
+import multiprocessing
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import base58
+from patterns import PatternSet, compile_matcher, is_literal, parse_pattern, split_pattern
+
+try:
+    from nacl.bindings import crypto_sign_seed_keypair
+except ImportError:  # PyNaCl is optional, the bot falls back to solana-keygen without it
+    crypto_sign_seed_keypair = None
+
+# --- Grinder Settings ---
+GRIND_WORKERS = int(os.environ.get("GRIND_WORKERS", os.cpu_count() or 1))  # Worker processes shared by all jobs
+GRIND_BATCH_SIZE = int(os.environ.get("GRIND_BATCH_SIZE", 2000))  # Keys tried per work unit before a worker reports back
+GRIND_SHARED_SEARCH = os.environ.get("GRIND_SHARED_SEARCH", "1") == "1"  # Check every key against all running jobs' patterns
+BENCHMARK_SECONDS = float(os.environ.get("BENCHMARK_SECONDS", 3))  # Length of the startup key rate measurement
+TOOLCHAIN_RECHECK_SECONDS = float(os.environ.get("TOOLCHAIN_RECHECK_SECONDS", 300))  # How often the cached solana-keygen probe is refreshed
+KEYPAIR_DIR = os.environ.get("KEYPAIR_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else "")  # solana-keygen jobs write into private directories here (tmpfs by default)
+
+
+def native_backend_available():
+    return crypto_sign_seed_keypair is not None
+
+
+def address_matches(address, prefix, suffix, ignore_case=False):
+    # Same semantics as `solana-keygen grind --ignore-case`: compare everything lowercased
+    if not is_literal(prefix + suffix):
+        return _accepts(address, _alternatives(prefix, ignore_case), _alternatives(suffix, ignore_case))
+    if ignore_case:
+        address, prefix, suffix = address.lower(), prefix.lower(), suffix.lower()
+    return address.startswith(prefix) and address.endswith(suffix)
+
+
+@lru_cache(maxsize=64)
+def _alternatives(text, ignore_case):
+    return parse_pattern(text, ignore_case) if text else None
+
+
+def _accepts(address, prefixes, suffixes):
+    # Checks the address against the per-position accept sets of a pattern with wildcards, classes or alternatives
+    def fits(text, positions):
+        return len(text) == len(positions) and all(char in accept for char, accept in zip(text, positions))
+    return (
+        (prefixes is None or any(fits(address[:len(positions)], positions) for positions in prefixes))
+        and (suffixes is None or any(fits(address[-len(positions):], positions) for positions in suffixes))
+    )
+
+
+@lru_cache(maxsize=64)
+def _matcher(prefix, suffix, ignore_case):
+    return compile_matcher(prefix, suffix, ignore_case)
+
+
+def grind_batch(prefix, suffix, ignore_case, batch_size, limit=1):
+    # Runs inside a pool worker. Returns (attempts, hits) where hits lists up to `limit` (address, 64 byte keypair);
+    # attempts stop at the key that reached the limit. The whole batch is matched as one block of integers; only
+    # the rare candidates that pass get base58 encoded.
+    seeds = os.urandom(32 * batch_size)
+    keypairs = [crypto_sign_seed_keypair(seeds[i:i + 32]) for i in range(0, len(seeds), 32)]
+    public_keys = b"".join(public_key for public_key, _ in keypairs)
+    hits = []
+    for index in _matcher(prefix, suffix, ignore_case).matching_indices(public_keys):
+        public_key, secret_key = keypairs[index]
+        address = base58.b58encode(public_key).decode()
+        if address_matches(address, prefix, suffix, ignore_case):
+            hits.append((address, secret_key))
+            if len(hits) >= limit:
+                return index + 1, hits
+    return batch_size, hits
+
+
+@lru_cache(maxsize=16)
+def _pattern_set(patterns):
+    return PatternSet(patterns)
+
+
+def grind_shared_batch(patterns, batch_size, limits):
+    # Shared search: one batch of keys checked against every running job's (prefix, suffix, ignore_case).
+    # Returns (attempts, hits): attempts lists the keys each pattern used, which stops at the key that gave it
+    # limits[pattern] matches, and hits maps pattern index to its list of (address, 64 byte keypair).
+    seeds = os.urandom(32 * batch_size)
+    keypairs = [crypto_sign_seed_keypair(seeds[i:i + 32]) for i in range(0, len(seeds), 32)]
+    public_keys = b"".join(public_key for public_key, _ in keypairs)
+    attempts = [batch_size] * len(patterns)
+    hits = {}
+    for index, pattern in _pattern_set(patterns).matching(public_keys):
+        found = hits.setdefault(pattern, [])
+        if len(found) >= limits[pattern]:
+            continue
+        public_key, secret_key = keypairs[index]
+        address = base58.b58encode(public_key).decode()
+        if address_matches(address, *patterns[pattern]):
+            found.append((address, secret_key))
+            if len(found) >= limits[pattern]:
+                attempts[pattern] = index + 1
+    return attempts, {pattern: found for pattern, found in hits.items() if found}
+
+
+def generate_keypairs(count):
+    # Runs inside a pool worker for the inventory filler: `count` fresh (address, 64 byte keypair)
+    keypairs = []
+    for _ in range(count):
+        public_key, secret_key = crypto_sign_seed_keypair(os.urandom(32))
+        keypairs.append((base58.b58encode(public_key).decode(), secret_key))
+    return keypairs
+
+
+def probe_keygen(keygen_path):
+    # Returns the `solana-keygen --version` output, or None when the tool is missing or broken
+    if not os.path.exists(keygen_path):
+        return None
+    try:
+        result = subprocess.run([keygen_path, "--version"], capture_output=True, check=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Error checking for solana-keygen: {e}")
+        return None
+    return result.stdout.strip() or "unknown version"
+
+
+class Toolchain:
+    # Backend capabilities probed once at startup and re-checked in the background, so starting a job never waits
+    # on them. A failed launch calls invalidate() to have the next job probe again.
+    def __init__(self, keygen_path, recheck_seconds=TOOLCHAIN_RECHECK_SECONDS):
+        self.keygen_path = keygen_path
+        self.recheck_seconds = recheck_seconds
+        self.native = native_backend_available()
+        self.keygen_version = None
+        self.checked_at = None
+        self._thread = None
+
+    def refresh(self):
+        version = probe_keygen(self.keygen_path)
+        if version != self.keygen_version:
+            print(f"solana-keygen: {version or f'not available at {self.keygen_path}'}")
+        self.keygen_version = version
+        self.checked_at = time.time()
+        return self
+
+    def invalidate(self):
+        self.checked_at = None
+
+    def keygen_ready(self):
+        if self.checked_at is None:
+            self.refresh()
+        return self.keygen_version is not None
+
+    def start(self):
+        # Probes now, then again every recheck_seconds on a daemon thread
+        self.refresh()
+        if self._thread is None and self.recheck_seconds > 0:
+            self._thread = threading.Thread(target=self._recheck_loop, name="toolchain-probe", daemon=True)
+            self._thread.start()
+
+    def _recheck_loop(self):
+        while True:
+            time.sleep(self.recheck_seconds)
+            self.refresh()
+
+
+def measure_keygen_rate(keygen_path, num_threads, seconds=BENCHMARK_SECONDS):
+    # Keys/sec of one `solana-keygen grind` process, read from its periodic "Searched N keypairs in Xs" lines
+    process = subprocess.Popen(
+        [keygen_path, "grind", "--num-threads", str(num_threads), "--starts-with", "zzzzzzzz:1"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True
+    )
+    time.sleep(seconds)
+    process.kill()
+    output, _ = process.communicate()
+    samples = re.findall(r"Searched (\d+) keypairs in (\d+)s", output)
+    if not samples:
+        return None
+    attempts, elapsed = samples[-1]
+    return int(attempts) / max(1, int(elapsed))
+
+
+# --- Grind Results ---
+class GrindResult:
+    # One found keypair, handed from the grinder to the bot in memory. wipe() zeroes the secret once it is delivered.
+    __slots__ = ("pubkey", "secret", "attempts")
+
+    def __init__(self, pubkey, secret, attempts=0):
+        self.pubkey = pubkey
+        self.secret = bytearray(secret)  # 64 bytes: seed followed by the public key, like solana-keygen's JSON file
+        self.attempts = attempts
+
+    def secret_base58(self):
+        # The form wallets import private keys in
+        return base58.b58encode(bytes(self.secret)).decode()
+
+    def wipe(self):
+        self.secret[:] = bytes(len(self.secret))
+
+
+class KeygenProcess(subprocess.Popen):
+    # `solana-keygen grind` run in a private per-job directory, so each keypair file is read back, deleted right
+    # away and never lands in the bot's working directory. The directory is removed once the process is reaped.
+    def __init__(self, command, **kwargs):
+        self.workdir = tempfile.mkdtemp(prefix="grind-", dir=KEYPAIR_DIR or None)
+        try:
+            super().__init__(command, cwd=self.workdir, **kwargs)
+        except Exception:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+            raise
+
+    def take_result(self, name):
+        # name is the path from the "Wrote keypair to" line, relative to the job's directory
+        path = os.path.join(self.workdir, os.path.basename(name))
+        try:
+            with open(path) as key_file:
+                secret = bytearray(json.load(key_file))
+        except (OSError, ValueError) as e:
+            print(f"Error reading keypair {name}: {e}")
+            return None
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
+        return GrindResult(os.path.splitext(os.path.basename(name))[0], secret)
+
+    def wait(self, timeout=None):
+        returncode = super().wait(timeout)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        return returncode
+
+    def terminate(self):
+        # Nobody waits for a cancelled job, so reap it in the background to remove its directory
+        super().terminate()
+        threading.Thread(target=self.wait, name="keygen-reaper", daemon=True).start()
+
+
+# --- Native Grind Job ---
+class NativeGrindJob:
+    # Mimics the parts of subprocess.Popen the bot uses, so both backends are monitored the same way
+    def __init__(self, pool, prefix, suffix, ignore_case, count=1):
+        self.pool = pool
+        self.prefix = prefix
+        self.suffix = suffix
+        self.ignore_case = ignore_case
+        self.count = count  # Matches to find before the job finishes
+        self.found = 0
+        self.results = {}  # address -> GrindResult until the bot takes it
+        self.attempts = 0
+        self.returncode = None
+        self.paused = False
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._last_report = self.start_time
+        stdout_fd, self._stdout_w = os.pipe()
+        stderr_fd, self._stderr_w = os.pipe()
+        os.set_blocking(self._stdout_w, False)
+        os.set_blocking(self._stderr_w, False)
+        self.stdout = os.fdopen(stdout_fd, "r")
+        self.stderr = os.fdopen(stderr_fd, "r")
+
+    def _record(self, attempts, hits=None):
+        # `hits` lists the (address, 64 byte keypair) found in those attempts; ones beyond the job's count are dropped
+        if self.returncode is not None:
+            return
+        self.attempts += attempts
+        now = time.time()
+        if not hits and now - self._last_report >= 1:
+            # Same progress line solana-keygen prints, so both backends stream identical telemetry
+            self._last_report = now
+            with self._lock:
+                if self.returncode is None:
+                    self._write(self._stdout_w, f"Searched {self.attempts} keypairs in {int(now - self.start_time)}s. {self.found} matches found.\n", droppable=True)
+        for address, secret_key in hits or ():
+            # The keypair stays in memory; only the address goes down the pipe to announce it
+            with self._lock:
+                if self.returncode is not None:
+                    return
+                self.results[address] = GrindResult(address, secret_key, self.attempts)
+            self.found += 1
+            if self.found >= self.count:
+                self._finish(stdout=f"Found keypair {address}\n")
+                return
+            with self._lock:
+                if self.returncode is None:
+                    self._write(self._stdout_w, f"Found keypair {address}\n")
+
+    def take_result(self, address):
+        with self._lock:
+            return self.results.pop(address, None)
+
+    def _wipe_results(self):
+        with self._lock:
+            results, self.results = list(self.results.values()), {}
+        for result in results:
+            result.wipe()
+
+    def _finish(self, stdout="", stderr="", returncode=0):
+        with self._lock:
+            if self.returncode is not None:
+                return
+            self.returncode = returncode
+            for fd, data in ((self._stdout_w, stdout), (self._stderr_w, stderr)):
+                if data:
+                    self._write(fd, data)
+                os.close(fd)
+        self._done.set()
+
+    def _write(self, fd, text, droppable=False):
+        # Progress lines are dropped rather than block when nobody is reading; results wait up to 10 seconds
+        data = text.encode()
+        deadline = time.time() + 10
+        while data:
+            try:
+                data = data[os.write(fd, data):]
+            except BlockingIOError:
+                if droppable or time.time() > deadline:
+                    return
+                select.select([], [fd], [], 1)
+            except OSError:
+                return  # Reader closed the pipe
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        # Results nobody took by the time the job is reaped are wiped
+        if self._done.wait(timeout):
+            self._wipe_results()
+        return self.returncode
+
+    def communicate(self):
+        self.wait()
+        stdout, stderr = self.stdout.read(), self.stderr.read()
+        self.stdout.close()
+        self.stderr.close()
+        return stdout, stderr
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self.pool.wake()
+
+    def terminate(self):
+        self._finish(returncode=-15)
+        self._wipe_results()
+
+    kill = terminate
+
+
+# --- Native Grind Pool ---
+class GrindPool:
+    # One process pool shared by every native job. In shared mode every work unit checks its keys against all
+    # running jobs at once, so each job sees the pool's full key rate; otherwise work units go round-robin.
+    def __init__(self, workers=GRIND_WORKERS, batch_size=GRIND_BATCH_SIZE, shared=GRIND_SHARED_SEARCH):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.shared = shared
+        self.jobs = []
+        self.executor = None
+        self.attempts = 0  # Keys searched by the pool since it started, for throughput reports
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def start_job(self, pattern, mode, ignore_case=False, count=1):
+        prefix, suffix = split_pattern(pattern, mode)
+        job = NativeGrindJob(self, prefix, suffix, ignore_case, count)
+        self.add_job(job)
+        return job
+
+    def add_job(self, job):
+        # Grinds any NativeGrindJob, including one created elsewhere, e.g. a cluster job while no worker is connected
+        self.start_pool()
+        with self._cond:
+            if job not in self.jobs:
+                self.jobs.append(job)
+            self._cond.notify()
+
+    def remove_job(self, job):
+        # Stops grinding a job without finishing it; work units already running still report to it
+        with self._cond:
+            if job in self.jobs:
+                self.jobs.remove(job)
+
+    def start_pool(self):
+        with self._cond:
+            if self.executor is None:
+                # Workers must not inherit the per-job pipes (or the bot's sockets), so never plain fork
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(method),
+                    initializer=signal.signal,
+                    initargs=(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C stops the bot, which then shuts the pool down
+                )
+                threading.Thread(target=self._dispatch_loop, name="grind-dispatcher", daemon=True).start()
+
+    def warm_up(self):
+        # Forks every worker and has it import the grinding code now, so the first job starts at full speed.
+        # "0" is not base58, so these work units never stop early.
+        self.start_pool()
+        list(self.executor.map(grind_batch, ["0"] * self.workers, [""] * self.workers, [False] * self.workers, [1] * self.workers))
+
+    def benchmark(self, seconds=BENCHMARK_SECONDS):
+        # Keys/sec of the whole pool
+        self.warm_up()
+        attempts = 0
+        started = time.time()
+        while time.time() - started < seconds:
+            batches = self.executor.map(grind_batch, ["0"] * self.workers, [""] * self.workers, [False] * self.workers, [self.batch_size] * self.workers)
+            attempts += sum(tried for tried, _ in batches)
+        return attempts / (time.time() - started)
+
+    def shutdown(self):
+        # Ends every job and stops the worker processes (a process exiting would otherwise wait for them)
+        with self._cond:
+            jobs, executor = list(self.jobs), self.executor
+        for job in jobs:
+            job.terminate()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify()
+
+    def _next_unit(self):
+        # Returns (jobs, function, args) for the next work unit, or None when nothing is running
+        self.jobs = [job for job in self.jobs if job.returncode is None]
+        active = [job for job in self.jobs if not job.paused]
+        if not active:
+            return None
+        if self.shared:
+            patterns = tuple((job.prefix, job.suffix, job.ignore_case) for job in active)
+            limits = tuple(max(1, job.count - job.found) for job in active)
+            return active, grind_shared_batch, (patterns, self.batch_size, limits)
+        self._next = (self._next + 1) % len(active)
+        job = active[self._next]
+        return [job], grind_batch, (job.prefix, job.suffix, job.ignore_case, self.batch_size, max(1, job.count - job.found))
+
+    def _dispatch_loop(self):
+        in_flight = {}
+        while True:
+            with self._cond:
+                while len(in_flight) < self.workers * 2:
+                    unit = self._next_unit()
+                    if unit is None:
+                        break
+                    jobs, function, args = unit
+                    try:
+                        future = self.executor.submit(function, *args)
+                    except RuntimeError:
+                        return  # The interpreter is shutting down
+                    in_flight[future] = jobs
+                if not in_flight:
+                    self._cond.wait()
+                    continue
+
+            done, _ = wait(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                jobs = in_flight.pop(future)
+                try:
+                    attempts, hits = future.result()
+                except Exception as e:
+                    print(f"Grind worker error: {e}")
+                    for job in jobs:
+                        job._finish(stderr=f"{e}\n", returncode=1)
+                    continue
+                if not self.shared:
+                    attempts, hits = [attempts], {0: hits}
+                self.attempts += max(attempts)
+                for index, job in enumerate(jobs):
+                    job._record(attempts[index], hits.get(index))
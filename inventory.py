@@ -0,0 +1,190 @@
+import os
+import sqlite3
+import threading
+import time
+from grinder import address_matches, generate_keypairs
+from patterns import is_literal, split_pattern
+
+try:
+    from nacl.secret import SecretBox
+except ImportError:  # PyNaCl is optional, the inventory is disabled without it
+    SecretBox = None
+
+# --- Inventory Settings ---
+INVENTORY_PATH = os.environ.get("INVENTORY_PATH", "inventory.db")
+INVENTORY_KEY = os.environ.get("INVENTORY_KEY", "")  # 64 hex characters; the inventory is disabled without a key
+INVENTORY_MAX_LENGTH = int(os.environ.get("INVENTORY_MAX_LENGTH", 2))  # Longest prefix/suffix kept in stock for every pattern
+INVENTORY_QUOTA = int(os.environ.get("INVENTORY_QUOTA", 2))  # Keypairs kept in stock per pattern
+INVENTORY_QUOTAS = os.environ.get("INVENTORY_QUOTAS", "")  # Per-pattern overrides, e.g. "ai:10,sol:3" (may be longer than INVENTORY_MAX_LENGTH)
+INVENTORY_MAX_KEYS = int(os.environ.get("INVENTORY_MAX_KEYS", 20000))  # Hard cap on stored keypairs
+INVENTORY_BATCH_SIZE = int(os.environ.get("INVENTORY_BATCH_SIZE", 2000))  # Keys generated per worker per filler round
+INVENTORY_BACKOFF = 30  # Seconds the filler rests after a round that stored nothing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keypairs (
+    id INTEGER PRIMARY KEY,
+    address TEXT NOT NULL UNIQUE,
+    secret BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    keypair_id INTEGER NOT NULL REFERENCES keypairs(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS tags_by_tag ON tags(tag);
+CREATE INDEX IF NOT EXISTS tags_by_keypair ON tags(keypair_id);
+"""
+
+
+def parse_quotas(text):
+    quotas = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        pattern, _, count = item.partition(":")
+        quotas[pattern.strip()] = int(count)
+    return quotas
+
+
+# --- Key Inventory ---
+class KeyInventory:
+    # Pre-ground keypairs for short patterns, stored encrypted in SQLite and indexed by prefix and suffix tags
+    # ("p:ab", "s:ab" and the case-folded "pi:ab", "si:ab"). A taken keypair is deleted before it is returned.
+    def __init__(self, path=INVENTORY_PATH, key=INVENTORY_KEY, max_length=INVENTORY_MAX_LENGTH, quota=INVENTORY_QUOTA,
+                 quotas=INVENTORY_QUOTAS, max_keys=INVENTORY_MAX_KEYS):
+        self.enabled = bool(key) and SecretBox is not None
+        self.max_length = max_length
+        self.quota = quota
+        self.quotas = parse_quotas(quotas)
+        self.folded_quotas = {pattern.lower(): count for pattern, count in self.quotas.items()}
+        self.lengths = sorted(set(range(1, max_length + 1)) | {len(pattern) for pattern in self.quotas})
+        self.max_keys = max_keys
+        self.counts = {}  # tag -> keypairs in stock
+        self.total = 0
+        self._lock = threading.Lock()
+        if not self.enabled:
+            return
+        self.box = SecretBox(bytes.fromhex(key))
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+        self._reload_counts()
+
+    def tags(self, address):
+        tags = []
+        for length in self.lengths:
+            prefix, suffix = address[:length], address[-length:]
+            tags += [f"p:{prefix}", f"pi:{prefix.lower()}", f"s:{suffix}", f"si:{suffix.lower()}"]
+        return tags
+
+    def quota_for(self, tag):
+        kind, text = tag.split(":", 1)
+        if kind in ("pi", "si"):
+            default = self.folded_quotas.get(text)
+        else:
+            default = self.quotas.get(text)
+        if default is not None:
+            return default
+        return self.quota if len(text) <= self.max_length else 0
+
+    def add(self, address, secret_key):
+        # Stores the keypair if any of its patterns is below quota; returns whether it was stored
+        tags = self.tags(address)
+        with self._lock:
+            if not any(self.counts.get(tag, 0) < self.quota_for(tag) for tag in tags):
+                return False
+            if self.total >= self.max_keys and not self._evict():
+                return False
+            try:
+                with self.db:
+                    cursor = self.db.execute(
+                        "INSERT INTO keypairs (address, secret) VALUES (?, ?)",
+                        (address, self.box.encrypt(bytes(secret_key)))
+                    )
+                    self.db.executemany(
+                        "INSERT INTO tags (tag, keypair_id) VALUES (?, ?)",
+                        [(tag, cursor.lastrowid) for tag in tags]
+                    )
+            except sqlite3.IntegrityError:
+                return False  # Already in stock
+            for tag in tags:
+                self.counts[tag] = self.counts.get(tag, 0) + 1
+            self.total += 1
+            return True
+
+    def take(self, pattern, mode, ignore_case=False):
+        # Removes and returns (address, 64 byte keypair) for a stocked match, or None
+        if not self.enabled or not is_literal(pattern):
+            return None  # Stock is tagged by literal prefix and suffix
+        prefix, suffix = split_pattern(pattern, mode)
+        tag = self._tag(prefix, suffix, ignore_case)
+        with self._lock:
+            # No shortcut through self.counts: other bot processes may share this database
+            rows = self.db.execute(
+                "SELECT k.id, k.address, k.secret FROM tags t JOIN keypairs k ON k.id = t.keypair_id WHERE t.tag = ? ORDER BY k.id LIMIT 500",
+                (tag,)
+            ).fetchall()
+            for keypair_id, address, secret in rows:
+                if not address_matches(address, prefix, suffix, ignore_case):
+                    continue
+                if not self._delete(keypair_id, address):
+                    continue  # Another process took it first
+                try:
+                    return address, self.box.decrypt(secret)
+                except Exception as e:
+                    print(f"Dropping unreadable inventory keypair {address}: {e}")
+        return None
+
+    def in_stock(self, pattern, mode, ignore_case=False):
+        # Whether take() should find a keypair, going by this process's counts; may be stale
+        if not self.enabled or not is_literal(pattern):
+            return False
+        prefix, suffix = split_pattern(pattern, mode)
+        return self.counts.get(self._tag(prefix, suffix, ignore_case), 0) > 0
+
+    def _tag(self, prefix, suffix, ignore_case):
+        text = prefix or suffix
+        kind = ("p" if prefix else "s") + ("i" if ignore_case else "")
+        return f"{kind}:{text.lower() if ignore_case else text}"
+
+    def _delete(self, keypair_id, address):
+        with self.db:
+            deleted = self.db.execute("DELETE FROM keypairs WHERE id = ?", (keypair_id,)).rowcount
+        if deleted:
+            for tag in self.tags(address):
+                self.counts[tag] = self.counts.get(tag, 0) - 1
+            self.total -= 1
+        return deleted > 0
+
+    def _evict(self):
+        # Frees a slot by dropping the oldest keypair whose patterns are all stocked above quota
+        for keypair_id, address in self.db.execute("SELECT id, address FROM keypairs ORDER BY id LIMIT 200").fetchall():
+            if all(self.counts.get(tag, 0) > self.quota_for(tag) for tag in self.tags(address)):
+                self._delete(keypair_id, address)
+                return True
+        return False
+
+    def fill(self, pool, is_idle, batch_size=INVENTORY_BATCH_SIZE):
+        # Filler thread body: grinds on the shared pool only while no user job is running
+        pool.start_pool()
+        while True:
+            if not is_idle():
+                time.sleep(1)
+                continue
+            try:
+                batches = list(pool.executor.map(generate_keypairs, [batch_size] * pool.workers))
+            except Exception as e:
+                print(f"Inventory filler error: {e}")
+                time.sleep(INVENTORY_BACKOFF)
+                continue
+            stored = sum(self.add(address, secret_key) for batch in batches for address, secret_key in batch)
+            if not stored:
+                time.sleep(INVENTORY_BACKOFF)
+                self._reload_counts()  # Pick up keypairs other processes have taken
+
+    def _reload_counts(self):
+        with self._lock:
+            self.counts = dict(self.db.execute("SELECT tag, COUNT(*) FROM tags GROUP BY tag"))
+            self.total = self.db.execute("SELECT COUNT(*) FROM keypairs").fetchone()[0]
+
+    def start_filler(self, pool, is_idle):
+        if self.enabled:
+            threading.Thread(target=self.fill, args=(pool, is_idle), name="inventory-filler", daemon=True).start()
@@ -0,0 +1,292 @@
+import os
+import bisect
+import functools
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Metrics Settings ---
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))  # Serves /metrics here when set; webhook worker N uses METRICS_PORT + N
+TRACE_PATH = os.environ.get("TRACE_PATH", "")  # Trace spans are appended here as JSON lines when set
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DURATION_BUCKETS = (1, 5, 15, 60, 300, 900, 3600, 4 * 3600, 86400, 7 * 86400)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+# --- Metric Types ---
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Gauge:
+    # Read when scraped: collect() returns a number, or a list of (label values, number) for labelled gauges
+    def __init__(self, name, help_text, collect, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.collect = collect
+        self.labels = tuple(labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            samples = self.collect()
+        except Exception as e:
+            print(f"Error collecting {self.name}: {e}")
+            return lines
+        if not self.labels:
+            samples = [((), samples)]
+        for key, value in samples:
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.setdefault(key, [0] * (len(self.buckets) + 2))
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self.series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), key + ('+Inf',))} {values[-2]}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {values[-2]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {values[-1]!r}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+# --- Registry ---
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, collect, labels=()):
+        return self.register(Gauge(name, help_text, collect, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+# Metrics recorded outside the bot script; gauges over bot state are registered by the bot itself
+HANDLER_SECONDS = REGISTRY.histogram("namegen_handler_seconds", "Time spent in each Telegram update handler", ("handler",))
+HANDLER_ERRORS = REGISTRY.counter("namegen_handler_errors_total", "Handlers that raised", ("handler",))
+TELEGRAM_SECONDS = REGISTRY.histogram("namegen_telegram_seconds", "Bot API call latency", ("method",))
+TELEGRAM_RATE_LIMITED = REGISTRY.counter("namegen_telegram_rate_limited_total", "Bot API calls answered with 429", ("method",))
+TELEGRAM_ERRORS = REGISTRY.counter("namegen_telegram_errors_total", "Bot API calls that failed", ("method",))
+OPENAI_SECONDS = REGISTRY.histogram("namegen_openai_seconds", "OpenAI call latency", ("call",))
+OPENAI_ERRORS = REGISTRY.counter("namegen_openai_errors_total", "OpenAI calls that failed", ("call",))
+JOB_SECONDS = REGISTRY.histogram(
+    "namegen_job_duration_seconds", "Grinding time of finished jobs", ("length", "ignore_case", "outcome"), DURATION_BUCKETS
+)
+
+
+def instrument(handler):
+    # Times a Telegram handler and runs it inside a trace span named after it
+    name = handler.__name__
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        with HANDLER_SECONDS.time(handler=name), tracer.span(name):
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                HANDLER_ERRORS.inc(handler=name)
+                raise
+    return wrapper
+
+
+# --- Tracing ---
+class Span:
+    def __init__(self, tracer, name, trace_id, parent_id, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = next(tracer.ids)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.ended = False
+        self._previous = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, **attributes):
+        # Later calls are ignored, so every path that may finish a span can simply end it
+        if self.ended:
+            return
+        self.ended = True
+        self.attributes.update(attributes)
+        self.tracer.write(self)
+
+    def __enter__(self):
+        self._previous = self.tracer.current()
+        self.tracer.local.span = self
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.tracer.local.span = self._previous
+        self.end(**({"error": repr(exc)} if exc is not None else {}))
+        return False
+
+
+class _NoSpan:
+    # Stands in for spans while tracing is off
+    trace_id = span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class Tracer:
+    # Spans of one request across threads: handler -> start_wallet_generation -> the job until it finishes.
+    # A span is the child of `parent`, or of the span entered on this thread.
+    def __init__(self, path=TRACE_PATH):
+        self.path = path
+        self.ids = itertools.count(1)
+        self.local = threading.local()
+        self._lock = threading.Lock()
+        self._no_span = _NoSpan()
+
+    def current(self):
+        return getattr(self.local, "span", None)
+
+    def span(self, name, parent=None, **attributes):
+        if not self.path:
+            return self._no_span
+        parent = parent or self.current()
+        if parent is None or parent.trace_id is None:
+            return Span(self, name, f"{os.getpid()}-{next(self.ids)}", None, attributes)
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    def write(self, span):
+        record = {
+            "trace": span.trace_id,
+            "span": span.span_id,
+            "parent": span.parent_id,
+            "name": span.name,
+            "start": span.start,
+            "seconds": round(time.time() - span.start, 6),
+            "attributes": span.attributes,
+        }
+        try:
+            with self._lock, open(self.path, "a") as trace_file:
+                trace_file.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            print(f"Error writing trace span: {e}")
+
+
+tracer = Tracer()
+
+
+# --- Metrics Endpoint ---
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST, registry=REGISTRY):
+    # Serves the registry at /metrics on a daemon thread; returns the server, or None when no port is set
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            payload = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Metrics on http://{host}:{server.server_port}/metrics")
+    return server
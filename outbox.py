@@ -0,0 +1,210 @@
+import os
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from telebot.apihelper import ApiTelegramException
+from metrics import TELEGRAM_SECONDS, TELEGRAM_RATE_LIMITED, TELEGRAM_ERRORS
+
+# --- Outbox Settings ---
+OUTBOX_GLOBAL_RATE = float(os.environ.get("OUTBOX_GLOBAL_RATE", 30))  # Messages per second across all chats (Telegram allows ~30)
+OUTBOX_CHAT_RATE = float(os.environ.get("OUTBOX_CHAT_RATE", 1))  # Sustained messages per second to one chat
+OUTBOX_CHAT_BURST = int(os.environ.get("OUTBOX_CHAT_BURST", 3))  # Messages one chat may receive back to back
+OUTBOX_WORKERS = int(os.environ.get("OUTBOX_WORKERS", 8))  # Requests in flight at once, one per chat at most
+OUTBOX_SWEEP_SECONDS = float(os.environ.get("OUTBOX_SWEEP_SECONDS", 60))  # How often idle chats' limiter state is dropped
+
+PRIORITY_RESULT = 0  # Replies, results and errors
+PRIORITY_PROGRESS = 1  # Progress edits, sent only when nothing more important is waiting
+
+
+class _Bucket:
+    # Token bucket: `burst` sends at once, refilled at `rate` per second
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+
+    def ready_at(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def full(self, now):
+        # A full bucket behaves exactly like a new one, so it can be dropped and recreated on the next send
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class _Op:
+    def __init__(self, chat_id, method, args, kwargs, priority, key):
+        self.chat_id = chat_id
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.key = key  # (chat_id, message) for edits, so a newer edit replaces one still waiting
+        self.future = Future()
+        self.cancelled = False
+        self.seq = 0
+
+
+# --- Telegram Outbox ---
+class TelegramOutbox:
+    # Every outgoing send/edit goes through one dispatcher that enforces Telegram's global and per-chat limits,
+    # keeps only the latest pending edit per message, sends results before progress and honours 429 retry_after.
+    # Calls return a Future at once; a send's Future may be passed as `message_id` to a later edit.
+    def __init__(self, bot, global_rate=OUTBOX_GLOBAL_RATE, chat_rate=OUTBOX_CHAT_RATE, chat_burst=OUTBOX_CHAT_BURST,
+                 workers=OUTBOX_WORKERS, sweep_seconds=OUTBOX_SWEEP_SECONDS):
+        self.bot = bot
+        self.global_bucket = _Bucket(global_rate, max(1, int(global_rate)))
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chats = {}  # chat_id -> _Bucket
+        self.busy = set()  # Chats with a request in flight, so messages to one chat stay in order
+        self.blocked_until = {}  # chat_id -> time Telegram asked us to wait until
+        self.pending = []  # Heap of (priority, seq, op)
+        self.edits = {}  # key -> pending edit op
+        self.sweep_seconds = sweep_seconds
+        self.next_sweep = time.time() + sweep_seconds
+        self.senders = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox")
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def send_message(self, chat_id, text, priority=PRIORITY_RESULT, **kwargs):
+        return self._enqueue(chat_id, "send_message", (chat_id, text), kwargs, priority)
+
+    def reply_to(self, message, text, priority=PRIORITY_RESULT, **kwargs):
+        return self.send_message(message.chat.id, text, priority, reply_to_message_id=message.message_id, **kwargs)
+
+    def answer_callback_query(self, chat_id, callback_query_id, text=None, **kwargs):
+        # chat_id only orders the answer with the chat's other messages; Telegram does not take it
+        return self._enqueue(chat_id, "answer_callback_query", (callback_query_id, text), kwargs, PRIORITY_RESULT)
+
+    def edit_message_text(self, text, chat_id, message_id, priority=PRIORITY_RESULT, **kwargs):
+        kwargs.update(chat_id=chat_id, message_id=message_id)
+        return self._enqueue(chat_id, "edit_message_text", (text,), kwargs, priority, key=(chat_id, message_id))
+
+    def flush(self, timeout=None):
+        # Waits until everything queued so far has been sent; returns False if the timeout ran out first
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            while self.pending or self.busy:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _enqueue(self, chat_id, method, args, kwargs, priority, key=None):
+        op = _Op(chat_id, method, args, kwargs, priority, key)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+                self._thread.start()
+            waiting = self.edits.get(key) if key is not None else None
+            if waiting is not None:
+                if waiting.priority < priority:
+                    return waiting.future  # Never let a progress tick overwrite a pending result
+                waiting.cancelled = True
+                op.future = waiting.future  # Callers of the replaced edit see the newer one's outcome
+            if key is not None:
+                self.edits[key] = op
+            op.seq = next(self._seq)
+            heapq.heappush(self.pending, (priority, op.seq, op))
+            self._cond.notify()
+        return op.future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                op, wait = self._next_op()
+                if op is None:
+                    self._cond.wait(wait)
+                    continue
+                self.busy.add(op.chat_id)
+                if op.key is not None and self.edits.get(op.key) is op:
+                    del self.edits[op.key]
+            self.senders.submit(self._deliver, op)
+
+    def _next_op(self):
+        # Highest priority op whose chat is free and within its limits; otherwise (None, seconds to wait)
+        now = time.time()
+        if now >= self.next_sweep:
+            self._sweep(now)
+        global_ready = self.global_bucket.ready_at(now)
+        if global_ready > now:
+            return None, global_ready - now
+        wait = None
+        skipped = []
+        found = None
+        while self.pending:
+            entry = heapq.heappop(self.pending)
+            op = entry[2]
+            if op.cancelled:
+                continue
+            if op.chat_id in self.busy:
+                skipped.append(entry)
+                continue
+            bucket = self.chats.setdefault(op.chat_id, _Bucket(self.chat_rate, self.chat_burst))
+            ready = max(bucket.ready_at(now), self.blocked_until.get(op.chat_id, 0))
+            if ready > now:
+                wait = ready - now if wait is None else min(wait, ready - now)
+                skipped.append(entry)
+                continue
+            bucket.take()
+            self.global_bucket.take()
+            found = op
+            break
+        for entry in skipped:
+            heapq.heappush(self.pending, entry)
+        return found, wait
+
+    def _sweep(self, now):
+        # Forgets chats that have not been sent to lately: full buckets and rate-limit deadlines already passed
+        self.next_sweep = now + self.sweep_seconds
+        for chat_id in [chat_id for chat_id, bucket in self.chats.items() if bucket.full(now) and chat_id not in self.busy]:
+            del self.chats[chat_id]
+        for chat_id in [chat_id for chat_id, until in self.blocked_until.items() if until <= now]:
+            del self.blocked_until[chat_id]
+
+    def _deliver(self, op):
+        try:
+            message_id = op.kwargs.get("message_id")
+            if isinstance(message_id, Future):
+                op.kwargs["message_id"] = message_id.result().message_id  # Sent earlier, chat order guarantees it is done
+            with TELEGRAM_SECONDS.time(method=op.method):
+                result = getattr(self.bot, op.method)(*op.args, **op.kwargs)
+        except ApiTelegramException as e:
+            if e.error_code == 429:
+                TELEGRAM_RATE_LIMITED.inc(method=op.method)
+                retry_after = (e.result_json or {}).get("parameters", {}).get("retry_after", 1)
+                with self._cond:
+                    self.blocked_until[op.chat_id] = time.time() + retry_after
+                    self.busy.discard(op.chat_id)
+                    if op.key is not None and op.key in self.edits:
+                        op.future.set_result(None)  # A newer edit of this message is already waiting
+                    else:
+                        if op.key is not None:
+                            self.edits[op.key] = op
+                        heapq.heappush(self.pending, (op.priority, op.seq, op))  # Keeps its place in the chat's order
+                    self._cond.notify_all()
+                print(f"Telegram rate limit for chat {op.chat_id}, retrying in {retry_after}s")
+                return
+            if "message is not modified" not in str(e):
+                TELEGRAM_ERRORS.inc(method=op.method)
+                print(f"Error in {op.method} for chat {op.chat_id}: {e}")
+            op.future.set_exception(e)
+        except Exception as e:
+            TELEGRAM_ERRORS.inc(method=op.method)
+            print(f"Error in {op.method} for chat {op.chat_id}: {e}")
+            op.future.set_exception(e)
+        else:
+            op.future.set_result(result)
+        with self._cond:
+            self.busy.discard(op.chat_id)
+            self._cond.notify_all()  # The dispatcher and any flush() waiting for the outbox to drain
@@ -0,0 +1,386 @@
+import bisect
+import itertools
+import math
+import statistics
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, blocks of keys are then matched one key at a time
+    np = None
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+BASE58_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+KEY_BYTES = 32
+KEY_SPACE = 256 ** KEY_BYTES
+MAX_ADDRESS_LENGTH = 44  # base58 of 2**256 - 1
+PATTERN_SYNTAX = "?[]|"  # Patterns without these characters are plain literals, the only kind solana-keygen accepts
+MAX_PATTERN_VARIANTS = 4096  # Literals one side of a pattern may expand to
+
+
+class PatternError(ValueError):
+    pass
+
+
+def split_pattern(pattern, mode):
+    if mode == "starts_with":
+        return pattern, ""
+    if mode == "ends_with":
+        return "", pattern
+    prefix, suffix = pattern.split(",")
+    return prefix.strip(), suffix.strip()
+
+
+def base58_value(text):
+    value = 0
+    for char in text:
+        value = value * 58 + BASE58_INDEX[char]
+    return value
+
+
+_NOT_BASE58 = str.maketrans("", "", BASE58_ALPHABET)  # Deletes every base58 character, leaving only invalid ones
+
+
+def is_base58(text):
+    return not text.translate(_NOT_BASE58)
+
+
+# --- Pattern Language ---
+def is_literal(text):
+    return not any(char in PATTERN_SYNTAX for char in text)
+
+
+def _class_chars(body):
+    # The characters of a "[...]" class; "a-f" style ranges follow base58 order, so "[a-z]" skips the "l"
+    chars = set()
+    index = 0
+    while index < len(body):
+        if index + 2 < len(body) and body[index + 1] == "-":
+            low, high = BASE58_INDEX.get(body[index]), BASE58_INDEX.get(body[index + 2])
+            if low is None or high is None or low > high:
+                raise PatternError(f"'{body[index:index + 3]}' is not a valid range")
+            chars.update(BASE58_ALPHABET[low:high + 1])
+            index += 3
+            continue
+        if body[index] not in BASE58_INDEX:
+            raise PatternError(f"'{body[index]}' is not a base58 character")
+        chars.add(body[index])
+        index += 1
+    if not chars:
+        raise PatternError("'[]' must list at least one character")
+    return chars
+
+
+def parse_pattern(text, ignore_case=False):
+    # Compiles one side of a pattern into its alternatives, each a tuple of per-position accept sets: "?" accepts
+    # any base58 character, "[Mm]" or "[a-f]" the listed ones, and "|" separates alternatives. With ignore_case the
+    # sets are folded like solana-keygen, which lowercases both sides: "a" accepts "a" and "A", but "L" only accepts
+    # "L" because "l" is not base58.
+    alternatives = []
+    for alternative in text.split("|"):
+        positions = []
+        index = 0
+        while index < len(alternative):
+            char = alternative[index]
+            if char == "?":
+                accept = set(BASE58_ALPHABET)
+            elif char == "[":
+                end = alternative.find("]", index)
+                if end < 0:
+                    raise PatternError("'[' is missing its ']'")
+                accept = _class_chars(alternative[index + 1:end])
+                index = end
+            elif char in BASE58_INDEX:
+                accept = {char}
+            else:
+                raise PatternError(f"'{char}' is not a base58 character")
+            if ignore_case:
+                folded = {c.lower() for c in accept}
+                accept = {c for c in BASE58_ALPHABET if c.lower() in folded}
+            positions.append(frozenset(accept))
+            index += 1
+        if not positions:
+            raise PatternError("'|' needs a pattern on both sides")
+        alternatives.append(tuple(positions))
+    return alternatives
+
+
+def pattern_literals(text, ignore_case=False, anchor="start"):
+    # Every literal an address may start (anchor="start") or end with for one side of a pattern. Wildcards at the
+    # open end ("A?" as a prefix, "?A" as a suffix) constrain nothing and are dropped before expanding.
+    literals = set()
+    for positions in parse_pattern(text, ignore_case):
+        positions = list(positions)
+        edge = -1 if anchor == "start" else 0
+        while positions and len(positions[edge]) == len(BASE58_ALPHABET):
+            positions.pop(edge)
+        if len(literals) + math.prod(len(accept) for accept in positions) > MAX_PATTERN_VARIANTS:
+            raise PatternError(f"The pattern allows more than {MAX_PATTERN_VARIANTS} combinations")
+        literals.update("".join(chars) for chars in itertools.product(*(sorted(accept) for accept in positions)))
+    return sorted(literals)
+
+
+def pattern_length(text, ignore_case=False, anchor="start"):
+    # Characters the longest alternative takes up in the address; raises PatternError for invalid patterns
+    if not text:
+        return 0
+    pattern_literals(text, ignore_case, anchor)  # Enforces the combination limit
+    return max(len(alternative) for alternative in parse_pattern(text))
+
+
+# --- Key Space Geometry ---
+def prefix_ranges(prefix):
+    # Integer ranges [lo, hi) of 32-byte public keys whose address starts with `prefix`.
+    # Leading "1"s are leading zero bytes; the rest is a base58 number of some length L, which pins
+    # the key to one contiguous range per possible L. This is why e.g. 44-character addresses can
+    # only start with "2".."J" and a prefix like "a" is ~17x rarer than 1/58.
+    zeros = len(prefix) - len(prefix.lstrip("1"))
+    rest = prefix[zeros:]
+    if zeros > KEY_BYTES:
+        return []
+    if not rest:
+        return [(0, 256 ** (KEY_BYTES - zeros))]
+
+    # Exactly `zeros` leading zero bytes: the key's first non-zero byte is at index `zeros`
+    low = 256 ** (KEY_BYTES - zeros - 1)
+    high = 256 ** (KEY_BYTES - zeros)
+    value = base58_value(rest)
+    ranges = []
+    for length in range(len(rest), MAX_ADDRESS_LENGTH + 1):
+        scale = 58 ** (length - len(rest))
+        lo, hi = max(value * scale, low), min((value + 1) * scale, high)
+        if lo < hi:
+            ranges.append((lo, hi))
+    return ranges
+
+
+def suffix_residues(suffix):
+    # The last k characters of an address are the key's value mod 58**k (ignoring keys below 58**k,
+    # which are 2**-210 rare), so a suffix is a residue class.
+    return 58 ** len(suffix), base58_value(suffix)
+
+
+# --- Compiled Matcher ---
+class PatternMatcher:
+    # Tests raw public keys against a pattern with integer range and modulus checks instead of a base58 encode.
+    # `ranges` is a sorted list of disjoint [lo, hi) prefix ranges (None when there is no prefix), `suffixes` maps
+    # each modulus 58**k to the accepted values mod it (None when there is no suffix); alternative suffixes of
+    # different lengths each get their own modulus.
+    def __init__(self, ranges, suffixes):
+        self.ranges = ranges
+        self.starts = [lo for lo, _ in ranges] if ranges is not None else None
+        self.suffixes = suffixes
+        if np is not None:
+            self._compile_block_filters()
+
+    def _compile_block_filters(self):
+        # Conservative vector filters: the top 64 bits of a key against each range, and the key mod 58**k
+        # computed byte by byte while it still fits in 64 bits (suffixes up to 9 characters)
+        self._tops = None
+        if self.ranges is not None:
+            self._tops = (
+                np.array([lo >> 192 for lo, _ in self.ranges], dtype=np.uint64),
+                np.array([(hi - 1) >> 192 for _, hi in self.ranges], dtype=np.uint64),
+            )
+        self._block_modulus = None
+        if self.suffixes is not None and max(self.suffixes) < 2 ** 55:
+            self._block_modulus = max(self.suffixes)  # Every modulus is a power of 58 and divides this one
+            self._block_residues = {
+                modulus: np.array(sorted(residues), dtype=np.uint64) for modulus, residues in self.suffixes.items()
+            }
+
+    def matches(self, public_key):
+        value = int.from_bytes(public_key, "big")
+        if self.starts is not None:
+            index = bisect.bisect_right(self.starts, value) - 1
+            if index < 0 or value >= self.ranges[index][1]:
+                return False
+        return self.suffixes is None or any(value % modulus in residues for modulus, residues in self.suffixes.items())
+
+    def matching_indices(self, public_keys):
+        # Indices of the matching keys in `public_keys`, a bytes block of consecutive 32-byte keys
+        count = len(public_keys) // KEY_BYTES
+        if np is None or (self.ranges is not None and not self.ranges):
+            candidates = range(count) if self.ranges is None or self.ranges else ()
+        else:
+            block = np.frombuffer(public_keys, dtype=np.uint8).reshape(count, KEY_BYTES)
+            keep = np.ones(count, dtype=bool)
+            if self._tops is not None:
+                top = block[:, :8].copy().view(">u8").ravel().astype(np.uint64)
+                lows, highs = self._tops
+                keep &= ((top[:, None] >= lows) & (top[:, None] <= highs)).any(axis=1)
+            if self._block_modulus is not None:
+                modulus = np.uint64(self._block_modulus)
+                remainder = np.zeros(count, dtype=np.uint64)
+                for column in block.T.astype(np.uint64):
+                    remainder = (remainder * np.uint64(256) + column) % modulus
+                on_suffix = np.zeros(count, dtype=bool)
+                for suffix_modulus, residues in self._block_residues.items():
+                    on_suffix |= np.isin(remainder % np.uint64(suffix_modulus), residues)
+                keep &= on_suffix
+            candidates = np.flatnonzero(keep).tolist()
+        # The vector filters only narrow things down, every survivor gets the exact check
+        return [i for i in candidates if self.matches(public_keys[i * KEY_BYTES:(i + 1) * KEY_BYTES])]
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _prefix_ranges(prefix, ignore_case):
+    return _merge_ranges(r for literal in pattern_literals(prefix, ignore_case, "start") for r in prefix_ranges(literal))
+
+
+def compile_matcher(prefix, suffix, ignore_case=False):
+    # An invalid pattern, e.g. with characters outside base58, compiles to a matcher that never matches,
+    # like solana-keygen's search
+    try:
+        ranges = _prefix_ranges(prefix, ignore_case) if prefix else None
+        suffixes = None
+        if suffix:
+            suffixes = {}
+            for literal in pattern_literals(suffix, ignore_case, "end"):
+                modulus, residue = suffix_residues(literal)
+                suffixes.setdefault(modulus, set()).add(residue)
+            suffixes = {modulus: frozenset(residues) for modulus, residues in suffixes.items()}
+    except PatternError:
+        return PatternMatcher([], None)
+    return PatternMatcher(ranges, suffixes)
+
+
+# --- Shared Pattern Index ---
+class PatternSet:
+    # Many jobs' patterns checked in one pass per key. Prefixes are indexed by key range (elementary intervals
+    # of all jobs' merged ranges, found by bisect), suffixes by residue for each suffix length in use.
+    def __init__(self, patterns):
+        # `patterns` is a sequence of (prefix, suffix, ignore_case); matches are reported by index into it
+        self.patterns = list(patterns)
+        compiled = [compile_matcher(*pattern) for pattern in self.patterns]
+        self.any_prefix = frozenset(i for i, m in enumerate(compiled) if m.ranges is None)
+        self.any_suffix = frozenset(i for i, m in enumerate(compiled) if m.suffixes is None)
+
+        bounds = sorted({bound for m in compiled if m.ranges for r in m.ranges for bound in r})
+        owners = [set() for _ in bounds]
+        for i, m in enumerate(compiled):
+            for lo, hi in m.ranges or ():
+                for slot in range(bisect.bisect_left(bounds, lo), bisect.bisect_left(bounds, hi)):
+                    owners[slot].add(i)
+        self.bounds = bounds
+        self.owners = [frozenset(o) for o in owners]  # owners[k] holds the patterns covering [bounds[k], bounds[k + 1])
+
+        self.suffixes = {}  # modulus -> {residue: set of pattern indexes}
+        for i, m in enumerate(compiled):
+            for modulus, residues in (m.suffixes or {}).items():
+                for residue in residues:
+                    self.suffixes.setdefault(modulus, {}).setdefault(residue, set()).add(i)
+
+        # Keys that must all be checked one by one: a pattern without prefix whose suffix is too long for
+        # the 64-bit vector remainder (or without either, which the bot never creates)
+        self.scan_all = any(m.ranges is None and (m.suffixes is None or max(m.suffixes) >= 2 ** 55) for m in compiled)
+        if np is not None:
+            self._compile_block_filters()
+
+    def _compile_block_filters(self):
+        # Union filters for a whole block: inside any prefix range (by the top 64 bits) or on any suffix residue
+        tops = _merge_ranges(
+            (lo >> 192, ((hi - 1) >> 192) + 1)
+            for lo, hi, owners in zip(self.bounds, self.bounds[1:], self.owners)
+            if owners
+        )
+        self._top_lows = np.array([lo for lo, _ in tops], dtype=np.uint64)
+        self._top_highs = np.array([hi - 1 for _, hi in tops], dtype=np.uint64)
+        moduli = [modulus for modulus in self.suffixes if modulus < 2 ** 55]
+        self._block_modulus = max(moduli, default=None)  # Every suffix modulus is a power of 58 and divides this one
+        self._block_residues = {
+            modulus: np.array(sorted(self.suffixes[modulus]), dtype=np.uint64) for modulus in moduli
+        }
+
+    def matches(self, public_key):
+        value = int.from_bytes(public_key, "big")
+        index = bisect.bisect_right(self.bounds, value) - 1
+        prefix_ok = self.any_prefix | self.owners[index] if 0 <= index < len(self.owners) else self.any_prefix
+        if not prefix_ok:
+            return []
+        suffix_ok = set(self.any_suffix)
+        for modulus, residues in self.suffixes.items():
+            suffix_ok.update(residues.get(value % modulus, ()))
+        return sorted(prefix_ok & suffix_ok)
+
+    def matching(self, public_keys):
+        # (key index, pattern index) for every match in a bytes block of consecutive 32-byte keys
+        count = len(public_keys) // KEY_BYTES
+        if not self.patterns:
+            return []
+        if np is None or self.scan_all:
+            candidates = range(count)
+        else:
+            block = np.frombuffer(public_keys, dtype=np.uint8).reshape(count, KEY_BYTES)
+            keep = np.zeros(count, dtype=bool)
+            if len(self._top_lows):
+                top = block[:, :8].copy().view(">u8").ravel().astype(np.uint64)
+                index = np.searchsorted(self._top_lows, top, side="right") - 1
+                keep |= (index >= 0) & (top <= self._top_highs[np.maximum(index, 0)])
+            if self._block_modulus is not None:
+                modulus = np.uint64(self._block_modulus)
+                remainder = np.zeros(count, dtype=np.uint64)
+                for column in block.T.astype(np.uint64):
+                    remainder = (remainder * np.uint64(256) + column) % modulus
+                for suffix_modulus, residues in self._block_residues.items():
+                    keep |= np.isin(remainder % np.uint64(suffix_modulus), residues)
+            candidates = np.flatnonzero(keep).tolist()
+        return [
+            (i, pattern)
+            for i in candidates
+            for pattern in self.matches(public_keys[i * KEY_BYTES:(i + 1) * KEY_BYTES])
+        ]
+
+
+# --- Difficulty Model ---
+def match_probability(prefix, suffix, ignore_case=False):
+    if prefix:
+        probability = sum(hi - lo for lo, hi in _prefix_ranges(prefix, ignore_case)) / KEY_SPACE
+    else:
+        probability = 1.0
+    if suffix:
+        # Residue classes are uniform to within 2**-200 over any prefix range, so the two parts are independent.
+        # Suffix literals are disjoint unless one ends with another, which then already covers it.
+        literals = set(pattern_literals(suffix, ignore_case, "end"))
+        covering = [literal for literal in literals if not any(literal[i:] in literals for i in range(1, len(literal) + 1))]
+        probability *= sum(58.0 ** -len(literal) for literal in covering)
+    return probability
+
+
+def expected_attempts(pattern, mode, ignore_case=False):
+    probability = match_probability(*split_pattern(pattern, mode), ignore_case)
+    return 1 / probability if probability > 0 else math.inf
+
+
+def attempts_quantile(expected, quantile, count=1):
+    # Attempts needed to have found `count` matches with the given probability. One match follows the geometric
+    # distribution; for more, the Wilson-Hilferty approximation of the gamma distribution is close enough for ETAs.
+    if math.isinf(expected):
+        return math.inf
+    if count > 1:
+        spread = 1 / (9 * count)
+        z = statistics.NormalDist().inv_cdf(quantile)
+        return count * expected * max(0.0, 1 - spread + z * math.sqrt(spread)) ** 3
+    return math.log1p(-quantile) / math.log1p(-1 / expected) if expected > 1 else 1.0
+
+
+def found_probability(expected, attempts, count=1):
+    # Chance that a search of `attempts` keys would already have found `count` matches (Poisson tail)
+    if math.isinf(expected):
+        return 0.0
+    mean = attempts / expected
+    if count == 1:
+        return -math.expm1(-mean)
+    term = missed = math.exp(-mean)
+    for found in range(1, count):
+        term *= mean / found
+        missed += term
+    return max(0.0, 1 - missed)
@@ -0,0 +1,190 @@
+import os
+import heapq
+import itertools
+import signal
+import threading
+import time
+
+# --- Scheduler Settings ---
+GRIND_CORE_BUDGET = int(os.environ.get("GRIND_CORE_BUDGET", os.cpu_count() or 1))  # Cores all grind jobs may use together
+GRIND_MAX_RUNNING = int(os.environ.get("GRIND_MAX_RUNNING", 4))  # Jobs grinding at the same time, the budget is split between them
+GRIND_MAX_QUEUE = int(os.environ.get("GRIND_MAX_QUEUE", 50))  # Jobs allowed to wait for a slot before new ones are refused
+SHORT_JOB_ATTEMPTS = 58 ** 4  # Jobs at most this expensive (1-4 characters) may pause a long job to start immediately
+LONG_JOB_ATTEMPTS = 58 ** 5  # Jobs at least this expensive (5-8 characters) can be paused for short ones
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def pause_process(handle):
+    if hasattr(handle, "pause"):
+        handle.pause()
+    else:
+        os.kill(handle.pid, signal.SIGSTOP)
+
+
+def resume_process(handle):
+    if hasattr(handle, "resume"):
+        handle.resume()
+    else:
+        os.kill(handle.pid, signal.SIGCONT)
+
+
+# --- Scheduled Job ---
+class ScheduledJob:
+    def __init__(self, chat_id, cost, launch, pattern=None, mode=None, ignore_case=False, attempts=0, run_seconds=0.0, count=1, found=0):
+        self.chat_id = chat_id
+        self.cost = cost  # Expected number of attempts
+        self.launch = launch  # Called with the job once it gets a slot, returns the process handle or None
+        self.pattern = pattern
+        self.mode = mode
+        self.ignore_case = ignore_case
+        self.count = count  # Matching addresses wanted
+        self.found = found  # Matches delivered so far
+        self.handle = None
+        self.backend = None  # "native", "cluster" or "keygen" once a grinder is started
+        self.attempts = attempts  # Keys searched so far, from the grinder's progress output
+        self.rate = 0.0
+        self.restarts = 0
+        self.restart_attempts = attempts  # Keys searched by grinders this job has already restarted (or by a previous process, when resumed)
+        self.state = "new"
+        self.seq = 0
+        self.run_seconds = run_seconds  # Time spent actually grinding, excluding pauses
+        self.resumed_at = None
+
+    def elapsed(self):
+        if self.resumed_at is None:
+            return self.run_seconds
+        return self.run_seconds + time.time() - self.resumed_at
+
+    def _sort_key(self):
+        return (self.cost, self.seq)
+
+
+# --- Grind Scheduler ---
+class GrindScheduler:
+    # Owns the core budget: runs the cheapest jobs first and lets short jobs jump ahead of multi-hour grinds
+    def __init__(self, core_budget=GRIND_CORE_BUDGET, max_running=GRIND_MAX_RUNNING, max_queue=GRIND_MAX_QUEUE, rate=100000, shared=False):
+        self.slots = max(1, min(max_running, core_budget))
+        self.threads_per_job = max(1, core_budget // self.slots)
+        self.max_queue = max_queue
+        self.rate = rate  # Keys per second for the whole budget
+        self.shared = shared  # Running jobs share one search, so each of them sees the full rate
+        self.running = []
+        self.queue = []  # Heap of (cost, seq, job), paused jobs go back in here
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        # Returns 0 when the job started right away, otherwise its place in the queue
+        with self._lock:
+            job.seq = next(self._seq)
+            to_pause = None
+            if len(self.running) >= self.slots:
+                if job.cost <= SHORT_JOB_ATTEMPTS:
+                    to_pause = self._preemptible()
+                if to_pause is None:
+                    if len(self.queue) >= self.max_queue:
+                        raise QueueFullError(f"{len(self.queue)} jobs already waiting")
+                    self._enqueue(job, "queued")
+                    return self.position(job)
+                self.running.remove(to_pause)
+                self._enqueue(to_pause, "paused")
+            self._mark_running(job)
+
+        if to_pause is not None:
+            pause_process(to_pause.handle)
+            print(f"Paused job for user {to_pause.chat_id} to run a short job for user {job.chat_id}")
+        self._launch(job)
+        return 0
+
+    def finish(self, job):
+        with self._lock:
+            if job.state == "done":
+                return
+            if job in self.running:
+                self.running.remove(job)
+            else:
+                self.queue = [entry for entry in self.queue if entry[2] is not job]
+                heapq.heapify(self.queue)
+            job.state = "done"
+        self._fill()
+
+    def cancel(self, job):
+        was_paused = job.state == "paused"
+        self.finish(job)
+        if job.handle is not None:
+            try:
+                job.handle.terminate()
+                if was_paused:
+                    resume_process(job.handle)  # A stopped process only acts on SIGTERM once continued
+            except Exception as e:
+                print(f"Error stopping job for user {job.chat_id}: {e}")
+
+    def position(self, job):
+        ahead = sorted(entry for entry in self.queue if entry[2].state != "done")
+        for index, entry in enumerate(ahead, start=1):
+            if entry[2] is job:
+                return index
+        return 0
+
+    def job_rate(self):
+        # Keys/sec one job gets when every slot is busy
+        return self.rate if self.shared else self.rate / self.slots
+
+    def expected_start(self, job):
+        # Seconds until the job is expected to get a slot, assuming every job takes its expected attempts
+        per_slot_rate = self.job_rate()
+        with self._lock:
+            free_at = sorted(max(0.0, j.cost / per_slot_rate - j.elapsed()) for j in self.running)
+            free_at += [0.0] * (self.slots - len(free_at))
+            for _, _, queued in sorted(self.queue):
+                start = heapq.heappop(free_at) if free_at else 0.0
+                if queued is job:
+                    return start
+                heapq.heappush(free_at, start + max(0.0, queued.cost / per_slot_rate - queued.elapsed()))
+        return 0.0
+
+    def _preemptible(self):
+        candidates = [j for j in self.running if j.cost >= LONG_JOB_ATTEMPTS and j.handle is not None]
+        return max(candidates, key=lambda j: j.cost, default=None)
+
+    def _enqueue(self, job, state):
+        if job.resumed_at is not None:
+            job.run_seconds += time.time() - job.resumed_at
+            job.resumed_at = None
+        job.state = state
+        heapq.heappush(self.queue, (*job._sort_key(), job))
+
+    def _mark_running(self, job):
+        job.state = "running"
+        job.resumed_at = time.time()
+        self.running.append(job)
+
+    def _fill(self):
+        to_start = []
+        with self._lock:
+            while self.queue and len(self.running) < self.slots:
+                _, _, job = heapq.heappop(self.queue)
+                if job.state == "done":
+                    continue
+                was_paused = job.state == "paused"
+                self._mark_running(job)
+                to_start.append((job, was_paused))
+
+        for job, was_paused in to_start:
+            if was_paused:
+                print(f"Resuming job for user {job.chat_id}")
+                resume_process(job.handle)
+            else:
+                self._launch(job)
+
+    def _launch(self, job):
+        try:
+            job.handle = job.launch(job)
+        except Exception as e:
+            print(f"Error launching job for user {job.chat_id}: {e}")
+            job.handle = None
+        if job.handle is None:
+            self.finish(job)
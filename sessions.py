@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import threading
+import time
+
+# --- Session Settings ---
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH", "sessions.db")
+SESSION_TTL = int(os.environ.get("SESSION_TTL", 3600))  # Seconds an idle chat stays in memory; it is reloaded from disk on its next message
+SESSION_RETENTION = int(os.environ.get("SESSION_RETENTION", 90 * 86400))  # Seconds an idle chat's settings are kept on disk
+SWEEP_INTERVAL = 60  # Seconds between eviction sweeps
+
+# Written through to SQLite on every change; the rest only lives as long as the process
+PERSISTED_FIELDS = (
+    "current_mode", "ignore_case", "generating_wallet", "start_time", "temp_pattern", "temp_count", "original_mode",
+    "temp_ignore_case",
+    "job_pattern", "job_mode", "job_ignore_case", "job_attempts", "job_seconds", "job_count", "found_count",
+)
+TRANSIENT_FIELDS = ("search_status", "last_update_time", "wallet_info", "update_message_id")
+DEFAULTS = {
+    "ignore_case": False, "generating_wallet": False, "job_ignore_case": False, "job_attempts": 0, "job_seconds": 0.0,
+    "temp_count": 1, "job_count": 1, "found_count": 0,
+}
+
+
+# --- Session ---
+class Session:
+    # One chat's state in a fixed set of slots, read and written like the dict it replaces
+    __slots__ = PERSISTED_FIELDS + TRANSIENT_FIELDS + ("chat_id", "lock", "last_seen", "_store")
+
+    def __init__(self, store, chat_id, values=None):
+        for name in PERSISTED_FIELDS + TRANSIENT_FIELDS:
+            object.__setattr__(self, name, DEFAULTS.get(name))
+        for name, value in (values or {}).items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "chat_id", chat_id)
+        object.__setattr__(self, "lock", threading.RLock())  # Held around check-then-act changes to this chat's state
+        object.__setattr__(self, "last_seen", time.time())
+        object.__setattr__(self, "_store", store)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in PERSISTED_FIELDS:
+            self._store.save(self)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return getattr(self, name, None) is not None
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def update(self, **values):
+        # Sets several fields with a single write
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+        self._store.save(self)
+
+
+# --- Session Store ---
+class SessionStore:
+    # Chat sessions kept in memory while in use, written through to SQLite (WAL) so settings and
+    # job descriptors survive restarts; idle chats are evicted from memory after SESSION_TTL
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL, retention=SESSION_RETENTION):
+        self.ttl = ttl
+        self.retention = retention
+        self.sessions = {}
+        self._lock = threading.RLock()
+        self._last_sweep = time.time()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(PERSISTED_FIELDS)
+        self.db.execute(f"CREATE TABLE IF NOT EXISTS sessions (chat_id INTEGER PRIMARY KEY, {columns}, updated REAL)")
+        existing = {row[1] for row in self.db.execute("PRAGMA table_info(sessions)")}
+        for name in PERSISTED_FIELDS:
+            if name not in existing:  # Database written by an older version
+                self.db.execute(f"ALTER TABLE sessions ADD COLUMN {name}")
+        self.db.commit()
+
+    def __getitem__(self, chat_id):
+        with self._lock:
+            session = self.sessions.get(chat_id)
+            if session is None:
+                session = Session(self, chat_id, self._load(chat_id))
+                self.sessions[chat_id] = session
+            object.__setattr__(session, "last_seen", time.time())
+            if time.time() - self._last_sweep > SWEEP_INTERVAL:
+                self._sweep()
+            return session
+
+    def lock(self, chat_id):
+        return self[chat_id].lock
+
+    def save(self, session):
+        values = [getattr(session, name) for name in PERSISTED_FIELDS]
+        placeholders = ", ".join("?" * (len(PERSISTED_FIELDS) + 2))
+        with self._lock:
+            self.db.execute(
+                f"INSERT OR REPLACE INTO sessions (chat_id, {', '.join(PERSISTED_FIELDS)}, updated) VALUES ({placeholders})",
+                [session.chat_id] + values + [time.time()]
+            )
+            self.db.commit()
+
+    def generating(self):
+        # Chats whose last persisted state says a job was running, e.g. when the previous process stopped
+        with self._lock:
+            rows = self.db.execute("SELECT chat_id FROM sessions WHERE generating_wallet").fetchall()
+        return [self[chat_id] for chat_id, in rows]
+
+    def _load(self, chat_id):
+        row = self.db.execute(f"SELECT {', '.join(PERSISTED_FIELDS)} FROM sessions WHERE chat_id = ?", (chat_id,)).fetchone()
+        if row is None:
+            return None
+        values = {name: DEFAULTS.get(name) if value is None else value for name, value in zip(PERSISTED_FIELDS, row)}
+        for name in ("ignore_case", "generating_wallet", "job_ignore_case", "temp_ignore_case"):
+            values[name] = bool(values[name])
+        return values
+
+    def _sweep(self):
+        now = time.time()
+        self._last_sweep = now
+        for chat_id, session in list(self.sessions.items()):
+            if now - session.last_seen > self.ttl and not session.generating_wallet:
+                del self.sessions[chat_id]
+        self.db.execute("DELETE FROM sessions WHERE updated < ? AND NOT generating_wallet", (now - self.retention,))
+        self.db.commit()
+
+
+# --- Runtime Registry ---
+class ChatRuntime:
+    __slots__ = ("job", "process", "trace")
+
+    def __init__(self):
+        self.job = None  # The chat's ScheduledJob while it is queued or running
+        self.process = None  # Grinder handle (Popen or NativeGrindJob) of the running job
+        self.trace = None  # Span covering the job from the handler that started it until it ends
+
+
+class RuntimeRegistry:
+    # Live, unpicklable objects per chat, kept apart from the persisted sessions
+    def __init__(self):
+        self.chats = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, chat_id):
+        with self._lock:
+            runtime = self.chats.get(chat_id)
+            if runtime is None:
+                runtime = self.chats[chat_id] = ChatRuntime()
+            return runtime
+
+    def clear(self, chat_id):
+        with self._lock:
+            self.chats.pop(chat_id, None)
@@ -0,0 +1,206 @@
+import os
+import re
+import heapq
+import itertools
+import selectors
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Supervisor Settings ---
+PROGRESS_INTERVAL = int(os.environ.get("PROGRESS_INTERVAL", 10))  # Seconds between progress events per job
+EVENT_WORKERS = int(os.environ.get("EVENT_WORKERS", 4))  # Threads delivering job events, so slow sends never stall the watcher
+STALL_TIMEOUT = int(os.environ.get("STALL_TIMEOUT", 300))  # Seconds without a progress line before a grinder counts as stuck
+OUTPUT_TAIL_LINES = 50  # Non-progress output lines kept per stream for the exit handler
+
+# Printed periodically by `solana-keygen grind` and by the native grinder
+PROGRESS_LINE = re.compile(r"Searched (\d+) keypairs in (\d+)s")
+HIT_LINE = re.compile(r"(?:Wrote keypair to|Found keypair) (\S+)")  # solana-keygen names the file, the native grinder the address
+
+
+class _Watch:
+    def __init__(self, job, process, on_exit, on_progress, on_telemetry, on_stall, on_hit):
+        self.job = job
+        self.process = process
+        self.on_exit = on_exit
+        self.on_progress = on_progress
+        self.on_telemetry = on_telemetry
+        self.on_stall = on_stall
+        self.on_hit = on_hit
+        self.output = {"stdout": deque(maxlen=OUTPUT_TAIL_LINES), "stderr": deque(maxlen=OUTPUT_TAIL_LINES)}
+        self.partial = {"stdout": b"", "stderr": b""}
+        self.open_streams = 0
+        self.active = True
+        self.attempts = 0
+        self.rate = 0.0
+        self.last_activity = time.time()
+
+
+# --- Job Supervisor ---
+class JobSupervisor:
+    # One thread watches every running grinder (pipe output and exit) instead of a sleep loop per job
+    def __init__(self, progress_interval=PROGRESS_INTERVAL, event_workers=EVENT_WORKERS, stall_timeout=STALL_TIMEOUT):
+        self.progress_interval = progress_interval
+        self.stall_timeout = stall_timeout
+        self.total_attempts = 0  # Lifetime keys searched on this host, across finished jobs too
+        self.watches = set()
+        self.selector = None
+        self.events = ThreadPoolExecutor(max_workers=event_workers, thread_name_prefix="job-events")
+        self._pending = []
+        self._timers = []  # Heap of (due, seq, watch)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup_r = self._wakeup_w = None
+
+    def watch(self, job, process, on_exit, on_progress=None, on_telemetry=None, on_stall=None, on_hit=None):
+        # on_exit(job, stdout, stderr) runs once the process has exited, on_progress(job) every progress_interval,
+        # on_telemetry(job, attempts, elapsed) for every progress line, on_stall(job) after stall_timeout of silence
+        # and on_hit(job, name) for every keypair found, before on_exit
+        self._submit(("watch", _Watch(job, process, on_exit, on_progress, on_telemetry, on_stall, on_hit)))
+
+    def stats(self):
+        # Live throughput of this host: (running jobs, keys/sec, lifetime keys searched)
+        active = [watch for watch in list(self.watches) if watch.active]
+        return len(active), sum(watch.rate for watch in active), self.total_attempts
+
+    def unwatch(self, job):
+        self._submit(("unwatch", job))
+
+    def _submit(self, op):
+        with self._lock:
+            if self.selector is None:
+                self.selector = selectors.DefaultSelector()
+                self._wakeup_r, self._wakeup_w = os.pipe()
+                os.set_blocking(self._wakeup_r, False)
+                self.selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+                threading.Thread(target=self._run, name="job-supervisor", daemon=True).start()
+            self._pending.append(op)
+        os.write(self._wakeup_w, b"\0")
+
+    def _apply_pending(self):
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        for op, arg in pending:
+            if op == "watch":
+                watch = arg
+                for name in ("stdout", "stderr"):
+                    stream = getattr(watch.process, name)
+                    if stream is None:
+                        continue
+                    os.set_blocking(stream.fileno(), False)
+                    self.selector.register(stream.fileno(), selectors.EVENT_READ, (watch, name, stream))
+                    watch.open_streams += 1
+                self.watches.add(watch)
+                if watch.on_progress is not None or watch.on_stall is not None:
+                    heapq.heappush(self._timers, (time.time() + self.progress_interval, next(self._seq), watch))
+                if watch.open_streams == 0:
+                    self._exited(watch)
+            else:
+                for watch in [watch for watch in self.watches if watch.job is arg]:
+                    watch.active = False
+                    self.watches.discard(watch)
+                for key in list(self.selector.get_map().values()):
+                    if key.data is not None and key.data[0].job is arg:
+                        self._close(key.fd, key.data[2])
+
+    def _close(self, fd, stream):
+        self.selector.unregister(fd)
+        stream.close()
+
+    def _read(self, fd, watch, name, stream):
+        try:
+            chunk = os.read(fd, 65536)
+        except BlockingIOError:
+            return
+        if chunk:
+            lines = (watch.partial[name] + chunk).split(b"\n")
+            watch.partial[name] = lines.pop()
+            if len(watch.partial[name]) > 4096:  # Never buffer an endless line
+                lines.append(watch.partial[name])
+                watch.partial[name] = b""
+            for line in lines:
+                self._line(watch, name, line.decode(errors="replace"))
+            return
+        if watch.partial[name]:
+            self._line(watch, name, watch.partial[name].decode(errors="replace"))
+        self._close(fd, stream)
+        watch.open_streams -= 1
+        if watch.open_streams == 0:
+            self._exited(watch)
+
+    def _line(self, watch, name, line):
+        # Progress lines become telemetry and are not kept; anything else is kept (bounded) for the exit handler
+        match = PROGRESS_LINE.search(line)
+        if match is None:
+            watch.output[name].append(line + "\n")
+            hit = HIT_LINE.search(line)
+            if hit is not None and watch.on_hit is not None:
+                watch.last_activity = time.time()
+                try:
+                    watch.on_hit(watch.job, hit.group(1))
+                except Exception as e:
+                    print(f"Error handling job hit: {e}")
+            return
+        attempts, elapsed = int(match.group(1)), int(match.group(2))
+        self.total_attempts += max(0, attempts - watch.attempts)
+        watch.attempts = attempts
+        watch.rate = attempts / max(1, elapsed)
+        watch.last_activity = time.time()
+        if watch.on_telemetry is not None:
+            try:
+                watch.on_telemetry(watch.job, attempts, elapsed)
+            except Exception as e:
+                print(f"Error handling job telemetry: {e}")
+
+    def _exited(self, watch):
+        watch.active = False
+        self.watches.discard(watch)
+        stdout = "".join(watch.output["stdout"])
+        stderr = "".join(watch.output["stderr"])
+        self.events.submit(self._finish_process, watch, stdout, stderr)
+
+    def _finish_process(self, watch, stdout, stderr):
+        try:
+            watch.process.wait()  # Both pipes are closed, so this only reaps the child
+            watch.on_exit(watch.job, stdout, stderr)
+        except Exception as e:
+            print(f"Error handling job exit: {e}")
+
+    def _fire_progress(self, watch):
+        try:
+            watch.on_progress(watch.job)
+        except Exception as e:
+            print(f"Error handling job progress: {e}")
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._timers:
+                timeout = max(0.0, self._timers[0][0] - time.time())
+
+            # Apply pending watch/unwatch first, so a process killed right after unwatch() never reports its exit
+            events = sorted(self.selector.select(timeout), key=lambda event: event[0].data is not None)
+            for key, _ in events:
+                if key.data is None:
+                    self._apply_pending()
+                elif key.fd in self.selector.get_map():  # Skip streams an unwatch in this batch already closed
+                    self._read(key.fd, *key.data)
+
+            now = time.time()
+            while self._timers and self._timers[0][0] <= now:
+                _, _, watch = heapq.heappop(self._timers)
+                if not watch.active:
+                    continue
+                if watch.on_progress is not None:
+                    self.events.submit(self._fire_progress, watch)
+                if watch.on_stall is not None and now - watch.last_activity > self.stall_timeout:
+                    watch.last_activity = now  # Report each silent period once
+                    self.events.submit(watch.on_stall, watch.job)
+                heapq.heappush(self._timers, (now + self.progress_interval, next(self._seq), watch))
@@ -0,0 +1,53 @@
+"""Checks the AI suggestion pool: clicks are answered from memory and never wait for a whole refill.
+
+    python -m pytest tests/test_ai_cache.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_cache import SuggestionPool
+
+
+class SlowModel:
+    # Stands in for the model: every call takes `latency` seconds and returns new valid suggestions
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [f"A{self.calls}{index}" for index in range(1, 6)] + ["0OIl"]  # The last one is not base58
+
+
+def test_cold_take_waits_for_one_round_only():
+    async def run():
+        model = SlowModel(0.2)
+        pool = SuggestionPool(model.fetch, size=50, low=10)
+        started = time.time()
+        suggestions = await pool.take(5)
+        waited = time.time() - started
+        await pool._refill  # The remaining rounds finish in the background
+        return suggestions, waited, model.calls, len(pool.items)
+
+    suggestions, waited, calls, pooled = asyncio.run(run())
+    assert len(suggestions) == 5 and "0OIl" not in suggestions
+    assert waited < 0.35
+    assert calls > 1 and pooled > 5
+
+
+def test_take_keeps_suggestions():
+    async def run():
+        model = SlowModel(0)
+        pool = SuggestionPool(model.fetch, size=10, low=2)
+        for _ in range(40):
+            await pool.take(5)
+            await asyncio.sleep(0)  # Lets the background refill run between clicks
+        return model.calls, len(pool.items)
+
+    calls, pooled = asyncio.run(run())
+    assert calls == 2 and pooled == 10
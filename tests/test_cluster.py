@@ -0,0 +1,54 @@
+"""Checks the grind coordinator's local fallback: jobs with no connected worker are ground on the bot's own pool.
+
+    python -m pytest tests/test_cluster.py
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cluster import GrindCoordinator
+from grinder import GrindPool, native_backend_available
+
+pytestmark = pytest.mark.skipif(not native_backend_available(), reason="the native grinder needs PyNaCl")
+
+
+def wait_until(condition, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    pool = GrindPool(workers=1, batch_size=1000)
+    coordinator = GrindCoordinator(f"unix://{tmp_path / 'missing.sock'}", "token", heartbeat=0.5, fallback=pool)
+    yield coordinator
+    coordinator.shutdown()
+    pool.shutdown()
+
+
+def test_job_without_workers_runs_on_fallback(coordinator):
+    job = coordinator.start_job("zzzzz", "starts_with")
+    assert job.id in coordinator.local
+    assert wait_until(lambda: job.attempts > 0, 30)
+
+
+def test_paused_fallback_job_resumes(coordinator):
+    job = coordinator.start_job("zzzzz", "starts_with")
+    assert wait_until(lambda: job.attempts > 0, 30)
+
+    job.pause()
+    time.sleep(1)  # Work units already running still report
+    paused_at = job.attempts
+    time.sleep(1)
+    assert job.attempts == paused_at
+
+    job.resume()
+    assert wait_until(lambda: job.attempts > paused_at, 10)
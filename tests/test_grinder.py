@@ -0,0 +1,55 @@
+"""Checks the native grinder's work units against the difficulty model in patterns.py.
+
+    python -m pytest tests/test_grinder.py
+
+A work unit reports every match in its batch, up to the job's remaining count, and the keys it took to get
+there, so a job asking for many addresses of an easy pattern should use about as many keys as the model expects.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grinder import GrindPool, grind_batch, grind_shared_batch, native_backend_available
+from patterns import expected_attempts
+
+pytestmark = pytest.mark.skipif(not native_backend_available(), reason="the native grinder needs PyNaCl")
+
+COUNT = 20
+
+
+def wait_for(job, timeout):
+    deadline = time.time() + timeout
+    while job.poll() is None and time.time() < deadline:
+        time.sleep(0.05)
+    return job.poll()
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_easy_pattern_uses_expected_attempts(shared):
+    pool = GrindPool(workers=1, batch_size=2000, shared=shared)
+    try:
+        # A rare pattern alongside keeps the shared search running after the easy job is done
+        other = pool.start_job("zzzzz", "starts_with") if shared else None
+        job = pool.start_job("B", "starts_with", count=COUNT)
+        assert wait_for(job, 60) == 0
+        assert job.found == COUNT
+        assert len(job.results) == COUNT
+        # 20 hits spread the total well under this bound; one hit per 2000 key unit would need 40000 keys
+        assert job.attempts / COUNT < 3 * expected_attempts("B", "starts_with")
+        if other:
+            other.terminate()
+    finally:
+        pool.shutdown()
+
+
+def test_batch_stops_at_limit():
+    attempts, hits = grind_batch("B", "", False, 5000, limit=3)
+    assert len(hits) == 3 and attempts < 5000
+    assert all(address.startswith("B") for address, _ in hits)
+    attempts, hits = grind_shared_batch((("B", "", False), ("zzzzz", "", False)), 5000, (2, 1))
+    assert len(hits[0]) == 2 and attempts[0] < 5000
+    assert 1 not in hits and attempts[1] == 5000
@@ -0,0 +1,106 @@
+"""Checks the Telegram outbox: edit coalescing, per-chat order and 429 retry_after handling.
+
+    python -m pytest tests/test_outbox.py
+
+A fake bot records the calls that reach it; a gate holds a chat's first send in flight so later calls pile up.
+"""
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from telebot.apihelper import ApiTelegramException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outbox import PRIORITY_PROGRESS, TelegramOutbox
+
+
+class FakeBot:
+    def __init__(self, rate_limited=0, retry_after=1):
+        self.calls = []
+        self.times = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.rate_limited = rate_limited  # Calls answered with 429 before Telegram accepts them
+        self.retry_after = retry_after
+        self._ids = iter(range(100, 1000))
+
+    def _call(self, method, *args):
+        self.gate.wait(10)
+        self.times.append(time.time())
+        if self.rate_limited:
+            self.rate_limited -= 1
+            raise ApiTelegramException(method, None, {
+                "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": self.retry_after}
+            })
+        self.calls.append((method, *args))
+        return SimpleNamespace(message_id=next(self._ids), text=args[-1])
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self._call("send_message", chat_id, text)
+
+    def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        return self._call("edit_message_text", chat_id, message_id, text)
+
+    def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        return self._call("answer_callback_query", callback_query_id, text)
+
+
+def make_outbox(bot):
+    return TelegramOutbox(bot, global_rate=1000, chat_rate=1000, chat_burst=1000, sweep_seconds=0.1)
+
+
+def test_pending_edits_coalesce():
+    bot = FakeBot()
+    outbox = make_outbox(bot)
+    bot.gate.clear()
+    outbox.send_message(1, "hello")
+    time.sleep(0.2)  # The send is in flight, so the edits below wait behind it
+    futures = [outbox.edit_message_text(f"tick {n}", 1, 7, priority=PRIORITY_PROGRESS) for n in range(5)]
+    bot.gate.set()
+    assert outbox.flush(10)
+
+    assert bot.calls == [("send_message", 1, "hello"), ("edit_message_text", 1, 7, "tick 4")]
+    assert all(future.result(1).text == "tick 4" for future in futures)
+
+
+def test_progress_edit_never_replaces_pending_result():
+    bot = FakeBot()
+    outbox = make_outbox(bot)
+    bot.gate.clear()
+    outbox.send_message(1, "hello")
+    time.sleep(0.2)
+    result = outbox.edit_message_text("done", 1, 7)
+    tick = outbox.edit_message_text("tick", 1, 7, priority=PRIORITY_PROGRESS)
+    bot.gate.set()
+    assert outbox.flush(10)
+
+    assert bot.calls[1:] == [("edit_message_text", 1, 7, "done")]
+    assert tick is result
+
+
+def test_edit_of_queued_send_uses_its_message_id():
+    bot = FakeBot()
+    outbox = make_outbox(bot)
+    sent = outbox.send_message(1, "progress")
+    outbox.edit_message_text("finished", 1, sent)
+    assert outbox.flush(10)
+    assert bot.calls == [("send_message", 1, "progress"), ("edit_message_text", 1, 100, "finished")]
+
+
+def test_rate_limited_send_retries_after_retry_after_in_order():
+    bot = FakeBot(rate_limited=1, retry_after=1)
+    outbox = make_outbox(bot)
+    first = outbox.send_message(1, "first")
+    second = outbox.send_message(1, "second")
+    other = outbox.answer_callback_query(2, "query", "ok")
+    assert outbox.flush(10)
+
+    assert first.result(1).text == "first" and second.result(1).text == "second"
+    assert other.result(1).text == "ok"
+    chat_calls = [call for call in bot.calls if call[0] == "send_message"]
+    assert chat_calls == [("send_message", 1, "first"), ("send_message", 1, "second")]
+    assert bot.times[1] - bot.times[0] < 0.5  # The other chat is not held up
+    assert bot.times[-1] - bot.times[0] >= 0.9  # The limited chat waits out retry_after
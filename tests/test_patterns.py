@@ -0,0 +1,193 @@
+"""Checks the pattern compiler and difficulty model in patterns.py against real base58 encoding.
+
+    python -m pytest tests
+
+The matchers test keys by integer ranges and residues instead of encoding them, so every case here encodes
+keys with the base58 package and compares with a plain regex over the address. Keys are picked right at the
+edges of the compiled ranges and residue classes, where an off-by-one would show, plus random ones.
+"""
+import math
+import os
+import random
+import re
+import sys
+
+import base58
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patterns import (
+    KEY_BYTES, KEY_SPACE, PatternSet, attempts_quantile, compile_matcher, expected_attempts, match_probability,
+    pattern_literals, prefix_ranges, suffix_residues,
+)
+
+# (prefix, suffix, ignore_case)
+CASES = [
+    ("a", "", False),
+    ("Sun", "", False),
+    ("soL", "", True),
+    ("1", "", False),
+    ("11", "", False),
+    ("1A", "", False),
+    ("11z", "", True),
+    ("A?C", "", False),
+    ("?", "", False),
+    ("[Mm]oon", "", False),
+    ("[1-9]X", "", False),
+    ("[a-f]", "", True),
+    ("SUN|Moon", "", False),
+    ("a|ab", "", False),
+    ("1|2", "", False),
+    ("", "x", False),
+    ("", "pump", True),
+    ("", "?9", False),
+    ("", "[A-C]", False),
+    ("", "ab|b", False),
+    ("", "X|yz", True),
+    ("A|B", "?x", False),
+    ("1", "[Kk]", True),
+    ("[Mm]?", "1", False),
+]
+
+
+def encode(key):
+    return base58.b58encode(key).decode()
+
+
+def reference(prefix, suffix, ignore_case):
+    # The pattern syntax is a subset of regex syntax with "?" for any character
+    def side(text):
+        return "(?:" + text.replace("?", ".") + ")"
+    regex = re.compile(
+        ("^" + side(prefix) if prefix else "") + (".*" if prefix and suffix else "") + (side(suffix) + "$" if suffix else ""),
+        re.IGNORECASE if ignore_case else 0,
+    )
+    return lambda address: bool(regex.search(address))
+
+
+def edge_keys(prefix, suffix, ignore_case, rng):
+    # Keys on both sides of every range boundary and residue class of the pattern, plus random ones
+    values = [rng.getrandbits(8 * KEY_BYTES) for _ in range(200)]
+    for literal in pattern_literals(prefix, ignore_case, "start") if prefix else ():
+        for lo, hi in prefix_ranges(literal):
+            values += [lo - 1, lo, lo + 1, (lo + hi) // 2, hi - 2, hi - 1, hi]
+            values += [rng.randrange(lo, hi) for _ in range(5)]
+    for literal in pattern_literals(suffix, ignore_case, "end") if suffix else ():
+        modulus, residue = suffix_residues(literal)
+        for _ in range(5):
+            base = rng.getrandbits(8 * KEY_BYTES) // modulus * modulus
+            values += [base + residue - 1, base + residue, base + residue + 1]
+    if prefix and suffix:
+        # Keys on both sides at once, which random keys almost never are
+        modulus, residue = suffix_residues(pattern_literals(suffix, ignore_case, "end")[0])
+        for lo, hi in prefix_ranges(pattern_literals(prefix, ignore_case, "start")[0]):
+            if hi - lo > modulus:
+                base = rng.randrange(lo, hi - modulus) // modulus * modulus
+                values += [base + residue, base + residue + 1]
+    return [value.to_bytes(KEY_BYTES, "big") for value in values if 0 <= value < KEY_SPACE]
+
+
+def sample_keys(count, seed):
+    rng = random.Random(seed)
+    return [rng.getrandbits(8 * KEY_BYTES).to_bytes(KEY_BYTES, "big") for _ in range(count)]
+
+
+@pytest.mark.parametrize("prefix, suffix, ignore_case", CASES)
+def test_matcher_agrees_with_encoding(prefix, suffix, ignore_case):
+    matcher = compile_matcher(prefix, suffix, ignore_case)
+    expected = reference(prefix, suffix, ignore_case)
+    keys = edge_keys(prefix, suffix, ignore_case, random.Random(f"{prefix},{suffix},{ignore_case}"))
+    mismatches = [(encode(key), matcher.matches(key)) for key in keys if matcher.matches(key) != expected(encode(key))]
+    assert not mismatches
+    assert any(expected(encode(key)) for key in keys)  # The edges include matching keys, not only misses
+
+
+@pytest.mark.parametrize("prefix, suffix, ignore_case", CASES)
+def test_block_matching_agrees_with_single_keys(prefix, suffix, ignore_case):
+    keys = edge_keys(prefix, suffix, ignore_case, random.Random(f"block {prefix},{suffix},{ignore_case}"))
+    matcher = compile_matcher(prefix, suffix, ignore_case)
+    single = [index for index, key in enumerate(keys) if matcher.matches(key)]
+    assert matcher.matching_indices(b"".join(keys)) == single
+
+
+def test_pattern_set_agrees_with_encoding():
+    patterns = CASES[:12] + CASES[15:]
+    keys = [key for case in patterns for key in edge_keys(*case, random.Random(str(case)))]
+    pattern_set = PatternSet(patterns)
+    expected = [reference(*case) for case in patterns]
+    found = pattern_set.matching(b"".join(keys))
+    assert found == [
+        (index, pattern)
+        for index, key in enumerate(keys)
+        for pattern in range(len(patterns))
+        if expected[pattern](encode(key))
+    ]
+
+
+def test_leading_ones_are_zero_bytes():
+    assert encode(bytes(KEY_BYTES)) == "1" * KEY_BYTES
+    assert prefix_ranges("1" * KEY_BYTES) == [(0, 1)]
+    assert prefix_ranges("1" * (KEY_BYTES + 1)) == []
+    assert match_probability("1", "") == pytest.approx(1 / 256)
+    assert match_probability("11", "") == pytest.approx(1 / 256 ** 2)
+
+
+@pytest.mark.parametrize("prefix, suffix, ignore_case", [
+    ("a", "", False),
+    ("a", "", True),
+    ("[A-H]", "", False),
+    ("?a", "", False),
+    ("A|B|2", "", False),
+    ("1", "", False),
+    ("", "[a-k]", False),
+    ("", "x|Y", True),
+    ("[2-9]", "?", False),
+])
+def test_match_probability_agrees_with_encoding(prefix, suffix, ignore_case):
+    # Monte Carlo over real addresses; the model must fall within 5 standard deviations of the observed rate
+    samples = 20000
+    expected = reference(prefix, suffix, ignore_case)
+    hits = sum(expected(encode(key)) for key in sample_keys(samples, f"{prefix},{suffix},{ignore_case}"))
+    probability = match_probability(prefix, suffix, ignore_case)
+    tolerance = 5 * math.sqrt(probability * (1 - probability) / samples) + 1 / samples
+    assert abs(hits / samples - probability) <= tolerance
+
+
+def test_case_folding_raises_probability():
+    # "a" also accepts "A"; "L" only accepts itself because "l" is not base58
+    assert match_probability("a", "", True) > match_probability("a", "", False)
+    assert match_probability("L", "", True) == match_probability("L", "", False)
+    assert match_probability("", "a", True) == pytest.approx(2 / 58)
+
+
+def searches(prefix, suffix, ignore_case, count, runs, seed):
+    # Attempts each of `runs` real searches took to find `count` matches
+    expected = reference(prefix, suffix, ignore_case)
+    rng = random.Random(seed)
+    results = []
+    for _ in range(runs):
+        attempts = found = 0
+        while found < count:
+            attempts += 1
+            found += expected(encode(rng.getrandbits(8 * KEY_BYTES).to_bytes(KEY_BYTES, "big")))
+        results.append(attempts)
+    return results
+
+
+@pytest.mark.parametrize("pattern, mode, count", [
+    ("[A-H]", "starts_with", 1),
+    ("[a-k]", "ends_with", 1),
+    ("?x|?Y", "ends_with", 1),
+    ("[A-H]", "starts_with", 5),
+])
+@pytest.mark.parametrize("quantile", [0.5, 0.9])
+def test_attempts_quantile_agrees_with_searches(pattern, mode, count, quantile):
+    runs = 400
+    expected = expected_attempts(pattern, mode)
+    prefix, suffix = (pattern, "") if mode == "starts_with" else ("", pattern)
+    attempts = searches(prefix, suffix, False, count, runs, f"{pattern} {count}")
+    finished = sum(a <= attempts_quantile(expected, quantile, count) for a in attempts) / runs
+    # Attempts are whole numbers, so the share finished by the estimate may overshoot by one attempt's worth
+    overshoot = 1 - (1 - 1 / expected) ** count if count == 1 else 0.05
+    assert quantile - 4 * math.sqrt(quantile * (1 - quantile) / runs) <= finished <= quantile + overshoot + 0.05
@@ -0,0 +1,113 @@
+"""Checks the grind scheduler's slot admission and release under the core budget.
+
+    python -m pytest tests/test_scheduler.py
+
+Jobs are launched with a fake process handle that records pause, resume and terminate calls instead of grinding.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import LONG_JOB_ATTEMPTS, SHORT_JOB_ATTEMPTS, GrindScheduler, QueueFullError, ScheduledJob
+
+
+class FakeHandle:
+    def __init__(self):
+        self.calls = []
+
+    def pause(self):
+        self.calls.append("pause")
+
+    def resume(self):
+        self.calls.append("resume")
+
+    def terminate(self):
+        self.calls.append("terminate")
+
+
+def launch(job):
+    return FakeHandle()
+
+
+def make_job(chat_id, cost, launcher=launch):
+    return ScheduledJob(chat_id, cost, launcher)
+
+
+def test_slots_follow_core_budget():
+    assert GrindScheduler(core_budget=2, max_running=4).slots == 2
+    scheduler = GrindScheduler(core_budget=8, max_running=4)
+    assert scheduler.slots == 4 and scheduler.threads_per_job == 2
+    assert GrindScheduler(core_budget=0, max_running=4).slots == 1
+
+
+def test_jobs_beyond_slots_wait_and_start_cheapest_first():
+    scheduler = GrindScheduler(core_budget=2, max_running=2)
+    first, second = make_job(1, 1000), make_job(2, 1000)
+    assert scheduler.submit(first) == 0
+    assert scheduler.submit(second) == 0
+    expensive, cheap = make_job(3, 5000), make_job(4, 2000)
+    assert scheduler.submit(expensive) == 1
+    assert scheduler.submit(cheap) == 1  # Cheaper jobs go ahead of the queue
+    assert scheduler.position(expensive) == 2
+    assert [job.state for job in (expensive, cheap)] == ["queued", "queued"]
+    assert cheap.handle is None
+
+    scheduler.finish(first)
+    assert first.state == "done"
+    assert cheap.state == "running" and cheap.handle is not None
+    assert scheduler.running == [second, cheap]
+
+    scheduler.finish(second)
+    assert expensive.state == "running"
+    assert not scheduler.queue
+
+
+def test_full_queue_refuses_jobs():
+    scheduler = GrindScheduler(core_budget=1, max_running=1, max_queue=1)
+    scheduler.submit(make_job(1, 1000))
+    scheduler.submit(make_job(2, 1000))
+    with pytest.raises(QueueFullError):
+        scheduler.submit(make_job(3, 1000))
+
+
+def test_short_job_pauses_long_job_until_it_finishes():
+    scheduler = GrindScheduler(core_budget=1, max_running=1)
+    long_job, short_job = make_job(1, LONG_JOB_ATTEMPTS), make_job(2, SHORT_JOB_ATTEMPTS)
+    scheduler.submit(long_job)
+    assert scheduler.submit(short_job) == 0
+    assert long_job.state == "paused" and long_job.handle.calls == ["pause"]
+    assert scheduler.running == [short_job]
+
+    scheduler.finish(short_job)
+    assert long_job.state == "running" and long_job.handle.calls == ["pause", "resume"]
+
+
+def test_short_job_waits_behind_other_short_jobs():
+    scheduler = GrindScheduler(core_budget=1, max_running=1)
+    running = make_job(1, SHORT_JOB_ATTEMPTS)
+    scheduler.submit(running)
+    assert scheduler.submit(make_job(2, 1000)) == 1
+    assert running.handle.calls == []
+
+
+def test_failed_launch_releases_slot():
+    scheduler = GrindScheduler(core_budget=1, max_running=1)
+    failed = make_job(1, 1000, launcher=lambda job: None)
+    assert scheduler.submit(failed) == 0
+    assert failed.state == "done" and not scheduler.running
+    job = make_job(2, 1000)
+    assert scheduler.submit(job) == 0 and job.state == "running"
+
+
+def test_cancel_paused_job_terminates_and_continues_it():
+    scheduler = GrindScheduler(core_budget=1, max_running=1)
+    long_job = make_job(1, LONG_JOB_ATTEMPTS)
+    scheduler.submit(long_job)
+    scheduler.submit(make_job(2, 1000))
+    scheduler.cancel(long_job)
+    assert long_job.state == "done"
+    assert long_job.handle.calls == ["pause", "terminate", "resume"]
+    assert not scheduler.queue
@@ -0,0 +1,91 @@
+"""Checks that the session store round-trips chat settings and checkpointed jobs through SQLite.
+
+    python -m pytest tests/test_sessions.py
+
+A second SessionStore on the same file stands in for the bot after a restart.
+"""
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import ScheduledJob
+from sessions import PERSISTED_FIELDS, SessionStore
+
+
+def test_settings_round_trip(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(path)
+    user = store[1]
+    user["current_mode"] = "ends_with"
+    user["ignore_case"] = True
+    user["update_message_id"] = 42  # Transient, never written
+    user.update(temp_pattern="Sun", temp_count=3, temp_ignore_case=True)
+
+    user = SessionStore(path)[1]
+    assert user["current_mode"] == "ends_with"
+    assert user["ignore_case"] is True
+    assert (user.temp_pattern, user.temp_count) == ("Sun", 3)
+    assert user.temp_ignore_case is True
+    assert user["update_message_id"] is None
+    assert SessionStore(path)[2]["generating_wallet"] is False  # Unknown chats get the defaults
+
+
+def test_checkpointed_job_resumes(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(path)
+    store[1].update(
+        generating_wallet=True, job_pattern="Moon", job_mode="starts_with", job_ignore_case=True, job_count=5, found_count=2
+    )
+    store[1].update(job_attempts=123456, job_seconds=78.5)  # The bot's periodic checkpoint
+    store[2]["current_mode"] = "starts_with"
+
+    resumed = SessionStore(path).generating()
+    assert [user.chat_id for user in resumed] == [1]
+    user = resumed[0]
+    assert (user.job_pattern, user.job_mode, user.job_ignore_case) == ("Moon", "starts_with", True)
+    assert (user.job_count, user.found_count) == (5, 2)
+
+    # As the bot does on startup: counts carry over, the search starts again
+    job = ScheduledJob(
+        user.chat_id, 1000, None, user.job_pattern, user.job_mode, user.job_ignore_case,
+        attempts=user.job_attempts, run_seconds=user.job_seconds, count=user.job_count, found=user.found_count
+    )
+    assert job.attempts == job.restart_attempts == 123456
+    assert job.elapsed() == 78.5
+    assert (job.count, job.found) == (5, 2)
+
+
+def test_finished_job_is_not_resumed(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(path)
+    store[1].update(generating_wallet=True, job_pattern="Moon", job_mode="starts_with")
+    store[1].update(generating_wallet=False, job_pattern=None, job_mode=None, job_attempts=0, job_seconds=0.0)
+    assert SessionStore(path).generating() == []
+
+
+def test_idle_sessions_leave_memory_but_running_jobs_stay(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), ttl=0)
+    store[1]["current_mode"] = "starts_with"
+    store[2]["generating_wallet"] = True
+    time.sleep(0.01)
+    store._sweep()
+    assert set(store.sessions) == {2}
+    assert store[1]["current_mode"] == "starts_with"  # Reloaded from disk
+
+
+def test_old_database_gains_new_columns(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE sessions (chat_id INTEGER PRIMARY KEY, current_mode, ignore_case, updated REAL)")
+    db.execute("INSERT INTO sessions VALUES (1, 'ends_with', 1, 0)")
+    db.commit()
+    db.close()
+
+    store = SessionStore(path)
+    columns = {row[1] for row in store.db.execute("PRAGMA table_info(sessions)")}
+    assert set(PERSISTED_FIELDS) <= columns
+    user = store[1]
+    assert (user.current_mode, user.ignore_case, user.job_count) == ("ends_with", True, 1)
@@ -0,0 +1,102 @@
+"""Checks that the job supervisor delivers exit, telemetry, hit, progress and stall callbacks.
+
+    python -m pytest tests/test_supervisor.py
+
+The watched processes are small Python children printing the same lines as the grinders.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supervisor import JobSupervisor
+
+
+def child(script):
+    return subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+class Recorder:
+    # Collects callbacks in order; `exited` is set once on_exit has run
+    def __init__(self):
+        self.events = []
+        self.exited = threading.Event()
+        self.stalled = threading.Event()
+
+    def on_exit(self, job, stdout, stderr):
+        self.events.append(("exit", stdout, stderr))
+        self.exited.set()
+
+    def on_progress(self, job):
+        self.events.append(("progress",))
+
+    def on_telemetry(self, job, attempts, elapsed):
+        self.events.append(("telemetry", attempts, elapsed))
+
+    def on_stall(self, job):
+        self.events.append(("stall",))
+        self.stalled.set()
+
+    def on_hit(self, job, name):
+        self.events.append(("hit", name))
+
+
+def watch(supervisor, process, recorder):
+    supervisor.watch(
+        "job", process, recorder.on_exit, recorder.on_progress,
+        on_telemetry=recorder.on_telemetry, on_stall=recorder.on_stall, on_hit=recorder.on_hit
+    )
+
+
+def test_telemetry_hits_and_exit():
+    supervisor = JobSupervisor(progress_interval=60)
+    recorder = Recorder()
+    process = child(
+        "import sys\n"
+        "print('Searched 5000 keypairs in 2s. 0 matches found.', flush=True)\n"
+        "print('Found keypair Abc123', flush=True)\n"
+        "print('Searched 9000 keypairs in 3s. 1 matches found.', flush=True)\n"
+        "print('no space left', file=sys.stderr)\n"
+    )
+    watch(supervisor, process, recorder)
+    assert recorder.exited.wait(10)
+
+    assert recorder.events[:3] == [("telemetry", 5000, 2), ("hit", "Abc123"), ("telemetry", 9000, 3)]
+    kind, stdout, stderr = recorder.events[-1]
+    assert kind == "exit"
+    assert stdout == "Found keypair Abc123\n"  # Progress lines are telemetry only
+    assert stderr == "no space left\n"
+    assert process.returncode == 0
+    assert supervisor.total_attempts == 9000
+    assert supervisor.stats()[0] == 0
+
+
+def test_silent_process_reports_progress_and_stall():
+    supervisor = JobSupervisor(progress_interval=0.2, stall_timeout=0.5)
+    recorder = Recorder()
+    process = child("import time; time.sleep(30)")
+    watch(supervisor, process, recorder)
+    try:
+        assert recorder.stalled.wait(10)
+        assert ("progress",) in recorder.events
+        assert supervisor.stats()[0] == 1
+    finally:
+        process.kill()
+    assert recorder.exited.wait(10)
+    assert recorder.events.count(("stall",)) == 1  # Each silent period is reported once
+
+
+def test_unwatched_process_does_not_report_exit():
+    supervisor = JobSupervisor(progress_interval=60)
+    recorder = Recorder()
+    process = child("import time; time.sleep(30)")
+    watch(supervisor, process, recorder)
+    supervisor.unwatch("job")
+    time.sleep(0.5)
+    process.kill()
+    process.wait()
+    assert not recorder.exited.wait(1)
+    assert supervisor.stats()[0] == 0
@@ -0,0 +1,159 @@
+import os
+import hmac
+import json
+import multiprocessing
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Webhook Settings ---
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")  # Public HTTPS URL Telegram posts updates to
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", 8443))
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")  # Checked against Telegram's X-Telegram-Bot-Api-Secret-Token header
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", 2))  # Bot processes; each chat is always handled by the same one
+WEBHOOK_HANDLER_THREADS = int(os.environ.get("WEBHOOK_HANDLER_THREADS", 8))  # Updates each worker handles at once, never two of one chat
+SHUTDOWN_TIMEOUT = 30  # Seconds workers get to drain their queue on shutdown
+LISTEN_BACKLOG = 128  # Pending connections; Telegram opens up to 40 at once and the default of 5 resets the rest
+
+
+def update_chat_id(update):
+    # The chat an update belongs to, used to route it; None for updates without one
+    for field in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        if update.get(field):
+            return update[field]["chat"]["id"]
+    callback = update.get("callback_query")
+    if callback:
+        message = callback.get("message")
+        return message["chat"]["id"] if message else callback["from"]["id"]
+    for field in ("inline_query", "chosen_inline_result", "shipping_query", "pre_checkout_query", "my_chat_member", "chat_member"):
+        if update.get(field):
+            sender = update[field].get("chat") or update[field].get("from")
+            return sender["id"] if sender else None
+    return None
+
+
+class ChatExecutor:
+    # Runs update handlers on a bounded thread pool, one update per chat at a time and in arrival order,
+    # so a slow handler only holds up its own chat
+    def __init__(self, handler, threads=WEBHOOK_HANDLER_THREADS):
+        self.handler = handler  # handler(raw) handles one raw update JSON string
+        self.pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="handler")
+        self.backlog = {}  # chat_id -> updates waiting behind the one being handled
+        self.lock = threading.Lock()
+
+    def submit(self, raw):
+        chat_id = update_chat_id(json.loads(raw))
+        with self.lock:
+            if chat_id in self.backlog:
+                self.backlog[chat_id].append(raw)
+                return
+            self.backlog[chat_id] = deque()
+        self.pool.submit(self._drain, chat_id, raw)
+
+    def shutdown(self):
+        # Waits until every update submitted so far has been handled
+        self.pool.shutdown(wait=True)
+
+    def _drain(self, chat_id, raw):
+        while raw is not None:
+            try:
+                self.handler(raw)
+            except Exception as e:
+                print(f"Error handling update for chat {chat_id}: {e}")
+            with self.lock:
+                waiting = self.backlog[chat_id]
+                if waiting:
+                    raw = waiting.popleft()
+                else:
+                    del self.backlog[chat_id]
+                    raw = None
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+# --- Webhook Ingress ---
+class WebhookIngress:
+    # Receives Telegram updates over HTTP and hands each one to the worker process that owns its chat,
+    # so updates of one chat are handled in order while different chats are handled in parallel
+    def __init__(self, worker_target, workers=WEBHOOK_WORKERS, host=WEBHOOK_HOST, port=WEBHOOK_PORT, secret=WEBHOOK_SECRET):
+        # worker_target(index, queue) runs in each worker process and handles raw update JSON strings until it gets None
+        self.worker_target = worker_target
+        self.workers = max(1, workers)
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.queues = []
+        self.processes = []
+        self.server = None
+
+    def route(self, raw):
+        chat_id = update_chat_id(json.loads(raw))
+        index = chat_id % self.workers if chat_id is not None else 0
+        self.queues[index].put(raw)
+
+    def start(self):
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(method)
+        for index in range(self.workers):
+            queue = context.Queue()
+            process = context.Process(target=self.worker_target, args=(index, queue), name=f"bot-worker-{index}")
+            process.start()
+            self.queues.append(queue)
+            self.processes.append(process)
+        self.server = _Server((self.host, self.port), self._handler_class())
+        print(f"Webhook listening on {self.host}:{self.server.server_port} with {self.workers} workers")
+
+    def serve_forever(self):
+        if self.server is None:
+            self.start()
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        server_thread = threading.Thread(target=self.server.serve_forever, name="webhook-http", daemon=True)
+        server_thread.start()
+        stop.wait()
+        self.shutdown()
+
+    def shutdown(self):
+        # Stop accepting updates, let every worker finish what it already received, then exit
+        print("Webhook shutting down...")
+        self.server.shutdown()
+        self.server.server_close()
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            process.join(SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                print(f"{process.name} did not stop in time, terminating it")
+                process.terminate()
+                process.join()
+
+    def _handler_class(self):
+        ingress = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                token = self.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+                if ingress.secret and not hmac.compare_digest(token.encode(), ingress.secret.encode()):
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                try:
+                    ingress.route(raw)
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Ignoring malformed update: {e}")
+                # Always acknowledge, otherwise Telegram keeps redelivering the update
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler